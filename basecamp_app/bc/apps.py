@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BcConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bc'
+
+    def ready(self):
+        from bc import signals  # noqa: F401, connect the receivers
+        from bc.registry import registry_build
+        registry_build()
+        from bc.structs import struct_build
+        struct_build()  # after the registry
@@ -0,0 +1,134 @@
+from django.core.cache import caches
+from django.db import connection
+from hashlib import sha256
+from os import environ
+
+from bc.models import BcProject, BcPeople, BcCompany, BcMessageCategory, BcProjectTool
+
+# read-through cache of the reference entities (rarely changed, read by nearly every view), shared by the processes
+# through the Django cache framework (settings.CACHES), eg: redis for many gunicorn workers.
+# the rows are stored as dict of field values, with a version stamp of the model fields, and expire after a TTL.
+# populated on read (bc.identity), invalidated on save / delete (bc.signals), preloaded by the bc_cache_warm_up command.
+# kept out of bc.utils, as bc.identity uses it.
+
+
+def static_get_reference_models():
+    return [BcProject, BcPeople, BcCompany, BcMessageCategory, BcProjectTool]
+
+
+def reference_cache():
+    """
+    configurable with environment variables:
+    * BASECAMP_REFERENCE_CACHE: cache alias (default: "bc_reference", see settings.CACHES), or "none" to disable
+    * BASECAMP_REFERENCE_CACHE_TTL: seconds a row is kept (default: 300)
+    :return: the cache, None if disabled
+    """
+    alias = environ.get("BASECAMP_REFERENCE_CACHE", "bc_reference")
+    return None if alias == "none" else caches[alias]
+
+
+def reference_cache_ttl():
+    return int(environ.get("BASECAMP_REFERENCE_CACHE_TTL", 300))
+
+
+def reference_cache_version(model):
+    """
+    :param model:
+    :return: stamp of the model fields, the rows cached by an older deployment (other fields) are never read
+    """
+    attnames = ','.join(field.attname for field in model._meta.concrete_fields)
+    return sha256(f'{model._meta.label} {attnames}'.encode()).hexdigest()[:12]
+
+
+def reference_cache_key(model, pk):
+    return f'bc_reference:{model._meta.label_lower}:{reference_cache_version(model)}:{pk}'
+
+
+def reference_cache_row(instance):
+    """
+    :param instance: model instance
+    :return: dict of the field values, cached instead of the pickled instance (with its loaded relations)
+    """
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def reference_cache_instance(model, row):
+    """
+    :param model:
+    :param row: from reference_cache_row
+    :return: the model instance as loaded from the database
+    """
+    return model.from_db(connection.alias, list(row.keys()), list(row.values()))
+
+
+def reference_cache_is_cacheable():
+    # a row read inside a transaction (eg: written but not committed yet) may be rolled back, never share it
+    return not connection.in_atomic_block
+
+
+def reference_cache_get(model, pk):
+    """
+    :param model:
+    :param pk:
+    :return: the instance from the cache, or from the database (then cached), None if not exists
+    """
+    return reference_cache_in_bulk(model, [pk]).get(pk)
+
+
+def reference_cache_in_bulk(model, pks):
+    """
+    :param model:
+    :param pks: iterable of pk
+    :return: dict {pk: instance} of the existing instances, only the pks not in the cache are queried (at once)
+    """
+    pks = list(pks)
+    cache = reference_cache()
+    if cache is None or model not in static_get_reference_models():
+        return model.objects.in_bulk(pks)
+
+    keys = {reference_cache_key(model, pk): pk for pk in pks}
+    instances = {keys[key]: reference_cache_instance(model, row) for key, row in cache.get_many(keys.keys()).items()}
+    missing = [pk for pk in pks if pk not in instances]
+    if missing:
+        loaded = model.objects.in_bulk(missing)
+        if loaded and reference_cache_is_cacheable():
+            cache.set_many({reference_cache_key(model, pk): reference_cache_row(instance)
+                            for pk, instance in loaded.items()}, timeout=reference_cache_ttl())
+        instances.update(loaded)
+    return instances
+
+
+def reference_cache_invalidate(model, pks):
+    """
+    :param model:
+    :param pks: iterable of pk, eg: the rows saved by bulk_create that does not send post_save
+    :return:
+    """
+    cache = reference_cache()
+    if cache is not None and model in static_get_reference_models():
+        cache.delete_many([reference_cache_key(model, pk) for pk in pks])
+
+
+def reference_cache_warm_up(models=None):
+    """
+    preload the rows of the reference models, eg: at worker boot
+    :param models: default: static_get_reference_models()
+    :return: number of rows cached
+    """
+    cache = reference_cache()
+    if cache is None:
+        return 0
+
+    count = 0
+    for model in models or static_get_reference_models():
+        rows = {}
+        for instance in model.objects.iterator(chunk_size=1000):
+            rows[reference_cache_key(model, instance.pk)] = reference_cache_row(instance)
+            if len(rows) >= 1000:
+                cache.set_many(rows, timeout=reference_cache_ttl())
+                count += len(rows)
+                rows = {}
+        if rows:
+            cache.set_many(rows, timeout=reference_cache_ttl())
+            count += len(rows)
+    return count
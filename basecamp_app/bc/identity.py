@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from bc.cache import reference_cache_get, reference_cache_in_bulk
+
+# identity map of model instances keyed by (model, pk), scoped to a request (BcIdentityMapMiddleware) or a sync job.
+# the same bucket, creator or company is loaded once per scope, instead of a SELECT per recording (or per assignee).
+# outside a scope nothing is kept in memory, every lookup goes to the reference cache (bc.cache) then the database.
+# kept out of bc.utils, as bc.serializers use it and bc.utils imports bc.serializers (circular import).
+
+_identity_map = ContextVar('bc_identity_map', default=None)
+
+
+@contextmanager
+def identity_map_scope():
+    """
+    with identity_map_scope():
+        _bucket, _exception = db_get_bucket(bucket_id=bucket_id)
+
+    a nested scope reuses the outer one. every thread (eg: a sync worker) has its own context, so its own scope.
+    """
+    if _identity_map.get() is not None:  # already in a scope
+        yield
+        return
+
+    token = _identity_map.set({})
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
+
+
+def identity_map_get(model, pk):
+    """
+    :param model: eg: BcProject, BcPeople, BcCompany
+    :param pk:
+    :return: the instance from the identity map, or loaded (then kept in the map), None if not exists
+    """
+    identity_map = _identity_map.get()
+    if identity_map is not None and (model, pk) in identity_map:
+        return identity_map[(model, pk)]
+
+    instance = reference_cache_get(model, pk)
+    if instance is not None:
+        identity_map_add(instance)
+    return instance
+
+
+def identity_map_in_bulk(model, pks):
+    """
+    :param model:
+    :param pks: iterable of pk
+    :return: dict {pk: instance} of the existing instances, only the pks not in the identity map are queried (at once)
+    """
+    identity_map = _identity_map.get() or {}
+    instances = {pk: identity_map[(model, pk)] for pk in pks if (model, pk) in identity_map}
+    missing = [pk for pk in pks if pk not in instances]
+    if missing:
+        for instance in reference_cache_in_bulk(model, missing).values():
+            identity_map_add(instance)
+            instances[instance.pk] = instance
+    return instances
+
+
+def identity_map_add(instance):
+    """
+    keep the instance (eg: just created) in the identity map of the current scope, no-op outside a scope
+    :param instance: model instance
+    :return:
+    """
+    identity_map = _identity_map.get()
+    if identity_map is not None:
+        identity_map[(type(instance), instance.pk)] = instance
+
+
+def identity_map_invalidate(model=None, pk=None):
+    """
+    remove entries from the identity map of the current scope, eg: after bulk_create or queryset update that bypass
+    the post_save signal (see bc.signals)
+    :param model: None to clear the map
+    :param pk: None to remove all instances of the model
+    :return:
+    """
+    identity_map = _identity_map.get()
+    if identity_map is None:
+        return
+
+    if model is None:
+        identity_map.clear()
+    elif pk is None:
+        for key in [key for key in identity_map if key[0] is model]:
+            identity_map.pop(key)
+    else:
+        identity_map.pop((model, pk), None)
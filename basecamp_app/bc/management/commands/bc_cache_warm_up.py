@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from time import perf_counter
+
+from bc.cache import reference_cache, reference_cache_warm_up
+
+
+class Command(BaseCommand):
+    help = ('preload the reference entities (projects, people, companies, message categories, dock tools) to the '
+            'reference cache, eg: at worker boot. see bc.cache')
+
+    def handle(self, *args, **options):
+        if reference_cache() is None:
+            self.stdout.write('reference cache disabled (BASECAMP_REFERENCE_CACHE=none)')
+            return
+
+        start = perf_counter()
+        count = reference_cache_warm_up()
+        self.stdout.write(f'cached {count} reference rows in {perf_counter() - start:.1f}s')
@@ -0,0 +1,131 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+from multiprocessing import get_context
+from pathlib import Path
+from random import Random
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+
+from bc.models import BcCompany, BcPeople
+from bc.sqlite import sqlite_database
+
+
+class Command(BaseCommand):
+    help = ('benchmark the read latency of SQLite under a concurrent write load, with the SQLite defaults then with '
+            'the SQLite profile (bc.sqlite): reader processes get people by id while a writer process updates people '
+            'in transactions. runs on temporary database files, the configured database is not touched.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='seconds of each run (default: 5.0)')
+        parser.add_argument('--readers', type=int, default=4,
+                            help='number of reader processes, as gunicorn workers (default: 4)')
+        parser.add_argument('--rows', type=int, default=10000,
+                            help='number of people in the database (default: 10000)')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='people updated per write transaction, as a sync job (default: 100)')
+
+    def handle(self, *args, **options):
+        if options["readers"] < 1 or options["rows"] < 1 or options["batch_size"] < 1:
+            raise CommandError('--readers, --rows and --batch-size should be 1 or more')
+
+        self.options = options
+        with TemporaryDirectory() as directory:
+            for profile in [False, True]:
+                stats = self.run(name=str(Path(directory) / f'bc_sqlite_benchmark_{int(profile)}.sqlite3'),
+                                 profile=profile)
+                self.report(label='profile' if profile else 'default', stats=stats)
+
+    def run(self, name, profile):
+        """
+        :param name: path of the database file
+        :param profile: apply the SQLite profile
+        :return: dict of read latencies (seconds), read errors, write transactions and write errors
+        """
+        alias = 'bc_sqlite_benchmark'
+        with sqlite_database(alias=alias, name=name, profile=profile) as connection:
+            with connection.schema_editor() as schema_editor:
+                schema_editor.create_model(BcCompany)
+                schema_editor.create_model(BcPeople)
+            self.populate(alias=alias)
+
+            connection.close()  # not shared with the forked processes
+
+            context = get_context('fork')  # the processes inherit django setup and the registered database
+            self.stop = context.Event()
+            results = context.Queue()
+            processes = ([context.Process(target=self.write, args=(alias, results))] +
+                         [context.Process(target=self.read, args=(alias, seed, results))
+                          for seed in range(self.options["readers"])])
+            for process in processes:
+                process.start()
+            sleep(self.options["duration"])
+            self.stop.set()
+
+            stats = {'latencies': [], 'read_errors': 0, 'writes': 0, 'write_errors': 0}
+            for _ in processes:
+                for key, value in results.get().items():
+                    stats[key] += value
+            for process in processes:
+                process.join()
+
+        return stats
+
+    def populate(self, alias):
+        now = timezone.now()
+        company = BcCompany.objects.using(alias).create(id=1, name='Honcho Design')
+        BcPeople.objects.using(alias).bulk_create([
+            BcPeople(id=person_id, name=f'person {person_id}', email_address=f'person{person_id}@example.com',
+                     personable_type='User', title='', created_at=now, updated_at=now, admin=False, owner=False,
+                     client=False, employee=True, time_zone='UTC', can_manage_projects=False, can_manage_people=False,
+                     company=company)
+            for person_id in range(1, self.options["rows"] + 1)], batch_size=1000)
+
+    def read(self, alias, seed, results):
+        random = Random(seed)
+        latencies = []
+        errors = 0
+        try:
+            while not self.stop.is_set():
+                start = perf_counter()
+                try:
+                    BcPeople.objects.using(alias).get(id=random.randint(1, self.options["rows"]))
+                    latencies.append(perf_counter() - start)
+                except OperationalError:  # database is locked
+                    errors += 1
+        finally:
+            connections[alias].close()
+
+        results.put({'latencies': latencies, 'read_errors': errors})
+
+    def write(self, alias, results):
+        random = Random(-1)
+        writes = 0
+        errors = 0
+        try:
+            while not self.stop.is_set():
+                try:
+                    with transaction.atomic(using=alias):
+                        for _ in range(self.options["batch_size"]):
+                            BcPeople.objects.using(alias).filter(id=random.randint(1, self.options["rows"])).update(
+                                updated_at=timezone.now())
+                    writes += 1
+                except OperationalError:  # database is locked
+                    errors += 1
+        finally:
+            connections[alias].close()
+
+        results.put({'writes': writes, 'write_errors': errors})
+
+    def report(self, label, stats):
+        latencies = stats["latencies"]
+        if len(latencies) >= 2:
+            percentiles = quantiles(latencies, n=100)
+            latency = (f'p50 {percentiles[49] * 1000:.2f} ms, p95 {percentiles[94] * 1000:.2f} ms, '
+                       f'p99 {percentiles[98] * 1000:.2f} ms, max {max(latencies) * 1000:.2f} ms')
+        else:
+            latency = 'no latency'
+        self.stdout.write(f'{label}: {len(latencies)} reads ({latency}), {stats["read_errors"]} read errors, '
+                          f'{stats["writes"]} write transactions, {stats["write_errors"]} write errors')
@@ -0,0 +1,546 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from django.utils.dateparse import parse_datetime
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+from threading import Lock, current_thread, local, main_thread
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from bc.identity import identity_map_scope
+from bc.registry import registry_get_recording_model, registry_get_recording_types
+from bc.structs import struct_convert, struct_decode, struct_get, struct_get_recording, struct_hash
+from bc.utils import (bc_api_get, bc_api_iter_pages, bc_api_iter_json, db_bulk_sync_people,
+                      api_people_get_all_people_uri, api_project_get_all_projects_uri,
+                      api_message_get_bucket_message_types_uri, api_message_get_bucket_message_board_uri,
+                      api_message_get_bucket_message_board_messages_uri,
+                      api_questionnaire_get_bucket_questionnaire_uri,
+                      api_questionnaire_get_bucket_questionnaire_questions_uri,
+                      api_questionnaire_get_bucket_question_answers_uri,
+                      api_schedule_get_bucket_schedule_uri, api_schedule_get_bucket_schedule_entries_uri,
+                      api_todoset_get_bucket_todoset_uri, api_todolist_get_bucket_todoset_todolists_uri,
+                      api_todolist_group_get_todolist_groups_uri, api_todo_get_bucket_todolist_todos_uri,
+                      api_vault_get_bucket_vault_uri, api_vault_get_bucket_vault_vaults_uri,
+                      api_vault_get_bucket_vault_documents_uri, api_vault_get_bucket_vault_uploads_uri,
+                      api_recording_get_recordings_uri, api_recording_get_bucket_recording_parent_comment_uri,
+                      static_get_recording_types, static_get_comment_parent_types,
+                      sync_save_project, sync_save_recording, sync_save_message_category,
+                      sync_get_state, sync_set_state, sync_is_changed, sync_get_payload_hashes,
+                      sync_set_many_to_many, sync_get_missing_parents)
+
+
+class Command(BaseCommand):
+    help = ('sync the Basecamp account to db: projects, dock tools (todos, messages, questions, schedules, vaults) '
+            'and comments. reruns only fetch and write the records updated after the previous sync.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--access-token', default=environ.get("BASECAMP_ACCESS_TOKEN"),
+                            help='OAuth access token, default: env BASECAMP_ACCESS_TOKEN')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='number of projects synced concurrently (default: 4)')
+        parser.add_argument('--full', action='store_true',
+                            help='ignore the high-water marks, fetch and write everything')
+        parser.add_argument('--recordings', action='store_true',
+                            help='sync only the changed recordings, from the recordings API sorted by updated_at '
+                                 '(after the people and projects)')
+
+    def handle(self, *args, **options):
+        if not options["access_token"]:
+            raise CommandError('undefined access token, set --access-token or env BASECAMP_ACCESS_TOKEN')
+        if options["concurrency"] < 1:
+            raise CommandError('--concurrency should be 1 or more')
+
+        self.access_token = options["access_token"]
+        self.full = options["full"]
+        self.stats = {'requests': 0, 'saved': 0, 'skipped': 0, 'errors': 0,
+                      'inserted': 0, 'updated': 0, 'unchanged': 0}  # the writes of the saved records
+        self.stats_lock = Lock()
+        self.local = local()  # the payload hashes and many-to-many fields of save_batch, per worker thread
+        start = perf_counter()
+
+        with identity_map_scope():  # the buckets and creators loaded once per job (per worker thread)
+            self.sync_people()
+
+            if options["recordings"]:
+                self.sync_list(uri=api_project_get_all_projects_uri(), save=self.save_project, name='Project')
+                for recording_type in static_get_recording_types():
+                    self.sync_recordings(recording_type=recording_type)
+            else:
+                self.sync_projects(concurrency=options["concurrency"])
+
+        elapsed = perf_counter() - start
+        self.stdout.write(
+            f'synced {self.stats["saved"]} records ({self.stats["skipped"]} unchanged, {self.stats["errors"]} errors) '
+            f'with {self.stats["requests"]} requests in {elapsed:.1f}s: '
+            f'{self.stats["saved"] / elapsed:.1f} records/s, {self.stats["requests"] / elapsed:.1f} requests/s')
+        self.stdout.write(f'written {self.stats["inserted"]} inserted, {self.stats["updated"]} updated, '
+                          f'{self.stats["unchanged"]} not written (payload not changed)')
+
+    def sync_projects(self, concurrency):
+        """
+        the dock tools of every project are walked, the unchanged records are not written but their child lists are
+        still walked (a new child does not always update its parent)
+        :param concurrency: number of projects synced concurrently
+        :return:
+        """
+        projects_uri = api_project_get_all_projects_uri()
+        projects = self.get_list(uri=projects_uri, name='Project')
+        if projects is None:  # not OK
+            return
+
+        updated_at = self.get_state(uri=projects_uri)
+
+        def worker(project):
+            return self.sync_project_worker(project=project,
+                                            changed=sync_is_changed(data=project, updated_at=updated_at))
+
+        if concurrency == 1:  # no worker thread, sync in the main thread
+            results = [worker(project) for project in projects]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(worker, projects))
+        if all(results):
+            self.set_state(uri=projects_uri, records=projects)
+
+    def count(self, stat, value=1):
+        with self.stats_lock:
+            self.stats[stat] += value
+
+    def error(self, message):
+        self.count('errors')
+        self.stderr.write(str(message))
+
+    def get(self, uri, name):
+        """
+        :param uri:
+        :param name: struct of the data, see bc.structs
+        :return: struct decoded from the API, None if not OK
+        """
+        self.count('requests')
+        response = bc_api_get(uri=uri, access_token=self.access_token)
+        if response.status_code != 200:  # not OK
+            self.error(f'{response.status_code} {uri}')
+            return None
+        try:
+            return struct_decode(response.content, name=name)
+        except ValueError as e:  # API data not fit to the struct
+            self.error(f'{uri}: {e!r}')
+            return None
+
+    def get_list(self, uri, name):
+        """
+        :param uri: list API uri
+        :param name: struct of the records, see bc.structs
+        :return: list of structs of all pages, None if any page not OK
+        """
+        records = []
+        self.count('requests')
+        response = bc_api_get(uri=uri, access_token=self.access_token)
+        for page in bc_api_iter_pages(response=response, access_token=self.access_token):
+            if page is not response:
+                self.count('requests')
+            if page.status_code != 200:  # not OK
+                self.error(f'{page.status_code} {uri}')
+                return None
+            try:
+                records.extend(struct_decode(page.content, name=name, many=True))
+            except ValueError as e:  # API data not fit to the struct
+                self.error(f'{uri}: {e!r}')
+                return None
+        return records
+
+    def iter_list(self, uri):
+        """
+        for data in self.iter_list(uri=uri):
+            if data is None:  # not OK
+                return False
+
+        the records of all pages of a list API, each decoded as its page downloads (bc_api_iter_json), so they are
+        saved while the rest of the page is read, and the list of records of all pages is never built.
+        :param uri: list API uri
+        :return: generator of json data, None then stops if any page not OK
+        """
+        self.count('requests')
+        response = bc_api_get(uri=uri, access_token=self.access_token, stream=True)
+        for page in bc_api_iter_pages(response=response, access_token=self.access_token, stream=True):
+            if page is not response:
+                self.count('requests')
+            if page.status_code != 200:  # not OK
+                self.error(f'{page.status_code} {uri}')
+                yield None
+                return
+            try:
+                yield from bc_api_iter_json(page)
+            except (OSError, ValueError) as e:  # connection lost, truncated body
+                self.error(f'{uri}: {e!r}')
+                yield None
+                return
+
+    def decode(self, data, name=None):
+        """
+        :param data: json data of a record, eg: from iter_list
+        :param name: struct of the record, see bc.structs, None for a recording by its type
+        :return: struct, None if the data does not fit (unknown type, wrong value type)
+        """
+        try:
+            return struct_convert(data, struct=struct_get(name) if name else struct_get_recording(data))
+        except (KeyError, ValueError) as e:
+            self.error(f'{data.get("type", name) if isinstance(data, dict) else name}: {e!r}')
+            return None
+
+    @staticmethod
+    def get_resource(uri):
+        return urlsplit(uri)._replace(scheme='', netloc='').geturl()  # stable key if the API host changes
+
+    def get_state(self, uri):
+        """
+        :param uri: list API uri
+        :return: high-water mark of the list, None if never synced or --full
+        """
+        return None if self.full else sync_get_state(resource=self.get_resource(uri))
+
+    def set_state(self, uri, records):
+        """
+        move the high-water mark of the list to the latest updated_at of the records
+        :param uri: list API uri
+        :param records: list of structs
+        :return:
+        """
+        if records:
+            sync_set_state(resource=self.get_resource(uri),
+                           updated_at=max(parse_datetime(record.updated_at) for record in records))
+
+    def sync_list(self, uri, save, name=None, batch_size=100):
+        """
+        fetch all pages of a list API, save the records updated after the high-water mark of the list. the child
+        lists of all records are walked, of the records not updated after the mark too, as they have their own marks.
+        the high-water mark moves forward only if all records (and their children) saved without error.
+        :param uri: list API uri, also the resource key of the high-water mark
+        :param save: function(struct, changed) to save a record (if changed) and its children, return False on error
+        :param name: struct of the records, see bc.structs, None for the recordings by their type
+        :param batch_size: records per save_batch
+        :return: False on error
+        """
+        updated_at = self.get_state(uri=uri)
+        latest = None  # the record of the latest updated_at
+        success = True
+        batch = []
+        for data in self.iter_list(uri=uri):  # saved in batches as the pages download
+            if data is None:  # not OK, the records already read are saved
+                self.save_batch(records=batch, save=save)
+                return False
+            data = self.decode(data, name=name)
+            if data is None:  # not fit
+                success = False
+                continue
+
+            if latest is None or parse_datetime(data.updated_at) > parse_datetime(latest.updated_at):
+                latest = data
+            batch.append((data, sync_is_changed(data=data, updated_at=updated_at)))
+            if len(batch) >= batch_size:
+                success = self.save_batch(records=batch, save=save) and success
+                batch = []
+
+        success = self.save_batch(records=batch, save=save) and success
+        if success and latest:
+            self.set_state(uri=uri, records=[latest])
+        return success
+
+    def save_batch(self, records, save):
+        """
+        save a batch of records of a list, the payload hashes of the saved recordings loaded with one query per model
+        to be compared by save_record, instead of a query per record. the many-to-many fields (assignees, etc.) of the
+        recordings set at the end of the batch, one read, one insert and one delete per field (sync_set_many_to_many)
+        :param records: list of (struct, changed)
+        :param save: function(struct, changed), see sync_list
+        :return: False on error
+        """
+        ids = {}  # model: ids
+        for data, changed in records:
+            if changed and getattr(data, 'type', None) in registry_get_recording_types():
+                ids.setdefault(registry_get_recording_model(data.type), []).append(data.id)
+        payload_hashes = self.get_payload_hashes()
+        for model, model_ids in ids.items():
+            for record_id, payload_hash in sync_get_payload_hashes(model=model, ids=model_ids).items():
+                payload_hashes[(model, record_id)] = payload_hash
+
+        outer_many_to_many = getattr(self.local, 'many_to_many', None)  # of the list of the parent record
+        self.local.many_to_many = many_to_many = {}
+        success = True
+        try:
+            for data, changed in records:
+                if not save(data, changed):
+                    success = False
+        finally:
+            self.local.many_to_many = outer_many_to_many
+        sync_set_many_to_many(many_to_many=many_to_many)
+        return success
+
+    def get_payload_hashes(self):
+        """
+        :return: dict {(model, id): payload_hash} prefetched by save_batch of the current thread, popped by save_record
+        """
+        if not hasattr(self.local, 'payload_hashes'):
+            self.local.payload_hashes = {}
+        return self.local.payload_hashes
+
+    def save_record(self, data, changed=True):
+        """
+        save a recording of known type (registry_get_recording_types), not written if its payload hash prefetched
+        by save_batch is the same
+        :param data: recording struct from API
+        :param changed: False if not updated after the high-water mark of its list, not written
+        :return: False on error
+        """
+        if not changed:
+            self.count('skipped')
+            return True
+        try:
+            model = registry_get_recording_model(data.type)
+            payload_hash = self.get_payload_hashes().pop((model, data.id), None)
+            if payload_hash and payload_hash == struct_hash(data):
+                self.count('unchanged')
+                self.count('saved')
+                return True
+            _record, _exception = sync_save_recording(model=model, data=data, count=self.count,
+                                                      many_to_many=getattr(self.local, 'many_to_many', None))
+        except (DatabaseError, KeyError, TypeError, ValueError) as e:  # API data not fit to the model
+            _record, _exception = None, repr(e)
+        if not _record:
+            self.error(f'{data.type} {data.id}: {_exception}')
+            return False
+        self.count('saved')
+        return True
+
+    def save_recording(self, data, changed=True):
+        """
+        save a recording of known type (registry_get_recording_types), then its comments
+        :param data: recording struct from API
+        :param changed: see save_record, the comments walked anyway
+        :return: False on error
+        """
+        if not self.save_record(data, changed=changed):
+            return False
+
+        if data.type in static_get_comment_parent_types() and data.comments_count:
+            return self.sync_list(uri=api_recording_get_bucket_recording_parent_comment_uri(
+                bucket_id=data.bucket.id, parent_id=data.id), save=self.save_recording)
+        return True
+
+    def save_project(self, project, changed=True):
+        if not changed:
+            self.count('skipped')
+            return True
+        sync_save_project(project=project, count=self.count)
+        self.count('saved')
+        return True
+
+    def sync_recordings(self, recording_type):
+        """
+        change feed of a recording type: page through the recordings API sorted by updated_at (latest first),
+        stop at the first record not updated after the cursor, so the requests grow with the changes only.
+        the parents of a page loaded with one query per model, a recording whose parent is not in db is an error (as
+        the detail views), retried by the next run.
+        the cursor (high-water mark) moves forward only if all changed records saved without error.
+        :param recording_type: one of static_get_recording_types()
+        :return: False on error
+        """
+        resource = f'recordings:{recording_type}'
+        updated_at = None if self.full else sync_get_state(resource=resource)
+        uri = api_recording_get_recordings_uri(recording_type=recording_type, sort='updated_at', direction='desc')
+        latest = None
+        success = True
+
+        self.count('requests')
+        response = bc_api_get(uri=uri, access_token=self.access_token, stream=True)
+        for page in bc_api_iter_pages(response=response, access_token=self.access_token, predict=False, stream=True):
+            if page is not response:
+                self.count('requests')
+            if page.status_code != 200:  # not OK
+                self.error(f'{page.status_code} {uri}')
+                return False
+
+            records = []
+            reached = False
+            try:
+                for data in bc_api_iter_json(page):  # decoded as the page downloads, the rest not read once reached
+                    data = self.decode(data)
+                    if data is None:  # not fit
+                        success = False
+                        continue
+                    if not sync_is_changed(data=data, updated_at=updated_at):  # older records are already synced
+                        reached = True
+                        break
+                    records.append(data)
+            except (OSError, ValueError) as e:  # connection lost, truncated body
+                self.error(f'{uri}: {e!r}')
+                return False
+
+            missing = {(parent.type, parent.id) for parent in sync_get_missing_parents(records=records)}
+            for data in records:
+                if data.parent and (data.parent.type, data.parent.id) in missing:
+                    self.error(f'{data.type} {data.id}: parent {data.parent.type} {data.parent.id} not in db')
+                    success = False
+                elif not self.save_record(data):  # comments come from their own feed
+                    success = False
+                if latest is None:  # sorted by updated_at desc, the first is the latest
+                    latest = parse_datetime(data.updated_at)
+            if reached:
+                break
+
+        if success and latest:
+            sync_set_state(resource=resource, updated_at=latest)
+        return success
+
+    def save_tool(self, data, changed=True):
+        """
+        save a dock tool (todoset, message board, etc.) fetched by id, not written if the saved one is not older.
+        its lists are walked anyway, they have their own high-water marks.
+        :param data: recording struct from API
+        :param changed: see save_record
+        :return: False on error
+        """
+        model = registry_get_recording_model(data.type)
+        if not self.full and model.objects.filter(id=data.id,
+                                                  updated_at__gte=parse_datetime(data.updated_at)).exists():
+            changed = False
+        return self.save_recording(data, changed=changed)
+
+    def save_message_category(self, category, changed=True):
+        if not changed:
+            self.count('skipped')
+            return True
+        sync_save_message_category(category=category)
+        self.count('saved')
+        return True
+
+    def sync_people(self, batch_size=100):
+        """
+        people saved in batches as the pages download
+        :param batch_size: people per db_bulk_sync_people
+        :return:
+        """
+        people = []
+        for person in self.iter_list(uri=api_people_get_all_people_uri()):
+            if person is None:  # not OK, the batches already saved are kept
+                break
+            # same filter as app_people_load_all_to_db
+            if person["personable_type"] not in ['DummyUser', 'Tombstone'] and 'company' in person:
+                people.append(person)
+            if len(people) >= batch_size:
+                self.save_people(people=people)
+                people = []
+        self.save_people(people=people)
+
+    def save_people(self, people):
+        if not people:
+            return
+        _people, _exception = db_bulk_sync_people(people=people, count=self.count)
+        if _exception:
+            self.error(_exception)
+        self.count('saved', len(_people))
+
+    def sync_project_worker(self, project, changed):
+        """
+        :param project: Project struct from API
+        :param changed: False if the project not updated after the high-water mark, the dock tools still walked
+        :return: False on error
+        """
+        try:
+            with identity_map_scope():  # a worker thread does not share the scope of the main thread
+                return self.sync_project(project=project, changed=changed)
+        except Exception as e:  # keep syncing the other projects
+            self.error(f'project {project.id}: {e!r}')
+            return False
+        finally:
+            if current_thread() is not main_thread():
+                # the db connection of the worker thread, closed even if CONN_MAX_AGE keeps it for reuse
+                connection.close()
+
+    def sync_project(self, project, changed):
+        if changed:
+            sync_save_project(project=project, count=self.count)
+            self.count('saved')
+        else:
+            self.count('skipped')
+
+        bucket_id = project.id
+        results = []
+        for tool in project.dock or []:
+            if not tool.enabled:
+                continue
+
+            if tool.name == 'todoset':
+                todoset = self.get(api_todoset_get_bucket_todoset_uri(bucket_id=bucket_id, todoset_id=tool.id),
+                                   name='Todoset')
+                results.append(bool(todoset) and self.save_tool(todoset) and self.sync_list(
+                    uri=api_todolist_get_bucket_todoset_todolists_uri(bucket_id=bucket_id, todoset_id=todoset.id),
+                    save=self.save_todolist))
+
+            elif tool.name == 'message_board':
+                # message category should be saved before the message
+                results.append(self.sync_list(uri=api_message_get_bucket_message_types_uri(bucket_id=bucket_id),
+                                              save=self.save_message_category, name='MessageCategory'))
+                message_board = self.get(api_message_get_bucket_message_board_uri(
+                    bucket_id=bucket_id, message_board_id=tool.id), name='Message::Board')
+                results.append(bool(message_board) and self.save_tool(message_board) and self.sync_list(
+                    uri=api_message_get_bucket_message_board_messages_uri(
+                        bucket_id=bucket_id, message_board_id=message_board.id),
+                    save=self.save_recording))
+
+            elif tool.name == 'questionnaire':
+                questionnaire = self.get(api_questionnaire_get_bucket_questionnaire_uri(
+                    bucket_id=bucket_id, questionnaire_id=tool.id), name='Questionnaire')
+                results.append(bool(questionnaire) and self.save_tool(questionnaire) and self.sync_list(
+                    uri=api_questionnaire_get_bucket_questionnaire_questions_uri(
+                        bucket_id=bucket_id, questionnaire_id=questionnaire.id),
+                    save=self.save_question))
+
+            elif tool.name == 'schedule':
+                schedule = self.get(api_schedule_get_bucket_schedule_uri(bucket_id=bucket_id, schedule_id=tool.id),
+                                    name='Schedule')
+                results.append(bool(schedule) and self.save_tool(schedule) and self.sync_list(
+                    uri=api_schedule_get_bucket_schedule_entries_uri(bucket_id=bucket_id, schedule_id=schedule.id),
+                    save=self.save_recording))
+
+            elif tool.name == 'vault':
+                vault = self.get(api_vault_get_bucket_vault_uri(bucket_id=bucket_id, vault_id=tool.id), name='Vault')
+                results.append(bool(vault) and self.save_vault(vault, save=self.save_tool))
+
+        return all(results)
+
+    def save_todolist(self, todolist, changed=True):
+        if not self.save_recording(todolist, changed=changed):
+            return False
+
+        bucket_id = todolist.bucket.id
+        results = []
+        if todolist.groups_url:  # todolist, not todolist_group
+            results.append(self.sync_list(uri=api_todolist_group_get_todolist_groups_uri(
+                bucket_id=bucket_id, todolist_id=todolist.id), save=self.save_todolist))
+
+        # the todos API returns the pending todos by default, then request the completed todos
+        todos_uri = api_todo_get_bucket_todolist_todos_uri(bucket_id=bucket_id, todolist_id=todolist.id)
+        results.append(self.sync_list(uri=todos_uri, save=self.save_recording))
+        results.append(self.sync_list(uri=f'{todos_uri}?completed=true', save=self.save_recording))
+        return all(results)
+
+    def save_question(self, question, changed=True):
+        return self.save_recording(question, changed=changed) and self.sync_list(
+            uri=api_questionnaire_get_bucket_question_answers_uri(bucket_id=question.bucket.id,
+                                                                  question_id=question.id),
+            save=self.save_recording)
+
+    def save_vault(self, vault, changed=True, save=None):
+        if not (save or self.save_recording)(vault, changed):
+            return False
+
+        bucket_id = vault.bucket.id
+        return all([
+            self.sync_list(uri=api_vault_get_bucket_vault_documents_uri(bucket_id=bucket_id, vault_id=vault.id),
+                           save=self.save_recording),
+            self.sync_list(uri=api_vault_get_bucket_vault_uploads_uri(bucket_id=bucket_id, vault_id=vault.id),
+                           save=self.save_recording),
+            self.sync_list(uri=api_vault_get_bucket_vault_vaults_uri(bucket_id=bucket_id, vault_id=vault.id),
+                           save=self.save_vault),
+        ])
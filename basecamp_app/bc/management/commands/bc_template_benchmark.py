@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context
+from time import perf_counter
+
+from bc.utils import repr_get_template
+
+
+class Command(BaseCommand):
+    help = ('benchmark the cost per render of the repr_* HTML helpers (bc.utils.repr): the template string compiled '
+            'on every call, then the compiled template from the cache (repr_get_template)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=10000,
+                            help='renders of each template per run (default: 10000)')
+
+    def handle(self, *args, **options):
+        if options["renders"] < 1:
+            raise CommandError('--renders should be 1 or more')
+
+        templates = self.get_templates()
+        repr_get_template.cache_clear()
+        # __wrapped__: the template string compiled on every call, as before the cache
+        for label, get_template in [('compiled per render', repr_get_template.__wrapped__),
+                                    ('cached', repr_get_template)]:
+            elapsed = self.run(templates=templates, get_template=get_template, renders=options["renders"])
+            self.stdout.write(f'{label}: {elapsed / (options["renders"] * len(templates)) * 1000000:.2f} us '
+                              f'per render ({options["renders"] * len(templates)} renders in {elapsed:.2f}s)')
+        self.stdout.write(f'cache: {repr_get_template.cache_info()}')
+
+    @staticmethod
+    def get_templates():
+        """
+        :return: list of (template string, context dict), as rendered by the repr_* helpers and the project view
+        """
+        return [
+            ('<a href="{{ back_href}}">back</a><br/>{{ body}}<br/>',
+             {'back_href': '/bc/', 'body': 'body <b>escaped</b>'}),
+            ('{{ entity_type }} {{ entity_id }} not found<br/>'
+             '<a href="{{ href }}">try to open {{ entity_type }}</a> first.',
+             {'entity_id': 1, 'entity_type': 'Todo', 'href': '/bc/todo/1'}),
+            ('<a href="/bc/project/">back</a><br/>'
+             'project: {{ project.id }}<br/>'
+             'name: {{ project.name }}<br/>'
+             'enabled tools: <br/>'
+             '{% for tool in tool_list %}'
+             '{% if tool.url == "#" %}'
+             '<li>{{ tool.id }} {{ tool.title }} ({{ tool.name }})</li>'
+             '{% else %}'
+             '<li><a href="{{ tool.url }}">{{ tool.id }}</a> {{ tool.title }} ({{ tool.name }})</li>'
+             '{% endif %}'
+             '{% endfor %}<br/>',
+             {'project': {'id': 1, 'name': 'project'},
+              'tool_list': [{'id': tool_id, 'title': 'tool', 'name': 'todoset', 'url': '#' if tool_id % 2 else '/'}
+                            for tool_id in range(8)]}),
+        ]
+
+    @staticmethod
+    def run(templates, get_template, renders):
+        """
+        :param templates: list of (template string, context dict)
+        :param get_template: function(template string) returns Template
+        :param renders: renders of each template
+        :return: seconds
+        """
+        start = perf_counter()
+        for _ in range(renders):
+            for template_str, context_dict in templates:
+                get_template(template_str).render(context=Context(context_dict))
+        return perf_counter() - start
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from threading import Event, Lock, Thread, current_thread, main_thread
+from uuid import uuid4
+
+from bc.identity import identity_map_scope
+from bc.models import BcWebhookQueue
+from bc.utils import webhook_queue_claim, webhook_queue_process, webhook_queue_apply
+
+
+class Command(BaseCommand):
+    help = ('save the webhooks queued by the webhook receiver (BcWebhookQueue) with a pool of workers, '
+            'the failed webhooks are retried with exponential backoff.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='number of worker threads (default: 4)')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='webhooks claimed at once by a worker (default: 50)')
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='attempts before a webhook is marked failed (default: 5)')
+        parser.add_argument('--backoff', type=float, default=30,
+                            help='seconds before the first retry, doubled on every retry (default: 30)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='seconds to wait when the queue is empty (default: 1.0)')
+        parser.add_argument('--batch-apply', action='store_true',
+                            help='save a claimed batch at once, coalesced per recording (see webhook_queue_apply)')
+        parser.add_argument('--once', action='store_true',
+                            help='exit when the queue has no available webhook, instead of waiting for new ones')
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError('--workers should be 1 or more')
+
+        self.options = options
+        self.stats = {status: 0 for status in [BcWebhookQueue.STATUS_DONE, BcWebhookQueue.STATUS_PENDING,
+                                               BcWebhookQueue.STATUS_FAILED]}
+        self.stats_lock = Lock()
+        self.stop = Event()
+
+        if options["workers"] == 1:  # no worker thread, process in the main thread
+            self.work()
+        else:
+            workers = [Thread(target=self.work, daemon=True) for _ in range(options["workers"])]
+            for worker in workers:
+                worker.start()
+            try:
+                for worker in workers:
+                    while worker.is_alive():
+                        worker.join(timeout=1.0)  # wake up, to handle KeyboardInterrupt
+            except KeyboardInterrupt:
+                self.stop.set()  # finish the claimed batch, then exit
+                for worker in workers:
+                    worker.join()
+
+        self.stdout.write(f'processed {sum(self.stats.values())} webhooks ({self.stats["done"]} done, '
+                          f'{self.stats["pending"]} retried, {self.stats["failed"]} failed)')
+
+    def work(self):
+        worker_id = uuid4().hex
+        try:
+            while not self.stop.is_set():
+                with identity_map_scope():  # the buckets and creators of a batch loaded once
+                    items = webhook_queue_claim(worker_id=worker_id, batch_size=self.options["batch_size"])
+                    if self.options["batch_apply"]:
+                        statuses = webhook_queue_apply(items=items, max_attempts=self.options["max_attempts"],
+                                                       backoff=self.options["backoff"])
+                    else:
+                        statuses = [webhook_queue_process(item=item, max_attempts=self.options["max_attempts"],
+                                                          backoff=self.options["backoff"]) for item in items]
+                    for item, status in zip(items, statuses):
+                        with self.stats_lock:
+                            self.stats[status] += 1
+                        if status != BcWebhookQueue.STATUS_DONE:
+                            self.stderr.write(f'webhook {item.webhook_id} {status}: {item.error}')
+
+                if not items:
+                    if self.options["once"]:
+                        return
+                    self.stop.wait(self.options["poll_interval"])
+        finally:
+            if current_thread() is not main_thread():
+                # the db connection of the worker thread, closed even if CONN_MAX_AGE keeps it for reuse
+                connection.close()
@@ -0,0 +1,14 @@
+from bc.identity import identity_map_scope
+
+
+class BcIdentityMapMiddleware:
+    """
+    load a bucket, person or company once per request, see bc.identity
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_map_scope():
+            return self.get_response(request)
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bc', '0010_bcwebhook_bccloudfile_bcgoogledocument_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BcSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=255, unique=True)),
+                ('updated_at', models.DateTimeField()),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,165 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bc', '0012_bcwebhookqueue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bcclientapprovalresponse',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcclient_parent__206f37_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcclientapprovalresponse',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcclient_bucket__bb5d85_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcclientforward',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcclient_parent__13d28d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcclientforward',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcclient_bucket__033855_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcclientreply',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcclient_parent__46eb3c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcclientreply',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcclient_bucket__e23b9b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bccloudfile',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bccloudf_parent__1b6299_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bccloudfile',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bccloudf_bucket__a51327_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bccomment',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bccommen_parent__3cd973_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bccomment',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bccommen_bucket__6ae8b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcdocument',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcdocume_parent__f8ed46_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcdocument',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcdocume_bucket__ad03e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcgoogledocument',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcgoogle_parent__7d670e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcgoogledocument',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcgoogle_bucket__69be57_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcinboxforward',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcinboxf_parent__1d8130_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcinboxforward',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcinboxf_bucket__5df2e3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcmessage',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcmessag_parent__65fdc3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcmessage',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcmessag_bucket__e01f2f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcmessageboard',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcmessag_bucket__935c68_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcquestion',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcquesti_parent__c752ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcquestion',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcquesti_bucket__9fec49_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcquestionanswer',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcquesti_parent__6ac645_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcquestionanswer',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcquesti_bucket__f3ccd4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcquestionnaire',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcquesti_bucket__0cf5a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcschedule',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcschedu_bucket__19325c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcscheduleentry',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcschedu_parent__817f00_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcscheduleentry',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcschedu_bucket__66d6f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bctodo',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bctodo_parent__edc1de_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bctodo',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bctodo_bucket__57c67c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bctodolist',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bctodoli_parent__5d479d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bctodolist',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bctodoli_bucket__49729a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bctodoset',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bctodose_bucket__3c9d34_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcupload',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcupload_parent__612c0b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcupload',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcupload_bucket__4822b8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcvault',
+            index=models.Index(fields=['parent_content_type', 'parent_object_id'], name='bc_bcvault_parent__e3a8af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcvault',
+            index=models.Index(fields=['bucket', 'updated_at'], name='bc_bcvault_bucket__5e78c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcwebhook',
+            index=models.Index(fields=['recording_content_type', 'recording_object_id'], name='bc_bcwebhoo_recordi_7ac811_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bcwebhook',
+            index=models.Index(fields=['kind'], name='bc_bcwebhoo_kind_d2167b_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# JSONField is stored as jsonb on PostgreSQL. GIN indexes for the containment lookups (details__contains,
+# days__contains), created on PostgreSQL only: SQLite has no GIN. BcWebhook.raw is only read for debugging, not indexed.
+
+
+def static_get_gin_indexes():
+    return [
+        ('bc_bcwebhook_details_gin', 'bc_bcwebhook', 'details jsonb_path_ops'),
+        ('bc_bcrecurrenceschedule_days_gin', 'bc_bcrecurrenceschedule', 'days'),
+    ]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in static_get_gin_indexes():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column})')
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in static_get_gin_indexes():
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bc', '0013_bc_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from json import loads as json_loads
+
+# BcRecurrenceSchedule.days was saved as a json string ("[1, 2]") in the JSONField, the GIN index of 0014 and the
+# days__contains lookups never matched it. decode the strings to the lists they hold.
+
+
+def decode_days(apps, schema_editor):
+    BcRecurrenceSchedule = apps.get_model('bc', 'BcRecurrenceSchedule')
+    for schedule in BcRecurrenceSchedule.objects.exclude(days__isnull=True).only('id', 'days').iterator():
+        if isinstance(schedule.days, str):
+            schedule.days = json_loads(schedule.days)
+            schedule.save(update_fields=['days'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bc', '0015_payload_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(decode_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bc', '0016_recurrence_schedule_days_list'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='bcmessageboard',
+            name='payload_hash',
+        ),
+        migrations.RemoveField(
+            model_name='bcquestion',
+            name='payload_hash',
+        ),
+        migrations.RemoveField(
+            model_name='bcquestionnaire',
+            name='payload_hash',
+        ),
+        migrations.RemoveField(
+            model_name='bcschedule',
+            name='payload_hash',
+        ),
+        migrations.RemoveField(
+            model_name='bctodoset',
+            name='payload_hash',
+        ),
+    ]
@@ -1,3 +1,4 @@
+from .generic import *
 from .company import *
 from .people import *
 from .project import *
@@ -11,3 +12,4 @@ from .todolist import *
 from .todo import *
 from .vault import *
 from .webhook import *
+from .sync import *
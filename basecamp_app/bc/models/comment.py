@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from bc.models import BcPeople, BcProject
+from bc.models import BcPeople, BcProject, BcGenericRelationQuerySet
 
 
 class BcComment(models.Model):
@@ -13,6 +13,7 @@ class BcComment(models.Model):
     visible_to_clients = models.BooleanField()
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     title = models.CharField(max_length=100)
     inherits_status = models.BooleanField()
     type = models.CharField(max_length=30)
@@ -27,6 +28,13 @@ class BcComment(models.Model):
     bucket = models.ForeignKey(to=BcProject, on_delete=models.CASCADE)
     creator = models.ForeignKey(to=BcPeople, on_delete=models.CASCADE)
     content = models.TextField()
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
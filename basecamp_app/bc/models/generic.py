@@ -0,0 +1,53 @@
+from django.db import models
+from django.db.models import prefetch_related_objects
+from django.contrib.contenttypes.fields import GenericForeignKey
+
+
+def static_get_generic_relation_names(model):
+    """
+    :param model: eg: BcComment
+    :return: names of the GenericForeignKey of the model, eg: ['parent'], ['recording']
+    """
+    return [field.name for field in model._meta.private_fields if isinstance(field, GenericForeignKey)]
+
+
+def generic_relation_lookups(model, lookups):
+    """
+    :param model:
+    :param lookups: eg: ['recording__parent'], empty for the GenericForeignKey of the model
+    :return: the lookups of prefetch_related
+    """
+    return list(lookups) or static_get_generic_relation_names(model)
+
+
+class BcGenericRelationQuerySet(models.QuerySet):
+    """
+    queryset of the models with GenericForeignKey parent (or recording), eg: BcComment, BcScheduleEntry, BcWebhook.
+    reading .parent on a list of them queries a parent per row, with_generic_relations() loads them in batch.
+    """
+
+    def with_generic_relations(self, *lookups):
+        """
+        BcComment.objects.filter(bucket_id=bucket_id).with_generic_relations()
+        BcWebhook.objects.with_generic_relations('recording', 'recording__parent')
+
+        the objects of a GenericForeignKey grouped by content type, each target model fetched with one id__in query
+        (prefetch_related), the content types from the ContentType cache. bucket and creator joined if exist.
+        :param lookups: default: the GenericForeignKey of the model
+        :return: queryset, the number of queries independent of the number of rows
+        """
+        related_names = [name for name in ['bucket', 'creator']
+                         if any(field.name == name for field in self.model._meta.concrete_fields)]
+        return self.select_related(*related_names).prefetch_related(
+            *generic_relation_lookups(self.model, lookups))
+
+
+def generic_relation_load(instances, *lookups):
+    """
+    with_generic_relations() for a list of instances already loaded (of the same model), eg: built by bulk_create
+    :param instances: list of model instances
+    :param lookups: default: the GenericForeignKey of the model
+    :return:
+    """
+    if instances:
+        prefetch_related_objects(instances, *generic_relation_lookups(type(instances[0]), lookups))
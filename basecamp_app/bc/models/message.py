@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from bc.models import BcPeople, BcProject
+from bc.models import BcPeople, BcProject, BcGenericRelationQuerySet
 
 
 class BcMessageCategory(models.Model):
@@ -41,6 +41,9 @@ class BcMessageBoard(models.Model):
     messages_url = models.URLField()
     app_messages_url = models.URLField()
 
+    class Meta:
+        indexes = [models.Index(fields=['bucket', 'updated_at'])]
+
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
 
@@ -54,6 +57,7 @@ class BcMessage(models.Model):
     visible_to_clients = models.BooleanField()
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     title = models.CharField(max_length=100)
     inherits_status = models.BooleanField()
     type = models.CharField(max_length=30)
@@ -73,6 +77,13 @@ class BcMessage(models.Model):
     content = models.TextField()
     category = models.ForeignKey(to=BcMessageCategory, on_delete=models.CASCADE, null=True, blank=True)
     subject = models.CharField(max_length=100)
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
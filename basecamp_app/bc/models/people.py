@@ -17,6 +17,7 @@ class BcPeople(models.Model):
     location = models.CharField(max_length=100, null=True, blank=True)
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     admin = models.BooleanField()
     owner = models.BooleanField()
     client = models.BooleanField()
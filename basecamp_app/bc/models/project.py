@@ -26,6 +26,7 @@ class BcProject(models.Model):
     status = models.CharField(max_length=30)
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     name = models.CharField(max_length=100)
     description = models.CharField(max_length=100, null=True, blank=True)
     purpose = models.CharField(max_length=30)
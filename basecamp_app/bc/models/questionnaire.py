@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from bc.models import BcPeople, BcProject
+from bc.models import BcPeople, BcProject, BcGenericRelationQuerySet
 
 
 class BcRecurrenceSchedule(models.Model):
@@ -50,6 +50,9 @@ class BcQuestionnaire(models.Model):
     questions_count = models.IntegerField()
     questions_url = models.URLField()
 
+    class Meta:
+        indexes = [models.Index(fields=['bucket', 'updated_at'])]
+
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
 
@@ -82,6 +85,13 @@ class BcQuestion(models.Model):
     schedule = models.ForeignKey(to=BcRecurrenceSchedule, on_delete=models.CASCADE)
     answers_count = models.IntegerField()
     answers_url = models.URLField()
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -96,6 +106,7 @@ class BcQuestionAnswer(models.Model):
     visible_to_clients = models.BooleanField()
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     title = models.CharField(max_length=100)
     inherits_status = models.BooleanField()
     type = models.CharField(max_length=30)
@@ -114,6 +125,13 @@ class BcQuestionAnswer(models.Model):
     creator = models.ForeignKey(to=BcPeople, on_delete=models.CASCADE)
     content = models.TextField()
     group_on = models.DateField(null=True)
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from bc.models import BcPeople, BcProject, BcRecurrenceSchedule
+from bc.models import BcPeople, BcProject, BcRecurrenceSchedule, BcGenericRelationQuerySet
 
 
 class BcSchedule(models.Model):
@@ -26,6 +26,9 @@ class BcSchedule(models.Model):
     entries_count = models.IntegerField()
     entries_url = models.URLField()
 
+    class Meta:
+        indexes = [models.Index(fields=['bucket', 'updated_at'])]
+
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
 
@@ -39,6 +42,7 @@ class BcScheduleEntry(models.Model):
     visible_to_clients = models.BooleanField()
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     title = models.CharField(max_length=100)
     inherits_status = models.BooleanField()
     type = models.CharField(max_length=30)
@@ -63,6 +67,13 @@ class BcScheduleEntry(models.Model):
     # null has no effect on ManyToManyField, set blank=True to make it optional
     participants = models.ManyToManyField(to=BcPeople, related_name='schedule_entry_participants')
     recurrence_schedule = models.ForeignKey(to=BcRecurrenceSchedule, on_delete=models.CASCADE, null=True, blank=True)
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -0,0 +1,14 @@
+from django.db import models
+
+
+class BcSyncState(models.Model):
+    """
+    high-water mark of the bc_sync management command, one row per synced resource (list API uri).
+    internal model, not available at bc api.
+    """
+    resource = models.CharField(max_length=255, unique=True)
+    updated_at = models.DateTimeField()  # the latest updated_at of the synced records
+    synced_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.resource} {self.updated_at}'
@@ -2,7 +2,7 @@ from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
-from bc.models import BcTodoBase, BcPeople, BcRecurrenceSchedule
+from bc.models import BcTodoBase, BcPeople, BcRecurrenceSchedule, BcGenericRelationQuerySet
 
 
 class BcTodoCompletion(models.Model):
@@ -17,6 +17,7 @@ class BcTodo(BcTodoBase):
     """
     https://github.com/basecamp/bc3-api/blob/master/sections/todos.md
     """
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     subscription_url = models.URLField()
     comments_count = models.IntegerField()
     comments_url = models.URLField()
@@ -38,6 +39,13 @@ class BcTodo(BcTodoBase):
     completion_subscribers = models.ManyToManyField(to=BcPeople, blank=True,
                                                     related_name='todo_completion_subscribers')
     completion_url = models.URLField()
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -2,7 +2,7 @@ from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
-from bc.models import BcTodoBase
+from bc.models import BcTodoBase, BcGenericRelationQuerySet
 
 
 class BcTodolist(BcTodoBase):
@@ -14,6 +14,7 @@ class BcTodolist(BcTodoBase):
     https://github.com/basecamp/bc3-api/blob/master/sections/todolists.md
     https://github.com/basecamp/bc3-api/blob/master/sections/todolist_groups.md
     """
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     completed_ratio = models.CharField(max_length=30)
     name = models.CharField(max_length=100)
     # completed_ratio and name not available at Todo
@@ -34,6 +35,13 @@ class BcTodolist(BcTodoBase):
     group_position_url = models.URLField(null=True, blank=True)
     # internal field (not available at bc api): True means todolist_group, False means todolist
     is_todolist_group = models.BooleanField()
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -13,5 +13,8 @@ class BcTodoset(BcTodoBase):
     todolists_url = models.URLField()
     app_todoslists_url = models.URLField()
 
+    class Meta:
+        indexes = [models.Index(fields=['bucket', 'updated_at'])]
+
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from bc.models import BcPeople, BcProject
+from bc.models import BcPeople, BcProject, BcGenericRelationQuerySet
 
 
 class BcVault(models.Model):
@@ -13,6 +13,7 @@ class BcVault(models.Model):
     visible_to_clients = models.BooleanField()
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     title = models.CharField(max_length=100)
     inherits_status = models.BooleanField()
     type = models.CharField(max_length=30)
@@ -33,6 +34,13 @@ class BcVault(models.Model):
     uploads_url = models.URLField()
     vaults_count = models.IntegerField()
     vaults_url = models.URLField()
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -47,6 +55,7 @@ class BcDocument(models.Model):
     visible_to_clients = models.BooleanField()
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     title = models.CharField(max_length=100)
     inherits_status = models.BooleanField()
     type = models.CharField(max_length=30)
@@ -65,6 +74,13 @@ class BcDocument(models.Model):
     bucket = models.ForeignKey(to=BcProject, on_delete=models.CASCADE)
     creator = models.ForeignKey(to=BcPeople, on_delete=models.CASCADE)
     content = models.TextField()
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -79,6 +95,7 @@ class BcUpload(models.Model):
     visible_to_clients = models.BooleanField()
     created_at = models.DateTimeField(db_index=True)
     updated_at = models.DateTimeField()
+    payload_hash = models.CharField(max_length=32, blank=True, default='')  # struct_hash of the API data
     title = models.CharField(max_length=100)
     inherits_status = models.BooleanField()
     type = models.CharField(max_length=30)
@@ -104,6 +121,13 @@ class BcUpload(models.Model):
     app_download_url = models.URLField()
     width = models.IntegerField()
     height = models.IntegerField()
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
     def __str__(self):
         return f'{self.type} {self.id} {self.title} ({self.status})'
@@ -1,7 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from bc.models import BcPeople, BcProject
+from bc.models import BcPeople, BcProject, BcGenericRelationQuerySet
 
 
 class BcWebhookRecordingBase(models.Model):
@@ -25,9 +26,14 @@ class BcWebhookRecordingBase(models.Model):
     bucket = models.ForeignKey(to=BcProject, on_delete=models.CASCADE)
     creator = models.ForeignKey(to=BcPeople, on_delete=models.CASCADE)
     content = models.TextField()
+    objects = BcGenericRelationQuerySet.as_manager()
 
     class Meta:
         abstract = True
+        indexes = [
+            models.Index(fields=['parent_content_type', 'parent_object_id']),
+            models.Index(fields=['bucket', 'updated_at']),
+        ]
 
 
 class BcCloudFile(BcWebhookRecordingBase):
@@ -107,6 +113,42 @@ class BcWebhook(models.Model):
     recording = GenericForeignKey("recording_content_type", "recording_object_id")
     # record raw data for debugging trails, especially if the recording still undefined (null)
     raw = models.JSONField()
+    objects = BcGenericRelationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recording_content_type', 'recording_object_id']),
+            models.Index(fields=['kind']),
+        ]
 
     def __str__(self):
         return f'webhook {self.id} {self.kind}'
+
+
+class BcWebhookQueue(models.Model):
+    """
+    webhook payload received by app_webhook_receiver, waiting to be saved (BcWebhookSerializer) by the
+    bc_webhook_worker management command.
+    internal model, not available at bc api.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'  # gave up after the max attempts
+
+    webhook_id = models.BigIntegerField(unique=True)  # Basecamp Webhook ID, a redelivered payload is queued once
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)  # not processed before, delayed on retry
+    claimed_at = models.DateTimeField(null=True, blank=True)  # by a worker, reclaimed if the worker died
+    claimed_by = models.CharField(max_length=32, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'available_at'])]
+
+    def __str__(self):
+        return f'webhook queue {self.webhook_id} {self.status} ({self.attempts} attempts)'
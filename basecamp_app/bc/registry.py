@@ -0,0 +1,152 @@
+from django.apps import apps as django_apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+
+# registry of the Basecamp types (eg: 'Todo', 'Schedule::Entry', 'CloudFile'), built once by BcConfig.ready():
+# the model, the url of the detail view and the content type of a type in one dict lookup, instead of
+# get_app_config + get_model and the static_get_* dicts rebuilt on every webhook and comment.
+# kept out of bc.utils, as bc.serializers use it and bc.utils imports bc.serializers (circular import).
+
+
+class BcType:
+    """
+    a Basecamp type in the registry
+    """
+    __slots__ = ['type', 'model', 'url_name', 'url_kwarg', 'is_recording', 'is_webhook_recording',
+                 'is_webhook_base_child']
+
+    def __init__(self, bc_type, model, url_name=None, url_kwarg=None, is_recording=True, is_webhook_recording=False,
+                 is_webhook_base_child=False):
+        """
+        :param bc_type: Basecamp type, eg: 'Schedule::Entry'
+        :param model: eg: BcScheduleEntry
+        :param url_name: the detail view, eg: 'app-schedule-entry-detail', None if no view
+        :param url_kwarg: the id kwarg of the detail view, eg: 'schedule_entry_id'
+        :param is_recording: saved by sync_save_recording (a recording in a bucket, with creator and parent)
+        :param is_webhook_recording: linked by BcWebhookSerializer as recording or parent, if exists in db
+        :param is_webhook_base_child: child of BcWebhookRecordingBase, created by BcWebhookSerializer if not exists
+        """
+        self.type = bc_type
+        self.model = model
+        self.url_name = url_name
+        self.url_kwarg = url_kwarg
+        self.is_recording = is_recording
+        self.is_webhook_recording = is_webhook_recording
+        self.is_webhook_base_child = is_webhook_base_child
+
+    @property
+    def content_type(self):
+        return ContentType.objects.get_for_model(self.model)  # cached by ContentTypeManager, queried once
+
+    def get_url(self, bucket_id, recording_id):
+        """
+        :return: uri of the detail view, None if no view
+        """
+        if not self.url_name:
+            return None
+        return reverse(self.url_name, kwargs={'bucket_id': bucket_id, self.url_kwarg: recording_id})
+
+    def __repr__(self):
+        return f'BcType({self.type}, {self.model.__name__})'
+
+
+_registry = {}  # Basecamp type: BcType
+
+
+def static_get_registry_types():
+    """
+    :return: list of (Basecamp type, model name, url name, url kwarg, keyword arguments of BcType)
+    """
+    return [
+        ('Todoset', 'BcTodoset', 'app-todoset-detail', 'todoset_id', {}),
+        ('Todolist', 'BcTodolist', 'app-todolist-detail', 'todolist_id', {'is_webhook_recording': True}),
+        ('Todo', 'BcTodo', 'app-todo-detail', 'todo_id', {'is_webhook_recording': True}),
+        ('Message::Board', 'BcMessageBoard', 'app-message-board-detail', 'message_board_id', {}),
+        ('Message', 'BcMessage', 'app-message-detail', 'message_id', {'is_webhook_recording': True}),
+        ('Questionnaire', 'BcQuestionnaire', 'app-questionnaire-detail', 'questionnaire_id', {}),
+        ('Question', 'BcQuestion', 'app-question-detail', 'question_id', {'is_webhook_recording': True}),
+        ('Question::Answer', 'BcQuestionAnswer', 'app-question-answer-detail', 'question_answer_id',
+         {'is_webhook_recording': True}),
+        ('Schedule', 'BcSchedule', 'app-schedule-detail', 'schedule_id', {}),
+        ('Schedule::Entry', 'BcScheduleEntry', 'app-schedule-entry-detail', 'schedule_entry_id',
+         {'is_webhook_recording': True}),
+        ('Vault', 'BcVault', 'app-vault-detail', 'vault_id', {'is_webhook_recording': True}),
+        ('Document', 'BcDocument', 'app-document-detail', 'document_id', {'is_webhook_recording': True}),
+        ('Upload', 'BcUpload', 'app-upload-detail', 'upload_id', {'is_webhook_recording': True}),
+        ('Comment', 'BcComment', 'app-comment-detail', 'comment_id', {'is_webhook_recording': True}),
+        # only known from webhooks, https://github.com/basecamp/bc3-api/blob/master/sections/webhooks.md
+        ('CloudFile', 'BcCloudFile', None, None, {'is_recording': False, 'is_webhook_base_child': True}),
+        ('GoogleDocument', 'BcGoogleDocument', None, None, {'is_recording': False, 'is_webhook_base_child': True}),
+        ('Inbox::Forward', 'BcInboxForward', None, None, {'is_recording': False, 'is_webhook_base_child': True}),
+        ('Client::Approval::Response', 'BcClientApprovalResponse', None, None,
+         {'is_recording': False, 'is_webhook_base_child': True}),
+        ('Client::Forward', 'BcClientForward', None, None, {'is_recording': False, 'is_webhook_base_child': True}),
+        ('Client::Reply', 'BcClientReply', None, None, {'is_recording': False, 'is_webhook_base_child': True}),
+    ]
+
+
+def registry_build():
+    """
+    (re)build the registry from the installed models, empty if the app bc not installed
+    :return:
+    """
+    registry = {}
+    if django_apps.is_installed('bc'):
+        for bc_type, model_name, url_name, url_kwarg, kwargs in static_get_registry_types():
+            registry[bc_type] = BcType(bc_type=bc_type, model=django_apps.get_model('bc', model_name),
+                                       url_name=url_name, url_kwarg=url_kwarg, **kwargs)
+
+    _registry.clear()
+    _registry.update(registry)
+
+
+@receiver(setting_changed)
+def registry_on_setting_changed(setting, **kwargs):
+    if setting == 'INSTALLED_APPS':  # eg: override_settings in tests
+        registry_build()
+
+
+def registry_get(bc_type):
+    """
+    :param bc_type: Basecamp type, eg: 'Todo'
+    :return: BcType, None if unknown (or the app bc not installed)
+    """
+    return _registry.get(bc_type)
+
+
+def registry_get_model(bc_type):
+    """
+    :param bc_type: Basecamp type, eg: 'Todo'
+    :return: the model, None if unknown (or the app bc not installed)
+    """
+    _type = _registry.get(bc_type)
+    return _type.model if _type else None
+
+
+def registry_get_recording_model(bc_type):
+    """
+    :param bc_type: Basecamp type of a recording saved by sync_save_recording, eg: 'Todo'
+    :return: the model, KeyError if not a recording type
+    """
+    _type = _registry.get(bc_type)
+    if not _type or not _type.is_recording:
+        raise KeyError(bc_type)
+    return _type.model
+
+
+def registry_get_recording_types():
+    """
+    :return: list of the Basecamp types saved by sync_save_recording
+    """
+    return [bc_type for bc_type, _type in _registry.items() if _type.is_recording]
+
+
+def registry_get_webhook_recording_types():
+    """
+    :return: list of the Basecamp types a webhook recording (or parent) may have: linked if exists in db, or created
+             (a base child)
+    """
+    return [bc_type for bc_type, _type in _registry.items()
+            if _type.is_webhook_recording or _type.is_webhook_base_child]
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from bc.identity import identity_map_get
 from bc.models import BcPeople, BcCompany
 from bc.serializers import BcCompanySerializer
 
@@ -17,16 +18,12 @@ class BcPeopleSerializer(serializers.ModelSerializer):
         if 'company' not in data:
             raise ValidationError({'people company error': f'people no company field'})
 
-        # get company instance from request data
-        try:
-            company = BcCompany.objects.get(id=data["company"]["id"])
-            # assign the company to serializer
-            self.company = company
+        # get company instance from request data, the people of the same company load it once per request
+        self.company = identity_map_get(BcCompany, data["company"]["id"])
+        if self.company:
             # remove (pop) the company field from data, if the instance found
             data.pop('company')
-        except BcCompany.DoesNotExist:
-            # the company creation via BcCompanySerializer
-            self.company = None
+        # else, the company creation via BcCompanySerializer
 
         # exclude 'can_ping' field from data, as we currently did not use the field
         if 'can_ping' in data:
@@ -48,11 +45,7 @@ class BcPeopleSerializer(serializers.ModelSerializer):
         # instead of create new data, load the data from model if it has same id or email address
         people = None
         if 'id' in validated_data:
-            id_data = validated_data.get('id')
-            try:
-                people = BcPeople.objects.get(id=id_data)
-            except BcPeople.DoesNotExist:
-                people = None
+            people = identity_map_get(BcPeople, validated_data.get('id'))
         if people:
             return people  # found by id
 
@@ -1,11 +1,10 @@
-from django.apps import apps as django_apps
-
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from bc.identity import identity_map_add, identity_map_get
 from bc.models import BcPeople, BcProject, BcWebhook
+from bc.registry import registry_get, registry_get_webhook_recording_types
 from bc.serializers import BcPeopleSerializer
-from bc.apps import BcConfig
 
 from copy import deepcopy
 
@@ -26,20 +25,17 @@ class BcWebhookSerializer(serializers.ModelSerializer):
 
         # get creator instance from request data
         # can not use db_get_or_create_person as it would be circular import
-        try:
-            creator = BcPeople.objects.get(id=data["creator"]["id"])
-            # assign the creator to serializer
-            self.creator = creator
+        # assign the creator to serializer, None if not found (the creator will be created via BcPeopleSerializer below)
+        self.creator = identity_map_get(BcPeople, data["creator"]["id"])
+        if self.creator:
             # remove (pop) the creator field from data if the instance found
             data.pop('creator')
-        except BcPeople.DoesNotExist:
-            # the creator will be created via BcPeopleSerializer below, now only set as None
-            self.creator = None
-            # serializer = BcPeopleSerializer(data=creator_data)
-            # if serializer.is_valid():
-            #     _creator = serializer.save()
-            # else:  # invalid serializer
-            #     raise ValidationError({"get_or_create_person error": serializer.errors})
+        # else:
+        #     serializer = BcPeopleSerializer(data=creator_data)
+        #     if serializer.is_valid():
+        #         _creator = serializer.save()
+        #     else:  # invalid serializer
+        #         raise ValidationError({"get_or_create_person error": serializer.errors})
 
         # process recording
         recording_data = data.pop('recording')
@@ -87,76 +83,32 @@ class BcWebhookSerializer(serializers.ModelSerializer):
         return payload
 
     @staticmethod
-    def static_get_webhook_recording_types():
-        return ['Comment', 'Document', 'Message', 'Question::Answer', 'Schedule::Entry', 'Todo', 'Todolist', 'Upload',
-                'Vault', 'Client::Approval::Response', 'Client::Forward', 'Client::Reply', 'CloudFile',
-                'GoogleDocument', 'Inbox::Forward', 'Question']
-
-    @staticmethod
-    def static_get_webhook_recording_base_children_types():
-        return ["CloudFile", "GoogleDocument", "Inbox::Forward", "Client::Approval::Response", "Client::Forward",
-                "Client::Reply"]
-
-    @staticmethod
-    def static_get_webhook_recording_type_model_names():
-        return {
-            'CloudFile': 'BcCloudFile',
-            'GoogleDocument': 'BcGoogleDocument',
-            'Inbox::Forward': 'BcInboxForward',
-            'Client::Approval::Response': 'BcClientApprovalResponse',
-            'Client::Forward': 'BcClientForward',
-            'Client::Reply': 'BcClientReply',
-        }
-
-    @staticmethod
-    def static_get_type_model_names():
-        return {
-            'Comment': 'BcComment',
-            'Document': 'BcDocument',
-            'Message': 'BcMessage',
-            'Question': 'BcQuestion',
-            'Question::Answer': 'BcQuestionAnswer',
-            'Schedule::Entry': 'BcScheduleEntry',
-            'Todo': 'BcTodo',
-            'Todolist': 'BcTodolist',
-            'Upload': 'BcUpload',
-            'Vault': 'BcVault',
-        }
+    def get_not_found_message(data):
+        return f'{data["type"]} {data["id"]} not found. unable to create new {data["type"]} from data: {data}'
 
     @staticmethod
-    def static_get_not_found_message(data):
-        return f'{data["type"]} {data["id"]} not found. unable to create new {data["type"]} from data: {data}'
+    def get_type_error_message(recording):
+        return (f'recording {recording["id"]} type {recording["type"]} not in '
+                f'{registry_get_webhook_recording_types()}')
 
     def get_webhook_recording(self, recording):
+        # the types from the registry (bc.registry), empty if the app bc not installed
+        _type = registry_get(recording["type"])
 
-        type_model_names = self.static_get_type_model_names()
-
-        if recording["type"] in self.static_get_webhook_recording_base_children_types():
+        if _type and _type.is_webhook_base_child:
 
             _recording, _exception = self.get_webhook_recording_base_child(recording=recording)
             if not _recording:  # recording still not recorded on db, create webhook recording base child
                 _recording, _exception = self.create_webhook_recording_base_child(recording=recording)
 
-        elif recording["type"] in type_model_names.keys():
-
-            try:
-                app_config = django_apps.get_app_config(BcConfig.name)
-                app_model = django_apps.get_model(app_label=app_config.name,
-                                                  model_name=type_model_names[recording["type"]])
-                try:
-                    _exception = None  # assign _exception above _recording to comply the coverage :)
-                    _recording = app_model.objects.get(id=recording["id"])
-                except app_model.DoesNotExist:
-                    _recording = None
-                    _exception = self.static_get_not_found_message(recording)
-            except LookupError:
-                _recording = None
-                _exception = f'model not found for recording type {recording["type"]}'
-
-        else:
+        elif _type and _type.is_webhook_recording:
+
+            _recording = identity_map_get(_type.model, recording["id"])  # preloaded by webhook_queue_apply
+            _exception = None if _recording else self.get_not_found_message(recording)
+
+        else:  # unknown type, or app not installed
             _recording = None
-            _exception = (f'recording {recording["id"]} type {recording["type"]} not in '
-                          f'{self.static_get_webhook_recording_types()}')
+            _exception = self.get_type_error_message(recording)
 
         return _recording, _exception
 
@@ -164,24 +116,12 @@ class BcWebhookSerializer(serializers.ModelSerializer):
         if not parent:  # None
             return None, f'webhook recording has no parent'
 
-        type_model_names = self.static_get_type_model_names()
-
-        if parent["type"] not in type_model_names.keys():
+        _type = registry_get(parent["type"])
+        if not (_type and _type.is_webhook_recording):  # unknown type, or app not installed
             return None, f'webhook recording parent type unknown: {parent["type"]}'
 
-        try:
-            app_config = django_apps.get_app_config(BcConfig.name)
-            app_model = django_apps.get_model(app_label=app_config.name,
-                                              model_name=type_model_names[parent["type"]])
-            try:
-                _exception = None  # assign _exception above _parent to comply the coverage :)
-                _parent = app_model.objects.get(id=parent["id"])
-            except app_model.DoesNotExist:
-                _parent = None
-                _exception = self.static_get_not_found_message(parent)
-        except LookupError:
-            _parent = None
-            _exception = f'model not found for parent type {parent["type"]}'
+        _parent = identity_map_get(_type.model, parent["id"])  # preloaded by webhook_queue_apply
+        _exception = None if _parent else self.get_not_found_message(parent)
 
         return _parent, _exception
 
@@ -192,13 +132,9 @@ class BcWebhookSerializer(serializers.ModelSerializer):
         if not bucket["type"] == "Project":
             return None, f'webhook recording has no bucket type Project'
 
-        try:
-            _bucket = BcProject.objects.get(id=bucket["id"])
-            _exception = None
-        except BcProject.DoesNotExist:
-            # can not create BcProject from very limited data of recording bucket
-            _bucket = None
-            _exception = self.static_get_not_found_message(data=bucket)
+        _bucket = identity_map_get(BcProject, bucket["id"])
+        # can not create BcProject from very limited data of recording bucket
+        _exception = None if _bucket else self.get_not_found_message(data=bucket)
 
         return _bucket, _exception
 
@@ -208,42 +144,24 @@ class BcWebhookSerializer(serializers.ModelSerializer):
             return None, f'webhook recording has no creator'
 
         # can not use db_get_or_create_person as it would be circular import
-        try:
-            _creator = BcPeople.objects.get(id=creator["id"])
-            _exception = None
-        except BcPeople.DoesNotExist:
+        _creator = identity_map_get(BcPeople, creator["id"])
+        _exception = None
+        if not _creator:
             serializer = BcPeopleSerializer(data=creator)
             if serializer.is_valid():
                 _creator = serializer.save()
-                _exception = None
             else:  # invalid serializer
-                _creator = None
                 _exception = f'get_or_create_person error: {serializer.errors}'
 
         return _creator, _exception
 
     def get_webhook_recording_base_child(self, recording):
-        type_model_names = self.static_get_webhook_recording_type_model_names()
-
-        if recording["type"] in self.static_get_webhook_recording_base_children_types():
-            try:
-                app_config = django_apps.get_app_config(BcConfig.name)
-                app_model = django_apps.get_model(app_label=app_config.name,
-                                                  model_name=type_model_names[recording["type"]])
-                try:
-                    _exception = None  # assign _exception above _recording to comply the coverage :)
-                    _recording = app_model.objects.get(id=recording["id"])
-                except app_model.DoesNotExist:
-                    _recording = None
-                    _exception = self.static_get_not_found_message(recording)
-            except LookupError:
-                _recording = None
-                _exception = f'model not found for recording type {recording["type"]}'
-
-        else:
-            _recording = None
-            _exception = (f'recording {recording["id"]} type {recording["type"]} not in '
-                          f'{self.static_get_webhook_recording_base_children_types()}')
+        _type = registry_get(recording["type"])
+        if not (_type and _type.is_webhook_base_child):  # not a child of BcWebhookRecordingBase, or app not installed
+            return None, self.get_type_error_message(recording)
+
+        _recording = identity_map_get(_type.model, recording["id"])  # preloaded by webhook_queue_apply
+        _exception = None if _recording else self.get_not_found_message(recording)
 
         return _recording, _exception
 
@@ -258,25 +176,14 @@ class BcWebhookSerializer(serializers.ModelSerializer):
         :param _parent:
         :return:
         """
+        _type = registry_get(recording["type"])
+        if not (_type and _type.is_webhook_base_child):  # not a child of BcWebhookRecordingBase, or app not installed
+            return None, self.get_type_error_message(recording)
 
-        if recording["type"] in self.static_get_webhook_recording_base_children_types():
-            type_model_names = self.static_get_webhook_recording_type_model_names()
-            try:
-                app_config = django_apps.get_app_config(BcConfig.name)
-                app_model = django_apps.get_model(app_label=app_config.name,
-                                                  model_name=type_model_names[recording["type"]])
-                _recording = app_model.objects.create(bucket=_bucket, creator=_creator, parent=_parent, **recording)
-                _exception = None
-            except LookupError:
-                _recording = None
-                _exception = f'model not found for recording type {recording["type"]}'
-
-        else:
-            _recording = None
-            _exception = (f'recording {recording["id"]} type {recording["type"]} not in '
-                          f'{self.static_get_webhook_recording_base_children_types()}')
+        _recording = _type.model.objects.create(bucket=_bucket, creator=_creator, parent=_parent, **recording)
+        identity_map_add(_recording)  # the other webhooks of the recording in the batch link to it
 
-        return _recording, _exception
+        return _recording, None
 
     def create_webhook_recording_base_child(self, recording):
         # to create a child of BcWebhookRecordingBase, it needs: bucket, creator, parent.
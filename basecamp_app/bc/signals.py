@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from bc.cache import reference_cache_invalidate
+from bc.identity import identity_map_add, identity_map_invalidate
+from bc.models import BcProject, BcPeople, BcCompany, BcMessageCategory, BcProjectTool
+from bc.sqlite import sqlite_profile_apply, sqlite_profile_is_enabled
+
+# connected by BcConfig.ready()
+
+
+@receiver(post_save, sender=BcProject)
+@receiver(post_save, sender=BcPeople)
+@receiver(post_save, sender=BcCompany)
+def identity_map_on_save(sender, instance, **kwargs):
+    # the saved instance replaces a stale one loaded earlier in the scope
+    identity_map_add(instance)
+
+
+@receiver(post_delete, sender=BcProject)
+@receiver(post_delete, sender=BcPeople)
+@receiver(post_delete, sender=BcCompany)
+def identity_map_on_delete(sender, instance, **kwargs):
+    identity_map_invalidate(model=sender, pk=instance.pk)
+
+
+@receiver(post_save, sender=BcProject)
+@receiver(post_save, sender=BcPeople)
+@receiver(post_save, sender=BcCompany)
+@receiver(post_save, sender=BcMessageCategory)
+@receiver(post_save, sender=BcProjectTool)
+@receiver(post_delete, sender=BcProject)
+@receiver(post_delete, sender=BcPeople)
+@receiver(post_delete, sender=BcCompany)
+@receiver(post_delete, sender=BcMessageCategory)
+@receiver(post_delete, sender=BcProjectTool)
+def reference_cache_on_change(sender, instance, **kwargs):
+    reference_cache_invalidate(model=sender, pks=[instance.pk])
+    # again after commit, other process may cache the old row before the transaction committed
+    transaction.on_commit(lambda: reference_cache_invalidate(model=sender, pks=[instance.pk]))
+
+
+@receiver(connection_created)
+def sqlite_profile_on_connection_created(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite' and sqlite_profile_is_enabled(settings_dict=connection.settings_dict):
+        with connection.cursor() as cursor:
+            sqlite_profile_apply(cursor)
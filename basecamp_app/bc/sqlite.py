@@ -0,0 +1,70 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from contextlib import contextmanager
+from os import environ
+
+# opt-in SQLite performance profile for single-node deployments, applied to every new connection (bc.signals).
+# WAL lets the readers (gunicorn workers) go on while a writer (bc_sync, bc_webhook_worker) holds the lock, and the
+# busy timeout makes a blocked writer wait instead of failing with "database is locked".
+# enabled by env BASECAMP_SQLITE_PROFILE=1, or per database with DATABASES[alias]['BASECAMP_SQLITE_PROFILE'].
+# kept out of bc.utils, as bc.signals uses it.
+
+
+def sqlite_profile_is_enabled(settings_dict=None):
+    """
+    :param settings_dict: settings of the database connection, its BASECAMP_SQLITE_PROFILE key overrides the env
+    :return:
+    """
+    if settings_dict and 'BASECAMP_SQLITE_PROFILE' in settings_dict:
+        return bool(settings_dict['BASECAMP_SQLITE_PROFILE'])
+    return environ.get("BASECAMP_SQLITE_PROFILE") == "1"
+
+
+def static_get_sqlite_profile_pragmas():
+    """
+    configurable with environment variables:
+    * BASECAMP_SQLITE_MMAP_SIZE: bytes of the database file memory-mapped (default: 256 MiB)
+    * BASECAMP_SQLITE_CACHE_SIZE: page cache in KiB per connection (default: 64 MiB)
+    * BASECAMP_SQLITE_BUSY_TIMEOUT: milliseconds a connection waits for a lock (default: 20000)
+    :return: list of PRAGMA statements
+    """
+    return [
+        'PRAGMA journal_mode=WAL',  # persistent in the database file
+        'PRAGMA synchronous=NORMAL',  # durable on checkpoint, safe from corruption with WAL
+        f'PRAGMA mmap_size={int(environ.get("BASECAMP_SQLITE_MMAP_SIZE", 256 * 1024 * 1024))}',
+        f'PRAGMA cache_size=-{int(environ.get("BASECAMP_SQLITE_CACHE_SIZE", 64 * 1024))}',  # negative: in KiB
+        'PRAGMA temp_store=MEMORY',
+        f'PRAGMA busy_timeout={int(environ.get("BASECAMP_SQLITE_BUSY_TIMEOUT", 20000))}',
+    ]
+
+
+def sqlite_profile_apply(cursor):
+    """
+    :param cursor: cursor of a SQLite connection
+    :return:
+    """
+    for pragma in static_get_sqlite_profile_pragmas():
+        cursor.execute(pragma)
+
+
+@contextmanager
+def sqlite_database(alias, name, profile=None):
+    """
+    with sqlite_database(alias='bc_benchmark', name='/tmp/bc_benchmark.sqlite3', profile=True):
+        BcPeople.objects.using('bc_benchmark').count()
+
+    an extra SQLite database registered in django.db.connections for the block, eg: benchmark, tests.
+    the connections opened by other threads should be closed by these threads.
+    :param alias:
+    :param name: path of the database file
+    :param profile: apply the SQLite profile, None for the env BASECAMP_SQLITE_PROFILE
+    """
+    settings_dict = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    if profile is not None:
+        settings_dict['BASECAMP_SQLITE_PROFILE'] = profile
+    connections.settings[alias] = connections.configure_settings({DEFAULT_DB_ALIAS: settings_dict})[DEFAULT_DB_ALIAS]
+    try:
+        yield connections[alias]
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
@@ -0,0 +1,312 @@
+from django.apps import apps as django_apps
+from django.core.signals import setting_changed
+from django.db import models
+from django.dispatch import receiver
+from hashlib import blake2b
+from json import dumps as json_dumps
+from typing import Any, List, Union
+
+from bc.registry import registry_get_recording_types, static_get_registry_types
+
+try:
+    import msgspec
+except ImportError:  # optional, the plain slotted classes below
+    msgspec = None
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # optional, the stdlib json
+    from json import loads as json_loads
+
+# typed, slotted structs of the API data persisted by bc_sync (recordings, projects, people, etc.), built once by
+# BcConfig.ready() from the models: the persisted fields only, the unknown fields of the API data dropped at decode
+# time instead of the dicts copied and popped key by key.
+# decoded (and type checked) by msgspec if installed, else by orjson or json then copied into plain classes with
+# __slots__. a field absent from the API data is UNSET (falsy), not None, so it does not overwrite the saved value.
+# kept out of bc.utils, as the registry.
+
+if msgspec is not None:
+    UNSET = msgspec.UNSET
+    UnsetType = msgspec.UnsetType
+else:
+    class UnsetType:
+        """
+        the value of a field absent from the API data, as msgspec.UNSET
+        """
+        __slots__ = []
+
+        def __bool__(self):
+            return False
+
+        def __repr__(self):
+            return 'UNSET'
+
+    UNSET = UnsetType()
+
+
+class BcStruct:
+    """
+    base of the structs when msgspec not installed, the fields in __struct_fields__ as msgspec.Struct
+    """
+    __slots__ = []
+    __struct_fields__ = ()
+    __struct_nested__ = {}  # field name: (struct, many)
+
+    def __init__(self, **kwargs):
+        for name in self.__struct_fields__:
+            setattr(self, name, kwargs.get(name, UNSET))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__struct_fields__)
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__struct_fields__
+                           if getattr(self, name) is not UNSET)
+        return f'{type(self).__name__}({fields})'
+
+
+_structs = {}  # struct name: struct
+_decoders = {}  # (struct name, many): msgspec.json.Decoder
+
+
+def static_get_struct_field_type(field):
+    """
+    :param field: concrete field of a model, not relation
+    :return: python type of the field in the API data
+    """
+    if isinstance(field, models.BooleanField):
+        return bool
+    if isinstance(field, models.IntegerField):  # also BigIntegerField, PositiveIntegerField and auto fields
+        return int
+    if isinstance(field, (models.CharField, models.TextField, models.DateField)):  # dates parsed by the models
+        return str
+    return Any  # eg: JSONField
+
+
+def static_get_struct_internal_fields():
+    """
+    :return: names of the model fields not in the API data, left out of the structs
+    """
+    return ['payload_hash']
+
+
+def static_get_struct_nested():
+    """
+    :return: dict {field name: (struct name, many)} of the nested objects of the API data
+    """
+    return {
+        'bucket': ('Ref', False),
+        'parent': ('Ref', False),
+        'category': ('MessageCategory', False),
+        'company': ('Company', False),
+        'creator': ('Person', False),
+        'assignees': ('Person', True),
+        'completion_subscribers': ('Person', True),
+        'participants': ('Person', True),
+        'completion': ('Completion', False),
+        'schedule': ('RecurrenceSchedule', False),
+        'repetition_schedule': ('RecurrenceSchedule', False),
+        'recurrence_schedule': ('RecurrenceSchedule', False),
+        'dock': ('ProjectTool', True),
+    }
+
+
+def static_get_struct_models():
+    """
+    :return: list of (struct name, model name, names of the extra fields), nested structs before the ones using them.
+             the struct of a recording is named by its Basecamp type (eg: 'Schedule::Entry'), see struct_get_recording
+    """
+    model_names = {bc_type: model_name for bc_type, model_name, _url_name, _url_kwarg, _kwargs
+                   in static_get_registry_types()}
+    return [
+        ('Company', 'BcCompany', []),
+        ('Person', 'BcPeople', ['company']),
+        ('RecurrenceSchedule', 'BcRecurrenceSchedule', []),
+        ('Completion', 'BcTodoCompletion', ['creator']),
+        ('ProjectTool', 'BcProjectTool', []),
+        ('Project', 'BcProject', ['dock']),
+        ('MessageCategory', 'BcMessageCategory', []),
+    ] + [(bc_type, model_names[bc_type], ['bucket', 'creator', 'parent', 'category', 'assignees',
+                                          'completion_subscribers', 'participants', 'completion', 'schedule',
+                                          'repetition_schedule', 'recurrence_schedule'])
+         for bc_type in registry_get_recording_types()]
+
+
+def _struct_define(name, fields, nested):
+    """
+    :param name: struct name
+    :param fields: list of (field name, type)
+    :param nested: dict {field name: (struct, many)}
+    :return: msgspec.Struct, or BcStruct if msgspec not installed
+    """
+    if msgspec is not None:
+        return msgspec.defstruct(name.replace('::', ''),
+                                 [(field, Any if _type is Any else Union[_type, None, UnsetType], UNSET)
+                                  for field, _type in fields], kw_only=True, module=__name__)
+    field_names = tuple(field for field, _type in fields)
+    return type(name.replace('::', ''), (BcStruct,), {'__slots__': field_names, '__struct_fields__': field_names,
+                                                       '__struct_nested__': nested, '__module__': __name__})
+
+
+def struct_build():
+    """
+    (re)build the structs from the installed models, empty if the app bc not installed
+    :return:
+    """
+    structs = {}
+    if django_apps.is_installed('bc'):
+        structs['Ref'] = _struct_define(name='Ref', fields=[('id', int), ('type', str)], nested={})
+        nested_names = static_get_struct_nested()
+        for name, model_name, extra_names in static_get_struct_models():
+            model = django_apps.get_model('bc', model_name)
+            model_field_names = [field.name for field in model._meta.get_fields()]
+            fields = [(field.name, static_get_struct_field_type(field)) for field in model._meta.concrete_fields
+                      if not field.is_relation and field.name not in static_get_struct_internal_fields()]
+            nested = {}
+            for extra_name in extra_names:
+                if extra_name in model_field_names:  # also the GenericForeignKey parent
+                    nested_name, many = nested_names[extra_name]
+                    nested[extra_name] = (structs[nested_name], many)
+                    fields.append((extra_name, List[structs[nested_name]] if many else structs[nested_name]))
+            structs[name] = _struct_define(name=name, fields=fields, nested=nested)
+
+    _structs.clear()
+    _structs.update(structs)
+    _decoders.clear()
+
+
+@receiver(setting_changed)
+def struct_on_setting_changed(setting, **kwargs):
+    if setting == 'INSTALLED_APPS':  # eg: override_settings in tests
+        struct_build()
+
+
+def struct_get(name):
+    """
+    :param name: struct name, eg: 'Project', 'Person', or the Basecamp type of a recording, eg: 'Todo'
+    :return: the struct, KeyError if unknown
+    """
+    return _structs[name]
+
+
+def struct_get_recording(data):
+    """
+    :param data: json data of a recording
+    :return: the struct of the Basecamp type of the recording, KeyError if unknown
+    """
+    return _structs[data["type"]]
+
+
+def _struct_convert(data, struct):
+    if not isinstance(data, dict):
+        raise ValueError(f'expected an object for {struct.__name__}, got {type(data).__name__}')
+
+    kwargs = {}
+    for name in struct.__struct_fields__:
+        if name in data:
+            value = data[name]
+            if name in struct.__struct_nested__ and value is not None:
+                nested, many = struct.__struct_nested__[name]
+                value = ([_struct_convert(data=item, struct=nested) for item in value] if many else
+                         _struct_convert(data=value, struct=nested))
+            kwargs[name] = value
+    return struct(**kwargs)
+
+
+def struct_convert(data, struct):
+    """
+    :param data: json data already decoded, eg: a record of bc_api_iter_json
+    :param struct: eg: struct_get('Project')
+    :return: the struct, ValueError if the data does not fit
+    """
+    if msgspec is not None:
+        try:
+            return msgspec.convert(data, type=struct)
+        except msgspec.ValidationError as e:
+            raise ValueError(str(e)) from e
+    return _struct_convert(data=data, struct=struct)
+
+
+def struct_decode(content, name, many=False):
+    """
+    decode the body of an API straight into the structs
+    :param content: bytes of json
+    :param name: struct name, see struct_get
+    :param many: the body is a list
+    :return: the struct or list of structs, ValueError if the body is not json or does not fit
+    """
+    struct = struct_get(name)
+    if msgspec is not None:
+        decoder = _decoders.get((name, many))
+        if decoder is None:
+            decoder = _decoders[(name, many)] = msgspec.json.Decoder(List[struct] if many else struct)
+        try:
+            return decoder.decode(content)
+        except msgspec.DecodeError as e:  # also ValidationError
+            raise ValueError(str(e)) from e
+
+    data = json_loads(content)
+    if not many:
+        return _struct_convert(data=data, struct=struct)
+    if not isinstance(data, list):
+        raise ValueError(f'expected a list of {struct.__name__}, got {type(data).__name__}')
+    return [_struct_convert(data=item, struct=struct) for item in data]
+
+
+def struct_get_fields(struct, names):
+    """
+    :param struct:
+    :param names: field names, eg: the model fields
+    :return: dict {name: value} of the fields set (not UNSET) in the API data
+    """
+    fields = {}
+    for name in names:
+        value = getattr(struct, name, UNSET)
+        if value is not UNSET:
+            fields[name] = value
+    return fields
+
+
+def struct_to_data(struct):
+    """
+    :param struct:
+    :return: json data of the fields set (not UNSET), eg: for the serializers
+    """
+    data = {}
+    for name in struct.__struct_fields__:
+        value = getattr(struct, name)
+        if value is UNSET:
+            continue
+        if isinstance(value, list):
+            value = [struct_to_data(item) if hasattr(item, '__struct_fields__') else item for item in value]
+        elif hasattr(value, '__struct_fields__'):
+            value = struct_to_data(value)
+        data[name] = value
+    return data
+
+
+def _struct_normalize(value, refs):
+    if isinstance(value, list):
+        return [_struct_normalize(item, refs) for item in value]
+    if not hasattr(value, '__struct_fields__'):
+        return value
+    if type(value) in refs:
+        return value.id
+    return {name: _struct_normalize(getattr(value, name), refs) for name in value.__struct_fields__
+            if getattr(value, name) is not UNSET}
+
+
+def struct_hash(struct, refs=('Person',)):
+    """
+    compact hash of the API data, stored as payload_hash to skip the writes of the records not changed since saved
+    :param struct:
+    :param refs: struct names of the nested objects saved on their own rows, reduced to their id. eg: the creator of
+                 a recording is not updated with the recording
+    :return: hex digest, 32 characters
+    """
+    refs = tuple(_structs[name] for name in refs if name in _structs)
+    payload = {name: _struct_normalize(getattr(struct, name), refs) for name in struct.__struct_fields__
+               if getattr(struct, name) is not UNSET}
+    return blake2b(json_dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode(),
+                   digest_size=16).hexdigest()
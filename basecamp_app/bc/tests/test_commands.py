@@ -0,0 +1,442 @@
+from django.test import TestCase
+from django.core.management import call_command, CommandError
+from django.core.cache import caches
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from os import environ
+from io import StringIO, BytesIO
+from unittest.mock import patch
+from pathlib import Path
+from json import load as json_stream_load, dumps as json_dumps
+from requests import Response
+from copy import deepcopy
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import bc.structs
+import bc.utils
+from bc.management.commands.bc_sync import Command as BcSyncCommand
+from bc.cache import static_get_reference_models
+from bc.identity import identity_map_scope
+from bc.models import (BcPeople, BcProject, BcMessageCategory, BcMessageBoard, BcMessage, BcComment, BcSchedule,
+                       BcScheduleEntry, BcTodoset, BcTodolist, BcTodo, BcVault, BcUpload, BcSyncState, BcWebhook,
+                       BcWebhookQueue, BcCloudFile)
+from bc.serializers import BcWebhookSerializer
+
+
+class CommandBcSyncTest(TestCase):
+    # the people of sample API data, some of them (assignees) without company field
+    fixtures = ["bc_bccompany", "bc_bcpeople"]
+
+    @classmethod
+    def setUpTestData(cls):  # Run once to set up non-modified data for all class methods
+        environ["BASECAMP_API_URI"] = "https://3.basecampapi.com"
+        environ["BASECAMP_ACCOUNT_ID"] = "999999999"
+
+        # api_sample.json is collections of API data from bc3-api site https://github.com/basecamp/bc3-api/tree/master
+        test_dir = Path(__file__).resolve().parent
+        with open(test_dir / "api_sample.json") as stream:
+            cls.api_sample_json = json_stream_load(stream)
+
+    def setUp(self):  # Run once for every test method to set up clean data
+        caches["bc_reference"].clear()  # the sync workers (threads, out of the test transaction) fill it
+        sample = self.api_sample_json
+        bucket_id = 2085958499
+        # the API of project 2085958499, its dock has message_board, todoset, vault and schedule enabled
+        self.api = {
+            bc.utils.api_people_get_all_people_uri(): [sample["person"]["1049715914"]],
+            bc.utils.api_project_get_all_projects_uri(): [sample["project"]["2085958499"]],
+            bc.utils.api_message_get_bucket_message_types_uri(bucket_id=bucket_id):
+                [sample["message_category"]["823758531"]],
+            bc.utils.api_message_get_bucket_message_board_uri(bucket_id=bucket_id, message_board_id=1069479338):
+                sample["message_board"]["1069479338"],
+            bc.utils.api_message_get_bucket_message_board_messages_uri(bucket_id=bucket_id,
+                                                                       message_board_id=1069479338):
+                [sample["message"]["1069479351"]],
+            bc.utils.api_recording_get_bucket_recording_parent_comment_uri(bucket_id=bucket_id, parent_id=1069479351):
+                [sample["comment"]["1069479361"]],
+            bc.utils.api_todoset_get_bucket_todoset_uri(bucket_id=bucket_id, todoset_id=1069479339):
+                sample["todoset"]["1069479339"],
+            bc.utils.api_todolist_get_bucket_todoset_todolists_uri(bucket_id=bucket_id, todoset_id=1069479339):
+                [sample["todolist"]["1069479520"]],
+            bc.utils.api_todolist_group_get_todolist_groups_uri(bucket_id=bucket_id, todolist_id=1069479520): [],
+            bc.utils.api_todo_get_bucket_todolist_todos_uri(bucket_id=bucket_id, todolist_id=1069479520):
+                [sample["todo"]["1069479523"]],
+            bc.utils.api_todo_get_bucket_todolist_todos_uri(bucket_id=bucket_id, todolist_id=1069479520) +
+            '?completed=true': [],
+            bc.utils.api_vault_get_bucket_vault_uri(bucket_id=bucket_id, vault_id=1069479340):
+                sample["vault"]["1069479340"],
+            bc.utils.api_vault_get_bucket_vault_documents_uri(bucket_id=bucket_id, vault_id=1069479340): [],
+            bc.utils.api_vault_get_bucket_vault_uploads_uri(bucket_id=bucket_id, vault_id=1069479340):
+                [sample["upload"]["1069479848"]],
+            bc.utils.api_vault_get_bucket_vault_vaults_uri(bucket_id=bucket_id, vault_id=1069479340): [],
+            bc.utils.api_schedule_get_bucket_schedule_uri(bucket_id=bucket_id, schedule_id=1069479342):
+                sample["schedule"]["1069479342"],
+            bc.utils.api_schedule_get_bucket_schedule_entries_uri(bucket_id=bucket_id, schedule_id=1069479342):
+                [sample["schedule_entry"]["1069479847"]],
+        }
+        self.next_pages = {}
+        self.requested = []
+
+        # the recordings API sorted by updated_at desc, empty for the types other than Todo
+        for recording_type in bc.utils.static_get_recording_types():
+            self.api[bc.utils.api_recording_get_recordings_uri(
+                recording_type=recording_type, sort='updated_at', direction='desc')] = []
+        todos_uri = bc.utils.api_recording_get_recordings_uri(recording_type='Todo', sort='updated_at',
+                                                              direction='desc')
+        self.api[todos_uri] = [dict(sample["todo"]["1069479523"], updated_at='2030-01-01T00:00:00Z')]
+        self.api[f'{todos_uri}&page=2'] = [sample["todo"]["1069479523"]]
+        self.next_pages[todos_uri] = f'{todos_uri}&page=2'
+
+    def mock_bc_api_get(self, uri, access_token, stream=False):
+        self.requested.append(uri)
+        response = Response()
+        response.status_code = 200 if uri in self.api else 404
+        response._content = json_dumps(self.api.get(uri)).encode()
+        if stream:  # read by bc_api_iter_json in chunks
+            response._content = False
+            response.raw = BytesIO(json_dumps(self.api.get(uri)).encode())
+        # the next page of the uri, if any
+        if uri in self.next_pages:
+            response.headers["Link"] = f'<{self.next_pages[uri]}>; rel="next"'
+        return response
+
+    def call_bc_sync(self, *args):
+        out = StringIO()
+        with patch('bc.management.commands.bc_sync.bc_api_get', side_effect=self.mock_bc_api_get):
+            with patch('bc.utils.api.bc_api_get', side_effect=self.mock_bc_api_get):
+                call_command('bc_sync', '--access-token', 'access token', '--concurrency', '1', *args,
+                             stdout=out, stderr=out)
+        return out.getvalue()
+
+    def test_bc_sync(self):
+        out = self.call_bc_sync()
+        self.assertIn('synced 13 records (0 unchanged, 0 errors) with 17 requests', out)
+        self.assertIn('written 11 inserted, 1 updated, 0 not written', out)  # the person of the fixtures
+
+        self.assertTrue(BcPeople.objects.filter(id=1049715914).exists())
+        self.assertEqual(BcProject.objects.get(id=2085958499).dock.count(), 8)
+        for model, record_id in [(BcMessageCategory, 823758531), (BcMessageBoard, 1069479338),
+                                 (BcMessage, 1069479351), (BcComment, 1069479361), (BcTodoset, 1069479339),
+                                 (BcTodolist, 1069479520), (BcTodo, 1069479523), (BcVault, 1069479340),
+                                 (BcUpload, 1069479848), (BcSchedule, 1069479342), (BcScheduleEntry, 1069479847)]:
+            self.assertTrue(model.objects.filter(id=record_id).exists(), f'{model.__name__} {record_id}')
+        self.assertEqual(BcTodo.objects.get(id=1069479523).assignees.count(), 1)
+
+        # rerun, the records not updated after the high-water marks are not written, their child lists still walked
+        out = self.call_bc_sync()
+        self.assertIn('synced 1 records (12 unchanged, 0 errors) with 17 requests', out)  # people always synced
+
+        # a new todo under the unchanged todolist is saved
+        todos_uri = bc.utils.api_todo_get_bucket_todolist_todos_uri(bucket_id=2085958499, todolist_id=1069479520)
+        self.api[todos_uri] = self.api[todos_uri] + [
+            dict(self.api_sample_json["todo"]["1069479523"], id=1, updated_at='2029-01-01T00:00:00Z')]
+        out = self.call_bc_sync()
+        self.assertIn('synced 2 records (12 unchanged, 0 errors)', out)
+        self.assertTrue(BcTodo.objects.filter(id=1, parent_object_id=1069479520).exists())
+        self.api[todos_uri] = self.api[todos_uri][:1]
+        BcTodo.objects.filter(id=1).delete()
+
+        # the updated todo is saved again, the todolist (parent) updated_at also changed
+        todolists_uri = bc.utils.api_todolist_get_bucket_todoset_todolists_uri(bucket_id=2085958499,
+                                                                              todoset_id=1069479339)
+        self.api[todolists_uri] = [
+            dict(self.api_sample_json["todolist"]["1069479520"], updated_at='2030-01-01T00:00:00Z')]
+        self.api[bc.utils.api_todo_get_bucket_todolist_todos_uri(bucket_id=2085958499, todolist_id=1069479520)] = [
+            dict(self.api_sample_json["todo"]["1069479523"], title='new title', updated_at='2030-01-01T00:00:00Z')]
+        out = self.call_bc_sync()
+        self.assertIn('synced 3 records (10 unchanged, 0 errors)', out)
+        self.assertIn('written 0 inserted, 2 updated, 1 not written', out)  # people not changed
+        self.assertEqual(BcTodo.objects.get(id=1069479523).title, 'new title')
+
+        # full sync ignores the high-water marks
+        out = self.call_bc_sync('--full')
+        self.assertIn('synced 13 records (0 unchanged, 0 errors)', out)
+        self.assertIn('written 0 inserted, 0 updated, 12 not written', out)  # the payload hashes not changed
+        self.assertEqual(BcTodo.objects.count(), 1)
+
+    def test_bc_sync_with_recordings(self):
+        todos_uri = bc.utils.api_recording_get_recordings_uri(recording_type='Todo', sort='updated_at',
+                                                              direction='desc')
+        # the parent of the todos not in db, not saved and the cursor not moved
+        out = self.call_bc_sync('--recordings')
+        self.assertIn('Todo 1069479523: parent Todolist 1069479520 not in db', out)
+        self.assertIn('synced 2 records (0 unchanged, 2 errors)', out)
+        self.assertFalse(BcTodo.objects.exists())
+        self.assertFalse(BcSyncState.objects.filter(resource='recordings:Todo').exists())
+
+        # the todolist saved by a sync of the projects
+        self.call_bc_sync()
+        BcTodo.objects.all().delete()
+
+        # people, projects, the recordings of 9 types and the second page of todos
+        out = self.call_bc_sync('--recordings')
+        self.assertIn('synced 3 records (1 unchanged, 0 errors) with 12 requests', out)  # the project not changed
+        self.assertEqual(str(BcSyncState.objects.get(resource='recordings:Todo').updated_at),
+                         '2030-01-01 00:00:00+00:00')
+
+        # rerun, stop at the first page of todos, as the first record is not updated after the cursor
+        self.requested = []
+        out = self.call_bc_sync('--recordings')
+        self.assertIn(todos_uri, self.requested)
+        self.assertNotIn(f'{todos_uri}&page=2', self.requested)
+        self.assertIn('synced 1 records (1 unchanged, 0 errors) with 11 requests', out)
+
+        # the changed todo at the top of the feed is saved
+        self.api[todos_uri] = [dict(self.api_sample_json["todo"]["1069479523"], title='new title',
+                                    updated_at='2031-01-01T00:00:00Z')] + self.api[todos_uri]
+        out = self.call_bc_sync('--recordings')
+        self.assertIn('synced 2 records (1 unchanged, 0 errors) with 11 requests', out)
+        self.assertEqual(BcTodo.objects.get(id=1069479523).title, 'new title')
+
+    def test_bc_sync_with_api_error(self):
+        # the schedule entries not OK, the high-water mark of the projects not moved
+        self.api.pop(bc.utils.api_schedule_get_bucket_schedule_entries_uri(bucket_id=2085958499,
+                                                                           schedule_id=1069479342))
+        out = self.call_bc_sync()
+        self.assertIn('1 errors', out)
+        self.assertFalse(BcSyncState.objects.filter(resource__endswith='/projects.json').exists())
+        self.assertTrue(BcSyncState.objects.filter(resource__endswith='/todos.json').exists())
+
+    def test_bc_sync_project_worker_closes_connection(self):
+        # the db connection of a worker thread closed after each project, even if CONN_MAX_AGE keeps it
+        command = BcSyncCommand()
+        command.stderr = StringIO()
+        command.stats = {'errors': 0}
+        command.stats_lock = Lock()
+        project = bc.structs.struct_convert(self.api_sample_json["project"]["2085958499"],
+                                            struct=bc.structs.struct_get('Project'))
+        with patch.object(BcSyncCommand, 'sync_project', return_value=True):
+            with patch('bc.management.commands.bc_sync.connection') as _connection:
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    self.assertTrue(executor.submit(command.sync_project_worker, project, True).result())
+                _connection.close.assert_called_once_with()
+
+                command.sync_project_worker(project=project, changed=True)  # main thread, kept
+                _connection.close.assert_called_once_with()
+
+    def test_bc_sync_without_access_token(self):
+        with patch.dict(environ, {}, clear=False):
+            environ.pop("BASECAMP_ACCESS_TOKEN", None)
+            with self.assertRaises(CommandError):
+                call_command('bc_sync', '--access-token', '')
+
+
+class CommandBcCacheWarmUpTest(TestCase):
+    fixtures = ["bc_bccompany", "bc_bcpeople", "bc_bcproject", "bc_bcprojecttool", "bc_bcmessagecategory"]
+
+    def setUp(self):  # Run once for every test method to set up clean data
+        caches["bc_reference"].clear()
+
+    def tearDown(self):
+        caches["bc_reference"].clear()
+
+    def test_bc_cache_warm_up(self):
+        out = StringIO()
+        call_command('bc_cache_warm_up', stdout=out)
+        count = sum(model.objects.count() for model in static_get_reference_models())
+        self.assertIn(f'cached {count} reference rows', out.getvalue())
+
+    def test_bc_cache_warm_up_disabled(self):
+        out = StringIO()
+        with patch.dict(environ, {"BASECAMP_REFERENCE_CACHE": "none"}):
+            call_command('bc_cache_warm_up', stdout=out)
+        self.assertIn('reference cache disabled', out.getvalue())
+
+
+class CommandBcSqliteBenchmarkTest(TestCase):
+
+    def test_bc_sqlite_benchmark(self):
+        out = StringIO()
+        call_command('bc_sqlite_benchmark', '--duration=0.2', '--rows=50', '--readers=1', '--batch-size=5', stdout=out)
+        self.assertRegex(out.getvalue(), r'default: \d+ reads \(p50 [\d.]+ ms')
+        self.assertRegex(out.getvalue(), r'profile: \d+ reads \(p50 [\d.]+ ms')
+        self.assertNotIn('bc_sqlite_benchmark', connections.settings)
+
+    def test_bc_sqlite_benchmark_with_invalid_readers(self):
+        with self.assertRaises(CommandError):
+            call_command('bc_sqlite_benchmark', '--readers=0')
+
+
+class CommandBcTemplateBenchmarkTest(TestCase):
+
+    def test_bc_template_benchmark(self):
+        out = StringIO()
+        call_command('bc_template_benchmark', '--renders=5', stdout=out)
+        self.assertRegex(out.getvalue(), r'compiled per render: [\d.]+ us per render \(15 renders')
+        self.assertRegex(out.getvalue(), r'cached: [\d.]+ us per render \(15 renders')
+        self.assertIn('hits=12, misses=3', out.getvalue())  # each template compiled once
+
+    def test_bc_template_benchmark_with_invalid_renders(self):
+        with self.assertRaises(CommandError):
+            call_command('bc_template_benchmark', '--renders=0')
+
+
+class CommandBcWebhookWorkerTest(TestCase):
+    fixtures = ["bc_bccompany", "bc_bcpeople", "bc_bcproject", "bc_bcprojecttool",
+                "bc_bcvault", "bc_bctodolist"]
+
+    @classmethod
+    def setUpTestData(cls):  # Run once to set up non-modified data for all class methods
+        # api_sample.json is collections of API data from bc3-api site https://github.com/basecamp/bc3-api/tree/master
+        test_dir = Path(__file__).resolve().parent
+        with open(test_dir / "api_sample.json") as stream:
+            cls.api_sample_json = json_stream_load(stream)
+
+    def setUp(self):  # Run once for every test method to set up clean data
+        caches["bc_reference"].clear()  # the worker threads (out of the test transaction) fill it
+
+    def call_bc_webhook_worker(self, *args):
+        out = StringIO()
+        call_command('bc_webhook_worker', '--once', '--workers', '1', *args, stdout=out, stderr=out)
+        return out.getvalue()
+
+    def test_bc_webhook_worker(self):
+        for webhook_id in ["1479523571", "1479523572"]:
+            bc.utils.webhook_queue_put(payload=self.api_sample_json["webhook"][webhook_id])
+
+        out = self.call_bc_webhook_worker()
+        self.assertIn('processed 2 webhooks (2 done, 0 retried, 0 failed)', out)
+        self.assertEqual(BcWebhook.objects.count(), 2)
+        self.assertEqual(BcWebhookQueue.objects.filter(status=BcWebhookQueue.STATUS_DONE).count(), 2)
+
+        # nothing available
+        out = self.call_bc_webhook_worker()
+        self.assertIn('processed 0 webhooks', out)
+
+    def test_bc_webhook_worker_with_saved_webhook(self):
+        # saved before (eg: the worker died before marking it done), not saved twice
+        webhook = self.api_sample_json["webhook"]["1479523571"]
+        bc.utils.webhook_queue_put(payload=webhook)
+        serializer = BcWebhookSerializer(data=deepcopy(webhook))
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+
+        out = self.call_bc_webhook_worker()
+        self.assertIn('processed 1 webhooks (1 done, 0 retried, 0 failed)', out)
+        self.assertEqual(BcWebhook.objects.count(), 1)
+
+    def test_bc_webhook_worker_with_retry(self):
+        # recording without bucket, invalid serializer
+        webhook = deepcopy(self.api_sample_json["webhook"]["1479523571"])
+        webhook["recording"].pop('bucket')
+        bc.utils.webhook_queue_put(payload=webhook)
+
+        out = self.call_bc_webhook_worker('--max-attempts', '2', '--backoff', '0')
+        self.assertIn('processed 2 webhooks (0 done, 1 retried, 1 failed)', out)
+        _item = BcWebhookQueue.objects.get(webhook_id=webhook["id"])
+        self.assertEqual(_item.status, BcWebhookQueue.STATUS_FAILED)
+        self.assertEqual(_item.attempts, 2)
+        self.assertIn('webhook recording bucket error', _item.error)
+
+    def test_bc_webhook_worker_with_retry_later(self):
+        webhook = deepcopy(self.api_sample_json["webhook"]["1479523571"])
+        webhook["recording"].pop('bucket')
+        bc.utils.webhook_queue_put(payload=webhook)
+
+        # the retry is not available before the backoff
+        out = self.call_bc_webhook_worker('--backoff', '60')
+        self.assertIn('processed 1 webhooks (0 done, 1 retried, 0 failed)', out)
+        self.assertEqual(BcWebhookQueue.objects.get(webhook_id=webhook["id"]).status, BcWebhookQueue.STATUS_PENDING)
+
+    def queue_cloud_file_burst(self, count, first_id=1):
+        # a burst of webhooks on the same cloud file, the cloud file not in db yet
+        for i in range(count):
+            bc.utils.webhook_queue_put(payload=dict(deepcopy(self.api_sample_json["webhook"]["1479523572"]),
+                                                    id=first_id + i, created_at=f'2022-11-15T14:{i:02d}:00.000+07:00'))
+
+    def test_bc_webhook_worker_with_batch_apply(self):
+        self.queue_cloud_file_burst(count=10)
+        bc.utils.webhook_queue_put(payload=self.api_sample_json["webhook"]["1479523571"])
+
+        out = self.call_bc_webhook_worker('--batch-apply')
+        self.assertIn('processed 11 webhooks (11 done, 0 retried, 0 failed)', out)
+        self.assertEqual(BcWebhook.objects.count(), 11)
+        self.assertEqual(BcCloudFile.objects.count(), 1)
+        self.assertEqual(BcWebhook.objects.filter(recording_object_id=968814336).count(), 10)
+        self.assertEqual(BcWebhookQueue.objects.filter(status=BcWebhookQueue.STATUS_DONE).count(), 11)
+
+    def test_webhook_queue_apply_queries(self):
+        # the number of queries does not grow with the webhooks of the batch
+        def apply_queries(count, first_id):
+            self.queue_cloud_file_burst(count=count, first_id=first_id)
+            with identity_map_scope(), CaptureQueriesContext(connection) as queries:
+                items = bc.utils.webhook_queue_claim(worker_id='worker')
+                statuses = bc.utils.webhook_queue_apply(items=items)
+            self.assertEqual(statuses, [BcWebhookQueue.STATUS_DONE] * count)
+            return len(queries)
+
+        apply_queries(count=1, first_id=1)  # create the cloud file
+        self.assertEqual(apply_queries(count=3, first_id=100), apply_queries(count=30, first_id=200))
+
+    def test_webhook_queue_apply_with_invalid_and_saved_webhook(self):
+        webhook = deepcopy(self.api_sample_json["webhook"]["1479523571"])
+        webhook["recording"].pop('bucket')
+        bc.utils.webhook_queue_put(payload=webhook)
+        self.queue_cloud_file_burst(count=2)
+        # the first webhook of the burst saved before, eg: the worker died before marking it done
+        serializer = BcWebhookSerializer(data=dict(deepcopy(self.api_sample_json["webhook"]["1479523572"]), id=1))
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+
+        with identity_map_scope():
+            items = bc.utils.webhook_queue_claim(worker_id='worker')
+            statuses = bc.utils.webhook_queue_apply(items=items, backoff=60)
+        self.assertEqual(statuses, [BcWebhookQueue.STATUS_PENDING, BcWebhookQueue.STATUS_DONE,
+                                    BcWebhookQueue.STATUS_DONE])
+        self.assertEqual(BcWebhook.objects.count(), 2)
+        self.assertEqual(BcCloudFile.objects.count(), 1)
+
+    def test_webhook_queue_apply_with_invalid_webhook_rolled_back(self):
+        def validate(attrs):  # the webhook 2 invalid, after its recording created in to_internal_value
+            if attrs["id"] == 2:
+                raise ValidationError('invalid webhook')
+            return attrs
+
+        # the latest webhook of the cloud file is invalid, the cloud file it created is rolled back
+        self.queue_cloud_file_burst(count=2)
+        with identity_map_scope(), patch.object(BcWebhookSerializer, 'validate', side_effect=validate):
+            items = bc.utils.webhook_queue_claim(worker_id='worker')
+            statuses = bc.utils.webhook_queue_apply(items=items, backoff=0)
+        self.assertEqual(statuses, [BcWebhookQueue.STATUS_DONE, BcWebhookQueue.STATUS_PENDING])
+        self.assertEqual(list(BcWebhook.objects.values_list('id', flat=True)), [1])
+        self.assertEqual(BcWebhook.objects.get(id=1).recording.id, 968814336)  # created by the older webhook
+
+        # only the invalid webhook, no cloud file kept
+        BcCloudFile.objects.all().delete()
+        with identity_map_scope(), patch.object(BcWebhookSerializer, 'validate', side_effect=validate):
+            statuses = bc.utils.webhook_queue_apply(items=bc.utils.webhook_queue_claim(worker_id='worker'))
+        self.assertEqual(statuses, [BcWebhookQueue.STATUS_PENDING])
+        self.assertFalse(BcCloudFile.objects.exists())
+
+    def test_webhook_queue_apply_updates_saved_recording(self):
+        self.queue_cloud_file_burst(count=1)
+        with identity_map_scope():
+            bc.utils.webhook_queue_apply(items=bc.utils.webhook_queue_claim(worker_id='worker'))
+
+        # the cloud file renamed twice, updated to its latest state
+        for webhook_id, title, updated_at in [(2, 'Renamed', '2022-11-16T10:00:00.000+07:00'),
+                                              (3, 'Renamed again', '2022-11-17T10:00:00.000+07:00')]:
+            webhook = deepcopy(self.api_sample_json["webhook"]["1479523572"])
+            webhook.update(id=webhook_id, created_at=updated_at)
+            webhook["recording"].update(title=title, updated_at=updated_at)
+            bc.utils.webhook_queue_put(payload=webhook)
+
+        with identity_map_scope():
+            statuses = bc.utils.webhook_queue_apply(items=bc.utils.webhook_queue_claim(worker_id='worker'))
+        self.assertEqual(statuses, [BcWebhookQueue.STATUS_DONE] * 2)
+        _cloud_file = BcCloudFile.objects.get(id=968814336)
+        self.assertEqual(_cloud_file.title, 'Renamed again')
+        self.assertEqual(_cloud_file.updated_at, parse_datetime('2022-11-17T10:00:00.000+07:00'))
+        self.assertEqual(BcWebhook.objects.filter(recording_object_id=968814336).count(), 3)
+
+    def test_bc_webhook_worker_reclaim(self):
+        bc.utils.webhook_queue_put(payload=self.api_sample_json["webhook"]["1479523571"])
+        self.assertEqual(len(bc.utils.webhook_queue_claim(worker_id='dead worker')), 1)
+        self.assertEqual(bc.utils.webhook_queue_claim(worker_id='other worker'), [])  # claimed
+
+        # the worker died, claimed by other worker after the claim timeout
+        self.assertEqual(len(bc.utils.webhook_queue_claim(worker_id='other worker', claim_timeout=-1)), 1)
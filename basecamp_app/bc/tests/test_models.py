@@ -1,4 +1,7 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from pathlib import Path
 from json import loads as json_loads, dumps as json_dumps, load as json_stream_load
@@ -6,7 +9,8 @@ from json import loads as json_loads, dumps as json_dumps, load as json_stream_l
 from bc.models import (BcCompany, BcPeople, BcProjectTool, BcProject, BcQuestionnaire, BcQuestion,
                        BcQuestionAnswer, BcSchedule, BcScheduleEntry, BcTodoset, BcTodolist, BcTodo,
                        BcMessageCategory, BcMessageBoard, BcMessage, BcVault, BcDocument, BcUpload, BcComment,
-                       BcWebhook)
+                       BcWebhook, BcCloudFile, BcGoogleDocument, generic_relation_load,
+                       static_get_generic_relation_names)
 
 
 class MultiModelsTest(TestCase):
@@ -606,3 +610,83 @@ class MultiModelsTest(TestCase):
 
         except BcWebhook.DoesNotExist:
             self.fail(msg=f'webhook with id {self.webhook["id"]} not found.')
+
+    def test_webhook_with_generic_relations(self):
+        # the copies of the webhooks (same recordings) must not add queries
+        def list_recording_parents():
+            return [(_webhook.creator.id, _webhook.recording and _webhook.recording.parent.id)
+                    for _webhook in BcWebhook.objects.with_generic_relations('recording', 'recording__parent')]
+
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as queries:
+            _recording_parents = list_recording_parents()
+        self.assertIn((self.webhook_cloudfile["creator"]["id"], self.webhook_cloudfile["recording"]["parent"]["id"]),
+                      _recording_parents)
+
+        for _webhook in list(BcWebhook.objects.all()):
+            for _ in range(9):
+                _webhook.id += 1000
+                _webhook.save(force_insert=True)
+
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(list_recording_parents()), 30)
+
+    def test_comment_with_generic_relations(self):
+        _comments = list(BcComment.objects.with_generic_relations())
+        with self.assertNumQueries(0):
+            self.assertEqual(_comments[0].parent.id, self.comment["parent"]["id"])
+            self.assertEqual(_comments[0].bucket.id, self.comment["bucket"]["id"])
+            self.assertEqual(_comments[0].creator.id, self.comment["creator"]["id"])
+
+    def test_generic_relation_load(self):
+        _entries = list(BcScheduleEntry.objects.all())
+        generic_relation_load(_entries)
+        with self.assertNumQueries(0):
+            self.assertEqual(_entries[0].parent.id, self.schedule_entry["parent"]["id"])
+        self.assertEqual(static_get_generic_relation_names(BcWebhook), ['recording'])
+
+
+class ModelsIndexesTest(TestCase):
+    # query plan regression: the common lookups must use the composite indexes, not scan the table
+    fixtures = ["bc_bccompany", "bc_bcpeople", "bc_bcproject", "bc_bcprojecttool",
+                "bc_bcmessagecategory", "bc_bcmessageboard", "bc_bcmessage", "bc_bccomment", "bc_bcwebhook"]
+
+    @staticmethod
+    def get_index_name(model, fields):
+        return next(index.name for index in model._meta.indexes if index.fields == fields)
+
+    @staticmethod
+    def explain(queryset):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':  # small tables are scanned whatever the indexes
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def test_comment_by_parent(self):
+        _message = BcMessage.objects.first()
+        _queryset = BcComment.objects.filter(parent_content_type=ContentType.objects.get_for_model(BcMessage),
+                                             parent_object_id=_message.id)
+        self.assertIn(self.get_index_name(BcComment, ['parent_content_type', 'parent_object_id']),
+                      self.explain(_queryset))
+
+    def test_comment_by_bucket_updated_at(self):
+        _queryset = BcComment.objects.filter(bucket_id=BcProject.objects.first().id).order_by('-updated_at')
+        self.assertIn(self.get_index_name(BcComment, ['bucket', 'updated_at']), self.explain(_queryset))
+
+    def test_webhook_by_recording(self):
+        _queryset = BcWebhook.objects.filter(recording_content_type=ContentType.objects.get_for_model(BcCloudFile),
+                                             recording_object_id=1)
+        self.assertIn(self.get_index_name(BcWebhook, ['recording_content_type', 'recording_object_id']),
+                      self.explain(_queryset))
+
+    def test_webhook_by_kind(self):
+        _queryset = BcWebhook.objects.filter(kind='todo_created')
+        self.assertIn(self.get_index_name(BcWebhook, ['kind']), self.explain(_queryset))
+
+    def test_recording_base_child_by_parent(self):
+        _queryset = BcGoogleDocument.objects.filter(parent_content_type=ContentType.objects.get_for_model(BcVault),
+                                                    parent_object_id=1)
+        self.assertIn(self.get_index_name(BcGoogleDocument, ['parent_content_type', 'parent_object_id']),
+                      self.explain(_queryset))
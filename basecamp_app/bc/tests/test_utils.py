@@ -1,14 +1,33 @@
-from django.test import TestCase, RequestFactory
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.core.cache import caches
+from django.db import transaction
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils.dateparse import parse_datetime
 
 from os import environ
 from html import escape
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from io import BytesIO
 from json import loads as json_loads, dumps as json_dumps, load as json_stream_load
+from pickle import dumps as pickle_dumps
 from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread, Lock
+from time import sleep
+from requests import Response
 
 import bc.utils
+from bc.cache import (static_get_reference_models, reference_cache_get, reference_cache_in_bulk, reference_cache_key,
+                      reference_cache_warm_up)
+from bc.identity import identity_map_scope, identity_map_invalidate
+from bc.models import BcProject, BcPeople, BcProjectTool, BcTodo, BcCloudFile, BcMessage
+from bc.registry import (registry_get, registry_get_model, registry_get_recording_model, registry_get_recording_types,
+                         registry_get_webhook_recording_types)
+from bc.sqlite import sqlite_database, sqlite_profile_is_enabled, static_get_sqlite_profile_pragmas
+from bc.structs import (UNSET, struct_convert, struct_decode, struct_get, struct_get_fields, struct_get_recording,
+                        struct_hash, struct_to_data)
 
 
 class UtilsUrlsTest(TestCase):
@@ -156,6 +175,32 @@ class UtilsReprTest(TestCase):
         _repr = bc.utils.repr_message_detail(message=self.message, bucket_id=self.message["bucket"]["id"])
         self.assertEqual(_repr, '<a href="/bc/project/2085958499/message/1069479351">1069479351</a> We won Leto! ')
 
+    def test_repr_get_template(self):
+        template_str = 'parent {{ parent_id }} type {{ parent_type }} not in {{ list_parent_types }}.'
+        bc.utils.repr_get_template.cache_clear()
+        _repr = bc.utils.repr_template_response_parent_not_in_list(parent_id=1, parent_type='<b>',
+                                                                   list_parent_types=['Todolist'])
+        self.assertEqual(_repr, "parent 1 type &lt;b&gt; not in [&#x27;Todolist&#x27;].")  # still escaped
+
+        # compiled once, the same template for the next calls
+        self.assertIs(bc.utils.repr_get_template(template_str), bc.utils.repr_get_template(template_str))
+        self.assertEqual(bc.utils.repr_get_template.cache_info().misses, 1)
+
+    def test_repr_saved_on_db(self):
+        updated_at = parse_datetime(self.message["updated_at"])
+        saved = {self.message["id"]: (self.message["title"], updated_at)}
+        self.assertEqual(bc.utils.repr_saved_on_db(row=self.message, saved=saved), '(db)')
+        self.assertEqual(bc.utils.repr_saved_on_db(row=self.message, saved={}), '')
+
+        # updated on Basecamp since saved
+        saved[self.message["id"]] = (self.message["title"], updated_at - timedelta(minutes=1))
+        self.assertEqual(bc.utils.repr_saved_on_db(row=self.message, saved=saved), '(db, outdated)')
+
+        _repr = bc.utils.repr_message_detail(message=self.message, bucket_id=self.message["bucket"]["id"],
+                                             saved_on_db='(db, outdated)')
+        self.assertEqual(_repr, '<a href="/bc/project/2085958499/message/1069479351">1069479351</a> We won Leto! '
+                                '(db, outdated)')
+
 
 class UtilsDbTest(TestCase):
     fixtures = ["bc_bccompany", "bc_bcpeople",
@@ -265,6 +310,73 @@ class UtilsDbTest(TestCase):
                                             "ErrorDetail(string='people no company field', code='invalid')}"))
         self.assertEqual(_creator, None)
 
+    def test_db_bulk_sync_people(self):
+        existing_person = dict(self.person, name='Updated Name')  # update the existing person
+        new_person = dict(self.person, id=1, email_address='new@email.address',
+                          company={'id': 2, 'name': 'New Company'})  # create the person and the company
+        other_person = dict(self.person, id=2)  # email address used by the existing person, skipped
+
+        # one query by email address, and in the transaction one upsert each for companies and people
+        with self.assertNumQueries(5):
+            _people, _exception = bc.utils.db_bulk_sync_people(people=[existing_person, new_person, other_person])
+        self.assertEqual(_exception, None)
+        self.assertEqual([_person.id for _person in _people], [self.person["id"], 1])
+        self.assertEqual(bc.models.BcPeople.objects.get(id=self.person["id"]).name, 'Updated Name')
+        self.assertEqual(bc.models.BcPeople.objects.get(id=1).company.name, 'New Company')
+        self.assertFalse(bc.models.BcPeople.objects.filter(id=2).exists())
+
+        # rerun, the people not changed are not written, one query by id and email address
+        outcomes = []
+        with self.assertNumQueries(1):
+            _people, _exception = bc.utils.db_bulk_sync_people(
+                people=[existing_person, new_person], count=lambda outcome, value: outcomes.append((outcome, value)))
+        self.assertEqual([_person.id for _person in _people], [self.person["id"], 1])
+        self.assertEqual(outcomes, [('inserted', 0), ('updated', 0), ('unchanged', 2)])
+
+    def test_db_bulk_sync_people_with_invalid_person(self):
+        new_person = dict(self.person, id=1, email_address='not an email address')
+        no_company_person = dict(self.person, id=2)
+        no_company_person.pop('company')
+
+        _people, _exception = bc.utils.db_bulk_sync_people(people=[new_person])
+        self.assertEqual(_people, [])
+        self.assertIn('people bulk sync error: person 1', _exception)
+        self.assertFalse(bc.models.BcPeople.objects.filter(id=1).exists())
+
+        _people, _exception = bc.utils.db_bulk_sync_people(people=[no_company_person])
+        self.assertEqual(_exception, 'people bulk sync error: person 2 has no company field')
+
+    def test_db_get_bucket_with_identity_map(self):
+        bucket_id = 2085958499
+        with identity_map_scope():
+            with self.assertNumQueries(1):  # loaded once in the scope
+                for _ in range(10):
+                    _bucket, _exception = bc.utils.db_get_bucket(bucket_id=bucket_id)
+            self.assertEqual(_bucket.id, bucket_id)
+
+            # invalidated, loaded again
+            identity_map_invalidate(model=BcProject, pk=bucket_id)
+            with self.assertNumQueries(1):
+                bc.utils.db_get_bucket(bucket_id=bucket_id)
+
+        with self.assertNumQueries(2):  # out of the scope, nothing cached
+            bc.utils.db_get_bucket(bucket_id=bucket_id)
+            bc.utils.db_get_bucket(bucket_id=bucket_id)
+
+    def test_db_get_or_create_person_with_identity_map(self):
+        with identity_map_scope():
+            with self.assertNumQueries(1):
+                for _ in range(20):  # eg: the same person as creator, assignee and subscriber
+                    _creator, _exception = bc.utils.db_get_or_create_person(person=self.person)
+            self.assertEqual(_creator.id, self.person["id"])
+
+            # the saved instance replaces the loaded one
+            _creator.name = 'new name'
+            _creator.save()
+            with self.assertNumQueries(0):
+                _creator, _exception = bc.utils.db_get_or_create_person(person=self.person)
+            self.assertEqual(_creator.name, 'new name')
+
     def test_db_get_message(self):
         _message, _exception = bc.utils.db_get_message(message=self.message, bucket_id=self.message["bucket"]["id"])
         self.assertEqual(_exception, None)
@@ -288,6 +400,37 @@ class UtilsDbTest(TestCase):
                                      f'message/{self.message["id"]}">try to open Message</a> first.')
         self.assertEqual(_message, None)
 
+    def test_db_get_saved(self):
+        _new_message = dict(self.message, id=1)  # not saved
+        with self.assertNumQueries(1):  # one query for the page
+            saved = bc.utils.db_get_saved(model=BcMessage, rows=[self.message, _new_message, {'type': 'Message'}])
+        self.assertEqual(list(saved.keys()), [self.message["id"]])
+        _message = BcMessage.objects.get(id=self.message["id"])
+        self.assertEqual(saved[self.message["id"]], (_message.title, _message.updated_at))
+
+        with self.assertNumQueries(0):  # no ids, no query
+            self.assertEqual(bc.utils.db_get_saved(model=BcMessage, rows=[]), {})
+
+    def test_db_bulk_set_many_to_many(self):
+        relations = {968814335: [1049715914, 1049715915], 1069479523: [1049715915]}
+        # one read, in the transaction one insert and one delete for the todos of the batch
+        with self.assertNumQueries(5):
+            added, removed = bc.utils.db_bulk_set_many_to_many(model=BcTodo, name='assignees', relations=relations)
+        self.assertEqual((added, removed), (3, 1))
+        for todo_id, person_ids in relations.items():
+            self.assertEqual(sorted(BcTodo.objects.get(id=todo_id).assignees.values_list('id', flat=True)),
+                             person_ids)
+
+        # rerun, nothing to write
+        with self.assertNumQueries(1):
+            self.assertEqual(bc.utils.db_bulk_set_many_to_many(model=BcTodo, name='assignees', relations=relations),
+                             (0, 0))
+
+        bc.utils.db_bulk_set_many_to_many(model=BcProject, name='dock', relations={2085958499: [1069479338]})
+        self.assertEqual(list(BcProject.objects.get(id=2085958499).dock.values_list('id', flat=True)), [1069479338])
+        with self.assertNumQueries(0):  # no instances, no query
+            self.assertEqual(bc.utils.db_bulk_set_many_to_many(model=BcTodo, name='assignees', relations={}), (0, 0))
+
     def test_db_get_comment_parent_with_parent_type_message(self):
         _parent, _exception = bc.utils.db_get_comment_parent(parent=self.comment["parent"],
                                                              bucket_id=self.comment["bucket"]["id"])
@@ -449,6 +592,54 @@ class UtilsDbTest(TestCase):
                                      f'try to open Question::Answer</a> first.')
         self.assertEqual(_parent, None)
 
+    def test_db_get_recordings_relations(self):
+        # a page of comments on message, todo and upload, by the same creator
+        recordings = []
+        for parent in [self.comment["parent"], {'id': self.todo["id"], 'type': 'Todo'},
+                       {'id': self.upload["id"], 'type': 'Upload'}] * 10:
+            recordings.append(dict(self.comment, parent=parent))
+
+        # bucket, the parents of 3 types and creator
+        with self.assertNumQueries(5):
+            _relations, _exception = bc.utils.db_get_recordings_relations(
+                recordings=recordings, list_parent_types=bc.utils.static_get_comment_parent_types())
+        self.assertEqual(_exception, None)
+        self.assertEqual(list(_relations["buckets"].keys()), [self.comment["bucket"]["id"]])
+        self.assertEqual(_relations["parents"][('Todo', self.todo["id"])].id, self.todo["id"])
+        self.assertEqual(len(_relations["parents"]), 3)
+        self.assertEqual(_relations["creators"][self.comment["creator"]["id"]].id, self.comment["creator"]["id"])
+
+    def test_db_get_recordings_relations_with_new_parent(self):
+        # change parent (message) ID to new (non-exist) ID
+        self.comment["parent"]["id"] = 1
+
+        _relations, _exception = bc.utils.db_get_recordings_relations(
+            recordings=[self.comment], list_parent_types=bc.utils.static_get_comment_parent_types())
+        self.assertEqual(_exception, f'Message {self.comment["parent"]["id"]} not found<br/>'
+                                     f'<a href="/bc/project/{self.comment["bucket"]["id"]}/'
+                                     f'message/{self.comment["parent"]["id"]}">try to open Message</a> first.')
+        self.assertEqual(_relations, None)
+
+    def test_db_get_recordings_relations_with_new_bucket(self):
+        # change bucket ID to new (non-exist) ID
+        self.comment["bucket"]["id"] = 1
+
+        _relations, _exception = bc.utils.db_get_recordings_relations(
+            recordings=[self.comment], list_parent_types=bc.utils.static_get_comment_parent_types())
+        self.assertEqual(_exception, 'bucket 1 not found<br/><a href="/bc/project/1/update-db">save project to db</a> '
+                                     'first.')
+        self.assertEqual(_relations, None)
+
+    def test_db_get_recordings_relations_with_invalid_parent_type(self):
+        # change parent type to invalid type "Cloud"
+        self.comment["parent"]["type"] = "Cloud"
+
+        _relations, _exception = bc.utils.db_get_recordings_relations(
+            recordings=[self.comment], list_parent_types=bc.utils.static_get_comment_parent_types())
+        self.assertEqual(_exception, f'parent {self.comment["parent"]["id"]} type {self.comment["parent"]["type"]} not '
+                                     f'in {escape(str(bc.utils.static_get_comment_parent_types()))}.')
+        self.assertEqual(_relations, None)
+
     def test_db_get_message_parent(self):
         _parent, _exception = bc.utils.db_get_message_parent(parent=self.message["parent"],
                                                              bucket_id=self.message["bucket"]["id"])
@@ -507,6 +698,66 @@ class UtilsDbTest(TestCase):
         self.assertEqual(_parent, None)
 
 
+class UtilsReferenceCacheTest(TransactionTestCase):
+    # TransactionTestCase, the reference cache is never populated inside a transaction (TestCase runs in one)
+    fixtures = ["bc_bccompany", "bc_bcpeople", "bc_bcproject", "bc_bcprojecttool", "bc_bcmessagecategory"]
+
+    def setUp(self):  # Run once for every test method to set up clean data
+        caches["bc_reference"].clear()
+        self.person_id = BcPeople.objects.first().id
+
+    def tearDown(self):
+        caches["bc_reference"].clear()
+
+    def test_reference_cache_get(self):
+        with self.assertNumQueries(1):
+            _person = reference_cache_get(BcPeople, self.person_id)
+        with self.assertNumQueries(0):  # read through the cache
+            _cached_person = reference_cache_get(BcPeople, self.person_id)
+        self.assertEqual(_cached_person.pk, _person.pk)
+        self.assertEqual(_cached_person.name, _person.name)
+        self.assertEqual(_cached_person.company_id, _person.company_id)
+        self.assertFalse(_cached_person._state.adding)
+        # in its own cache alias, not in the default cache shared with the sessions and the API cache
+        self.assertIsNotNone(caches["bc_reference"].get(reference_cache_key(BcPeople, self.person_id)))
+        self.assertIsNone(caches["default"].get(reference_cache_key(BcPeople, self.person_id)))
+
+        self.assertIsNone(reference_cache_get(BcPeople, 1))
+
+    def test_reference_cache_get_invalidated_on_save(self):
+        _person = reference_cache_get(BcPeople, self.person_id)
+        _person.name = 'new name'
+        _person.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(reference_cache_get(BcPeople, self.person_id).name, 'new name')
+
+        BcPeople.objects.filter(id=self.person_id).delete()
+        self.assertIsNone(reference_cache_get(BcPeople, self.person_id))
+
+    def test_reference_cache_get_in_transaction(self):
+        with transaction.atomic():
+            reference_cache_get(BcPeople, self.person_id)
+        with self.assertNumQueries(1):  # not cached, the row read in a transaction
+            reference_cache_get(BcPeople, self.person_id)
+
+    def test_reference_cache_warm_up(self):
+        count = reference_cache_warm_up()
+        self.assertEqual(count, sum(model.objects.count() for model in static_get_reference_models()))
+        tool_ids = list(BcProjectTool.objects.values_list('id', flat=True))
+        with self.assertNumQueries(0):
+            _tools = reference_cache_in_bulk(BcProjectTool, tool_ids)
+            _project = reference_cache_get(BcProject, 2085958499)
+        self.assertEqual(sorted(_tools.keys()), sorted(tool_ids))
+        self.assertEqual(_project.id, 2085958499)
+
+    def test_reference_cache_disabled(self):
+        with patch.dict(environ, {"BASECAMP_REFERENCE_CACHE": "none"}):
+            self.assertEqual(reference_cache_warm_up(), 0)
+            reference_cache_get(BcPeople, self.person_id)
+            with self.assertNumQueries(1):
+                reference_cache_get(BcPeople, self.person_id)
+
+
 class UtilsConstTest(TestCase):
 
     @classmethod
@@ -532,6 +783,141 @@ class UtilsConstTest(TestCase):
                           'Upload', 'Vault'])
 
 
+class UtilsRegistryTest(TestCase):
+
+    def test_registry_get(self):
+        _type = registry_get('Todo')
+        self.assertEqual(_type.model, BcTodo)
+        self.assertEqual(_type.get_url(bucket_id=1, recording_id=2), '/bc/project/1/todo/2')
+        self.assertEqual(registry_get_model('CloudFile'), BcCloudFile)
+        self.assertIsNone(registry_get_model('Kanban::Card'))
+
+    def test_registry_get_recording_types(self):
+        self.assertEqual(set(bc.utils.static_get_recording_types()) - set(registry_get_recording_types()), set())
+        self.assertNotIn('CloudFile', registry_get_recording_types())
+        self.assertEqual(bc.utils.static_get_sync_type_models()['Todo'], BcTodo)
+        with self.assertRaises(KeyError):
+            registry_get_recording_model('CloudFile')
+
+    def test_registry_get_webhook_recording_types(self):
+        # the types of the webhooks documented at https://github.com/basecamp/bc3-api/blob/master/sections/webhooks.md
+        self.assertEqual(set(registry_get_webhook_recording_types()),
+                         {'Comment', 'Document', 'Message', 'Question::Answer', 'Schedule::Entry', 'Todo', 'Todolist',
+                          'Upload', 'Vault', 'Client::Approval::Response', 'Client::Forward', 'Client::Reply',
+                          'CloudFile', 'GoogleDocument', 'Inbox::Forward', 'Question'})
+        with override_settings(INSTALLED_APPS=[]):
+            self.assertEqual(registry_get_webhook_recording_types(), [])
+
+    def test_registry_content_type_cached(self):
+        registry_get('Todo').content_type  # noqa, may query the content type once
+        with self.assertNumQueries(0):
+            self.assertEqual(registry_get('Todo').content_type.model_class(), BcTodo)
+
+    def test_registry_with_app_not_installed(self):
+        with override_settings(INSTALLED_APPS=[]):
+            self.assertIsNone(registry_get('Todo'))
+        self.assertEqual(registry_get_model('Todo'), BcTodo)  # rebuilt on restore
+
+
+class UtilsStructsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # api_sample.json is collections of API data from bc3-api site https://github.com/basecamp/bc3-api/tree/master
+        with open(Path(__file__).resolve().parent / "api_sample.json") as stream:
+            cls.api_sample_json = json_stream_load(stream)
+
+    def test_struct_decode(self):
+        todo = dict(self.api_sample_json["todo"]["1069479523"], unknown_field='dropped')
+        del todo["due_on"]
+        _todo = struct_decode(json_dumps(todo).encode(), name='Todo')
+
+        self.assertEqual((_todo.id, _todo.type, _todo.bucket.id), (1069479523, 'Todo', 2085958499))
+        self.assertEqual((_todo.parent.type, _todo.creator.company.name), ('Todolist', 'Honcho Design'))
+        self.assertEqual([person.id for person in _todo.assignees], [1049715937])
+        self.assertEqual(_todo.completion.creator.id, 1049715937)
+        self.assertFalse(hasattr(_todo, 'unknown_field'))  # dropped at decode time
+        self.assertIs(_todo.due_on, UNSET)  # absent, not None
+        self.assertIsNone(_todo.starts_on)
+        self.assertNotIn('due_on', struct_get_fields(_todo, ['id', 'due_on', 'starts_on']))
+
+        # back to json data, without the unknown and absent fields
+        data = struct_to_data(_todo)
+        self.assertEqual(data["assignees"][0]["name"], 'Sharon Bradford')
+        self.assertNotIn('unknown_field', data)
+        self.assertNotIn('due_on', data)
+
+    def test_struct_decode_many(self):
+        categories = struct_decode(json_dumps([self.api_sample_json["message_category"]["823758531"]]).encode(),
+                                   name='MessageCategory', many=True)
+        self.assertEqual([category.id for category in categories], [823758531])
+        self.assertEqual(struct_convert(self.api_sample_json["project"]["2085958499"],
+                                        struct=struct_get('Project')).dock[0].name, 'message_board')
+
+    def test_struct_decode_invalid(self):
+        for content, many in [(b'not json', False), (b'[]', False), (b'{"id": 1}', True)]:
+            with self.assertRaises(ValueError, msg=content):
+                struct_decode(content, name='Todo', many=many)
+        with self.assertRaises(KeyError):
+            struct_get_recording({'type': 'Kanban::Card', 'id': 1})
+
+    def test_struct_hash(self):
+        todo = self.api_sample_json["todo"]["1069479523"]
+        payload_hash = struct_hash(struct_convert(todo, struct=struct_get('Todo')))
+        self.assertEqual(len(payload_hash), 32)
+
+        # stable, the unknown fields dropped and the people reduced to their id (saved on their own rows)
+        creator = dict(todo["creator"], name='Renamed')
+        for data in [dict(todo, unknown_field='dropped'), dict(todo, creator=creator)]:
+            self.assertEqual(struct_hash(struct_convert(data, struct=struct_get('Todo'))), payload_hash)
+
+        # changed by a field of the recording or a nested object saved with it
+        completion = dict(todo["completion"], created_at='2030-01-01T00:00:00Z')
+        for data in [dict(todo, title='new title'), dict(todo, completion=completion)]:
+            self.assertNotEqual(struct_hash(struct_convert(data, struct=struct_get('Todo'))), payload_hash)
+
+        # the person itself is not reduced
+        person = self.api_sample_json["person"]["1049715914"]
+        self.assertNotEqual(struct_hash(struct_convert(person, struct=struct_get('Person'))),
+                            struct_hash(struct_convert(dict(person, name='Renamed'), struct=struct_get('Person'))))
+
+    def test_sync_has_payload_hash(self):
+        # the entities of many rows only, the tools of a project and the questions are compared by updated_at
+        models = [BcProject, BcPeople] + [registry_get_recording_model(_type) for _type in registry_get_recording_types()]
+        self.assertEqual(sorted(model.__name__ for model in models if bc.utils.sync_has_payload_hash(model)),
+                         ['BcComment', 'BcDocument', 'BcMessage', 'BcPeople', 'BcProject', 'BcQuestionAnswer',
+                          'BcScheduleEntry', 'BcTodo', 'BcTodolist', 'BcUpload', 'BcVault'])
+
+
+class UtilsSqliteProfileTest(TestCase):
+
+    def get_pragmas(self, profile):
+        with TemporaryDirectory() as directory:
+            with sqlite_database(alias='bc_test_sqlite', name=str(Path(directory) / 'bc.sqlite3'),
+                                 profile=profile) as _connection:
+                with _connection.cursor() as cursor:
+                    return {pragma: cursor.execute(f'PRAGMA {pragma}').fetchone()[0]
+                            for pragma in ['journal_mode', 'synchronous', 'temp_store', 'busy_timeout']}
+
+    def test_sqlite_profile_applied_on_connection_created(self):
+        self.assertEqual(self.get_pragmas(profile=True),
+                         {'journal_mode': 'wal', 'synchronous': 1, 'temp_store': 2, 'busy_timeout': 20000})
+
+    def test_sqlite_profile_disabled(self):
+        self.assertEqual(self.get_pragmas(profile=False)["journal_mode"], 'delete')
+
+    def test_sqlite_profile_is_enabled(self):
+        with patch.dict(environ, {"BASECAMP_SQLITE_PROFILE": "1"}):
+            self.assertTrue(sqlite_profile_is_enabled())
+            self.assertFalse(sqlite_profile_is_enabled(settings_dict={'BASECAMP_SQLITE_PROFILE': False}))
+        with patch.dict(environ, {"BASECAMP_SQLITE_PROFILE": "0"}):
+            self.assertFalse(sqlite_profile_is_enabled())
+
+    def test_static_get_sqlite_profile_pragmas(self):
+        with patch.dict(environ, {"BASECAMP_SQLITE_BUSY_TIMEOUT": "1000"}):
+            self.assertIn('PRAGMA busy_timeout=1000', static_get_sqlite_profile_pragmas())
+
+
 class UtilsApiTest(TestCase):
 
     @classmethod
@@ -550,12 +936,376 @@ class UtilsApiTest(TestCase):
         uri = f'{self.base_uri}/my/profile.json'
         access_token = 'my access token'
         mock_response_status_ok = 200
-        with patch('bc.utils.api.http_get') as mock_requests_get:
+        with patch('bc.utils.api.Session.get') as mock_requests_get:
             mock_requests_get.return_value.status_code = mock_response_status_ok
             api_response = bc.utils.bc_api_get(uri=uri, access_token=access_token)
-            mock_requests_get.assert_called_once()
+            mock_requests_get.assert_called_once_with(url=uri, headers={"Authorization": "Bearer " + access_token})
             self.assertEqual(api_response.status_code, mock_response_status_ok)
 
+    def test_bc_api_session(self):
+        bc.utils.bc_api_close()  # start from a new session
+
+        session = bc.utils.bc_api_session()
+        # same session (and connection pool) reused on every call
+        self.assertIs(bc.utils.bc_api_session(), session)
+        self.assertEqual(session.headers["User-Agent"], self.basecamp_user_agent)
+        self.assertEqual(session.headers["Connection"], "keep-alive")
+
+        bc.utils.bc_api_close()
+        # new session created after closed
+        self.assertIsNot(bc.utils.bc_api_session(), session)
+        bc.utils.bc_api_close()
+
+    def test_bc_api_session_with_pool_size_and_no_keep_alive(self):
+        bc.utils.bc_api_close()  # start from a new session
+
+        with patch.dict(environ, {"BASECAMP_API_POOL_MAXSIZE": "3", "BASECAMP_API_KEEP_ALIVE": "0"}):
+            session = bc.utils.bc_api_session()
+
+        self.assertEqual(session.get_adapter(self.base_uri)._pool_maxsize, 3)
+        self.assertEqual(session.headers["Connection"], "close")
+        bc.utils.bc_api_close()
+
+    @staticmethod
+    def mock_page(data, next_uri=None, x_total_count=None, status_code=200):
+        page = MagicMock()
+        page.status_code = status_code
+        page.json.return_value = data
+        page._content = json_dumps(data).encode()  # read, not streamed
+        del page.bc_api_json_count  # not counted by bc_api_iter_json
+        page.links = {'next': {'url': next_uri}} if next_uri else {}
+        page.headers = {"X-Total-Count": str(x_total_count)} if x_total_count else {}
+        return page
+
+    def test_api_get_page_uri(self):
+        uri = f'{self.base_uri}/projects/recordings.json?type=Question::Answer&bucket=1,2'
+        self.assertEqual(bc.utils.api_get_page_uri(uri=uri, page=3), f'{uri}&page=3')
+        self.assertEqual(bc.utils.api_get_page_uri(uri=f'{self.base_uri}/people.json?page=2', page=5),
+                         f'{self.base_uri}/people.json?page=5')
+
+    def test_bc_api_iter_pages_with_single_page(self):
+        first_page = self.mock_page(data=[{'id': 1}, {'id': 2}], x_total_count=2)
+
+        with patch('bc.utils.api.bc_api_get') as mock_bc_api_get:
+            pages = list(bc.utils.bc_api_iter_pages(response=first_page, access_token='access token'))
+
+            mock_bc_api_get.assert_not_called()
+            self.assertEqual(pages, [first_page])
+
+    def test_bc_api_iter_pages_with_x_total_count(self):
+        people_uri = f'{self.base_uri}/people.json'
+        first_page = self.mock_page(data=[{'id': 1}, {'id': 2}], next_uri=f'{people_uri}?page=2', x_total_count=5)
+        next_pages = {
+            f'{people_uri}?page=2': self.mock_page(data=[{'id': 3}, {'id': 4}], next_uri=f'{people_uri}?page=3'),
+            f'{people_uri}?page=3': self.mock_page(data=[{'id': 5}]),
+        }
+
+        with patch('bc.utils.api.bc_api_get') as mock_bc_api_get:
+            mock_bc_api_get.side_effect = lambda uri, access_token: next_pages[uri]
+            pages = list(bc.utils.bc_api_iter_pages(response=first_page, access_token='access token', max_workers=2))
+
+            # page size 2 from the first page, predicted page uris requested concurrently, yielded in order
+            self.assertEqual(sorted(call.kwargs["uri"] for call in mock_bc_api_get.call_args_list), list(next_pages))
+            self.assertEqual([item["id"] for page in pages for item in page.json()], [1, 2, 3, 4, 5])
+
+    def test_bc_api_iter_pages_with_large_page_size(self):
+        people_uri = f'{self.base_uri}/people.json'
+        # 50 people per page, 120 people: pages 2 and 3 only
+        first_page = self.mock_page(data=[{'id': i} for i in range(50)], next_uri=f'{people_uri}?page=2',
+                                    x_total_count=120)
+        next_pages = {
+            f'{people_uri}?page=2': self.mock_page(data=[{'id': i} for i in range(50, 100)],
+                                                   next_uri=f'{people_uri}?page=3'),
+            f'{people_uri}?page=3': self.mock_page(data=[{'id': i} for i in range(100, 120)]),
+        }
+
+        with patch('bc.utils.api.bc_api_get') as mock_bc_api_get:
+            mock_bc_api_get.side_effect = lambda uri, access_token: next_pages[uri]
+            pages = list(bc.utils.bc_api_iter_pages(response=first_page, access_token='access token'))
+
+            # no request of an empty page after the last
+            self.assertEqual(mock_bc_api_get.call_count, 2)
+            self.assertEqual([item["id"] for page in pages for item in page.json()], list(range(120)))
+
+    def test_bc_api_iter_pages_with_list_shrank(self):
+        people_uri = f'{self.base_uri}/people.json'
+        first_page = self.mock_page(data=[{'id': 1}], next_uri=f'{people_uri}?page=2', x_total_count=4)
+        # deleted while fetching, page 2 is the last one (no Link rel="next")
+        next_pages = {f'{people_uri}?page={page}': self.mock_page(data=[{'id': page}] if page == 2 else [])
+                      for page in range(2, 5)}
+
+        with patch('bc.utils.api.bc_api_get') as mock_bc_api_get:
+            mock_bc_api_get.side_effect = lambda uri, access_token: next_pages[uri]
+            pages = list(bc.utils.bc_api_iter_pages(response=first_page, access_token='access token', max_workers=1))
+
+            # stopped at the last page, the pages predicted after it not yielded
+            self.assertEqual([item["id"] for page in pages for item in page.json()], [1, 2])
+            self.assertEqual(len(pages), 2)
+
+    def test_bc_api_iter_pages_stream_with_cache(self):
+        people_uri = f'{self.base_uri}/people.json'
+        bc.utils.bc_api_cache_reset()
+
+        with patch('bc.utils.api.Session.get') as mock_requests_get:
+            mock_requests_get.return_value = self.mock_streamed_response(
+                body=json_dumps([{'id': 1}]).encode(),
+                headers={"ETag": '"etag-1"', "X-Total-Count": "2", "Link": f'<{people_uri}?page=2>; rel="next"'})
+            first_page = bc.utils.bc_api_get(uri=people_uri, access_token='access token', stream=True)
+
+            with patch('bc.utils.api.bc_api_get', return_value=self.mock_page(data=[{'id': 2}])):
+                pages = bc.utils.bc_api_iter_pages(response=first_page, access_token='access token', stream=True)
+                # the streamed first page not read by the prediction, cached once read
+                self.assertEqual(list(bc.utils.bc_api_iter_json(next(pages))), [{'id': 1}])
+                self.assertEqual(first_page.bc_api_json_count, 1)  # the page size, counted as read
+                self.assertEqual([page.json() for page in pages], [[{'id': 2}]])
+
+            key = bc.utils.bc_api_cache_key(uri=people_uri, access_token='access token')
+            self.assertEqual(bc.utils.bc_api_cache().get(key)["etag"], '"etag-1"')
+
+        bc.utils.bc_api_cache_reset()
+
+    def test_bc_api_iter_pages_stream_not_read(self):
+        people_uri = f'{self.base_uri}/people.json'
+        first_page = self.mock_streamed_response(
+            body=json_dumps([{'id': 1}, {'id': 2}]).encode(),
+            headers={"X-Total-Count": "3", "Link": f'<{people_uri}?page=2>; rel="next"'})
+
+        with patch('bc.utils.api.bc_api_get', return_value=self.mock_page(data=[{'id': 3}])) as mock_bc_api_get:
+            pages = bc.utils.bc_api_iter_pages(response=first_page, access_token='access token', stream=True)
+            self.assertEqual(next(bc.utils.bc_api_iter_json(next(pages))), {'id': 1})  # stopped before the end
+            self.assertEqual([page.json() for page in pages], [[{'id': 3}]])
+
+            # page size unknown, the next page followed by its Link rel="next", streamed
+            mock_bc_api_get.assert_called_once_with(uri=f'{people_uri}?page=2', access_token='access token',
+                                                    stream=True)
+
+    def test_bc_api_iter_pages_with_link_next(self):
+        people_uri = f'{self.base_uri}/people.json'
+        # no header X-Total-Count, follow the Link rel="next" page by page
+        first_page = self.mock_page(data=[{'id': 1}], next_uri=f'{people_uri}?page=2')
+        next_pages = {
+            f'{people_uri}?page=2': self.mock_page(data=[{'id': 2}], next_uri=f'{people_uri}?page=3'),
+            f'{people_uri}?page=3': self.mock_page(data=[{'id': 3}]),
+        }
+
+        with patch('bc.utils.api.bc_api_get') as mock_bc_api_get:
+            mock_bc_api_get.side_effect = lambda uri, access_token: next_pages[uri]
+            pages = list(bc.utils.bc_api_iter_pages(response=first_page, access_token='access token'))
+
+            self.assertEqual(mock_bc_api_get.call_count, 2)
+            self.assertEqual([item["id"] for page in pages for item in page.json()], [1, 2, 3])
+
+    def test_bc_api_iter_pages_without_predict(self):
+        people_uri = f'{self.base_uri}/people.json'
+        first_page = self.mock_page(data=[{'id': 1}], next_uri=f'{people_uri}?page=2', x_total_count=3)
+        next_pages = {
+            f'{people_uri}?page=2': self.mock_page(data=[{'id': 2}], next_uri=f'{people_uri}?page=3'),
+            f'{people_uri}?page=3': self.mock_page(data=[{'id': 3}]),
+        }
+
+        with patch('bc.utils.api.bc_api_get') as mock_bc_api_get:
+            mock_bc_api_get.side_effect = lambda uri, access_token: next_pages[uri]
+            pages = bc.utils.bc_api_iter_pages(response=first_page, access_token='access token', predict=False)
+            self.assertEqual(next(pages).json(), [{'id': 1}])
+            self.assertEqual(next(pages).json(), [{'id': 2}])
+            pages.close()  # stop before the last page
+
+            # only the pages iterated are requested
+            mock_bc_api_get.assert_called_once_with(uri=f'{people_uri}?page=2', access_token='access token')
+
+    def test_bc_api_iter_pages_with_page_not_ok(self):
+        people_uri = f'{self.base_uri}/people.json'
+        first_page = self.mock_page(data=[{'id': 1}], next_uri=f'{people_uri}?page=2', x_total_count=3)
+        next_pages = {
+            f'{people_uri}?page=2': self.mock_page(data=None, status_code=429),
+            f'{people_uri}?page=3': self.mock_page(data=[{'id': 3}]),
+        }
+
+        with patch('bc.utils.api.bc_api_get') as mock_bc_api_get:
+            mock_bc_api_get.side_effect = lambda uri, access_token: next_pages[uri]
+            pages = list(bc.utils.bc_api_iter_pages(response=first_page, access_token='access token'))
+
+            # stop at the page not OK
+            self.assertEqual([page.status_code for page in pages], [200, 429])
+
+    @staticmethod
+    def mock_cacheable_response(data, etag='"etag-1"', status_code=200):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = {"ETag": etag, "Last-Modified": "Tue, 01 Aug 2023 00:00:00 GMT",
+                            "Link": '<https://3.basecampapi.com/999999999/people.json?page=2>; rel="next"'}
+        response.content = json_dumps(data).encode()
+        response.encoding = 'utf-8'
+        return response
+
+    def test_bc_api_get_with_cache(self):
+        uri = f'{self.base_uri}/projects/1.json'
+        access_token = 'my access token'
+        bc.utils.bc_api_cache_reset()  # start from an empty locmem cache
+
+        with patch('bc.utils.api.Session.get') as mock_requests_get:
+            # not cached: download without validators
+            mock_requests_get.return_value = self.mock_cacheable_response(data={'id': 1})
+            api_response = bc.utils.bc_api_get(uri=uri, access_token=access_token)
+            mock_requests_get.assert_called_once_with(url=uri, headers={"Authorization": "Bearer " + access_token})
+            self.assertEqual(api_response.status_code, 200)
+
+            # cached and not modified: send validators, the 304 served from the cache
+            mock_requests_get.reset_mock()
+            mock_requests_get.return_value = MagicMock(status_code=304)
+            api_response = bc.utils.bc_api_get(uri=uri, access_token=access_token)
+            mock_requests_get.assert_called_once_with(url=uri, headers={
+                "Authorization": "Bearer " + access_token, "If-None-Match": '"etag-1"',
+                "If-Modified-Since": "Tue, 01 Aug 2023 00:00:00 GMT"})
+            self.assertEqual(api_response.status_code, 200)
+            self.assertTrue(api_response.from_cache)
+            self.assertEqual(api_response.json(), {'id': 1})
+            self.assertEqual(api_response.links["next"]["url"],
+                             'https://3.basecampapi.com/999999999/people.json?page=2')
+
+            # cached but modified: download again, and replace the entry
+            mock_requests_get.return_value = self.mock_cacheable_response(data={'id': 1, 'name': 'new'},
+                                                                          etag='"etag-2"')
+            api_response = bc.utils.bc_api_get(uri=uri, access_token=access_token)
+            self.assertEqual(api_response.status_code, 200)
+            self.assertEqual(bc.utils.bc_api_cache().get(
+                bc.utils.bc_api_cache_key(uri=uri, access_token=access_token))["etag"], '"etag-2"')
+
+            # the entry is per access token
+            mock_requests_get.reset_mock()
+            bc.utils.bc_api_get(uri=uri, access_token='other access token')
+            mock_requests_get.assert_called_once_with(url=uri, headers={"Authorization": "Bearer other access token"})
+
+        self.assertEqual(bc.utils.bc_api_cache_stats(), {'hits': 1, 'misses': 2, 'revalidations': 1})
+        bc.utils.bc_api_cache_reset()
+
+    def test_bc_api_get_with_cache_disabled(self):
+        uri = f'{self.base_uri}/projects/1.json'
+        environ["BASECAMP_API_CACHE"] = "none"
+        bc.utils.bc_api_cache_reset()
+
+        with patch('bc.utils.api.Session.get') as mock_requests_get:
+            mock_requests_get.return_value = self.mock_cacheable_response(data={'id': 1})
+            bc.utils.bc_api_get(uri=uri, access_token='access token')
+            bc.utils.bc_api_get(uri=uri, access_token='access token')
+            # never send validators
+            mock_requests_get.assert_called_with(url=uri, headers={"Authorization": "Bearer access token"})
+
+        self.assertIsNone(bc.utils.bc_api_cache())
+        self.assertEqual(bc.utils.bc_api_cache_stats(), {'hits': 0, 'misses': 0, 'revalidations': 0})
+        with patch('bc.utils.api_cache._bc_api_cache_lock') as mock_lock:
+            self.assertIsNone(bc.utils.bc_api_cache())
+            mock_lock.__enter__.assert_not_called()  # the disabled state kept, the lock not taken again
+        del environ["BASECAMP_API_CACHE"]
+        bc.utils.bc_api_cache_reset()
+
+    def test_bc_api_cache_loc_mem(self):
+        cache = bc.utils.BcApiCacheLocMem(max_entries=2)
+        cache.set('a', {'id': 1})
+        cache.set('b', {'id': 2})
+        cache.get('a')  # b is the least recently used
+        cache.set('c', {'id': 3})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'id': 1})
+        self.assertEqual(cache.get('c'), {'id': 3})
+
+    def test_bc_api_cache_file(self):
+        with TemporaryDirectory() as location:
+            cache = bc.utils.BcApiCacheFile(location=location)
+            self.assertIsNone(cache.get('a'))
+            entry = {'etag': '"etag-1"', 'last_modified': None, 'headers': {'ETag': '"etag-1"'},
+                     'content': b'[{"id": 1}]', 'encoding': 'utf-8'}
+            cache.set('a', entry)
+            self.assertEqual(bc.utils.BcApiCacheFile(location=location).get('a'), entry)
+            # stored as json, not pickle
+            with open(Path(location) / 'a.bccache', encoding='utf-8') as f:
+                self.assertEqual(json_loads(f.read())["content"], 'W3siaWQiOiAxfV0=')
+
+            # a file not written by the cache is not an entry
+            (Path(location) / 'b.bccache').write_bytes(pickle_dumps({'content': b'[]'}))
+            self.assertIsNone(cache.get('b'))
+            cache.clear()
+            self.assertIsNone(cache.get('a'))
+
+    def test_bc_api_cache_django(self):
+        cache = bc.utils.BcApiCacheDjango()
+        cache.set('a', {'content': b'[]'})
+        self.assertEqual(cache.get('a'), {'content': b'[]'})
+        caches['default'].set('other', 'kept')
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(caches['default'].get('other'), 'kept')  # only the entries of the API cache cleared
+
+        # cleared by another process, seen at once
+        cache.set('a', {'content': b'[]'})
+        bc.utils.BcApiCacheDjango().clear()
+        self.assertIsNone(cache.get('a'))
+        caches['default'].delete('other')
+
+    @staticmethod
+    def mock_streamed_response(body, headers=None):
+        response = Response()  # body not read yet, as requests with stream=True
+        response.status_code = 200
+        response.headers.update(headers or {})
+        response.encoding = 'utf-8'
+        response.raw = BytesIO(body)
+        return response
+
+    def test_bc_api_iter_json(self):
+        data = [{'id': 1, 'name': 'Zoë ☃', 'amount': 12345}, {'id': 2, 'tags': ['a', ']', ',']}, 3, None, 'text']
+        body = json_dumps(data, ensure_ascii=False, indent=2).encode()
+        # chunks smaller than a record, multibyte characters split across chunks
+        for chunk_size in [1, 2, 7, 64, len(body)]:
+            response = self.mock_streamed_response(body=body)
+            self.assertEqual(list(bc.utils.bc_api_iter_json(response, chunk_size=chunk_size)), data, chunk_size)
+
+        # a response already read
+        response = self.mock_cacheable_response(data=data)
+        self.assertEqual(list(bc.utils.bc_api_iter_json(response)), data)
+
+        self.assertEqual(list(bc.utils.bc_api_iter_json(self.mock_streamed_response(body=b' [ ] '))), [])
+
+    def test_bc_api_iter_json_with_invalid_body(self):
+        for body in [b'{"id": 1}', b'[{"id": 1}', b'[{"id": 1},', b'[1 2]', b'[1,]', b'[1] 2', b'']:
+            with self.assertRaises(ValueError, msg=body):
+                list(bc.utils.bc_api_iter_json(self.mock_streamed_response(body=body), chunk_size=3))
+
+    def test_bc_api_iter_json_stopped(self):
+        body = json_dumps([{'id': record_id} for record_id in range(1000)]).encode()
+        response = self.mock_streamed_response(body=body)
+        records = bc.utils.bc_api_iter_json(response, chunk_size=16)
+        self.assertEqual(next(records), {'id': 0})
+        records.close()  # the rest of the body not read
+        self.assertTrue(response.raw.closed)
+
+    def test_bc_api_get_stream_with_cache(self):
+        uri = f'{self.base_uri}/people.json'
+        access_token = 'my access token'
+        data = [{'id': 1}, {'id': 2}]
+        bc.utils.bc_api_cache_reset()
+
+        with patch('bc.utils.api.Session.get') as mock_requests_get:
+            mock_requests_get.return_value = self.mock_streamed_response(
+                body=json_dumps(data).encode(), headers={"ETag": '"etag-1"'})
+            api_response = bc.utils.bc_api_get(uri=uri, access_token=access_token, stream=True)
+            mock_requests_get.assert_called_once_with(url=uri, headers={"Authorization": "Bearer " + access_token},
+                                                      stream=True)
+            # cached once the body is read
+            key = bc.utils.bc_api_cache_key(uri=uri, access_token=access_token)
+            self.assertIsNone(bc.utils.bc_api_cache().get(key))
+            self.assertEqual(list(bc.utils.bc_api_iter_json(api_response, chunk_size=4)), data)
+            self.assertEqual(bc.utils.bc_api_cache().get(key)["etag"], '"etag-1"')
+            self.assertEqual(api_response.json(), data)
+
+            # not modified: served from the cache, decoded the same way
+            mock_requests_get.return_value = MagicMock(status_code=304)
+            api_response = bc.utils.bc_api_get(uri=uri, access_token=access_token, stream=True)
+            self.assertTrue(api_response.from_cache)
+            mock_requests_get.return_value.close.assert_called_once()  # the connection of the 304 released
+            self.assertEqual(list(bc.utils.bc_api_iter_json(api_response)), data)
+
+        bc.utils.bc_api_cache_reset()
+
     def test_api_message_get_bucket_message_types_uri(self):
         bucket_id = 1
         api_uri = bc.utils.api_message_get_bucket_message_types_uri(bucket_id=bucket_id)
@@ -715,6 +1465,19 @@ class UtilsApiTest(TestCase):
         except ValueError as e:
             self.assertEqual(str(e), 'undefined recording_type')
 
+    def test_api_recording_get_recordings_uri_with_sort_direction(self):
+        recording_type = 'Todo'
+        api_uri = bc.utils.api_recording_get_recordings_uri(recording_type=recording_type, sort='updated_at',
+                                                            direction='desc')
+        self.assertEqual(api_uri,
+                         f'{self.base_uri}/projects/recordings.json?type={recording_type}'
+                         f'&sort=updated_at&direction=desc')
+
+        with self.assertRaisesMessage(ValueError, 'undefined sort'):
+            _ = bc.utils.api_recording_get_recordings_uri(recording_type=recording_type, sort='title')
+        with self.assertRaisesMessage(ValueError, 'undefined direction'):
+            _ = bc.utils.api_recording_get_recordings_uri(recording_type=recording_type, direction='up')
+
     def test_api_recording_get_bucket_recording_parent_comment_uri(self):
         bucket_id = 1
         parent_id = 2
@@ -763,3 +1526,116 @@ class UtilsApiTest(TestCase):
         upload_id = 2
         api_uri = bc.utils.api_document_get_bucket_upload_uri(bucket_id=bucket_id, upload_id=upload_id)
         self.assertEqual(api_uri, f'{self.base_uri}/buckets/{bucket_id}/uploads/{upload_id}.json')
+
+
+class StubBasecampApiHandler(BaseHTTPRequestHandler):
+    """
+    local stub of the Basecamp API for UtilsApiAsyncTest:
+    * /buckets/1/todos/<id>.json responds the todo after a short delay, records the requests in flight
+    * /limited.json responds 429 with Retry-After at the first request, then 200
+    """
+    lock = Lock()
+    in_flight = 0
+    max_in_flight = 0
+    limited_count = 0
+
+    def do_GET(self):
+        cls = StubBasecampApiHandler
+        if self.path == '/limited.json':
+            with cls.lock:
+                cls.limited_count += 1
+                limited = cls.limited_count == 1
+            if limited:
+                self.send_response(429)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+            self.send_json({'limited_count': cls.limited_count})
+            return
+
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        sleep(0.05)
+        with cls.lock:
+            cls.in_flight -= 1
+        todo_id = int(self.path.split('/')[-1].split('.')[0])
+        self.send_json({'id': todo_id, 'authorization': self.headers["Authorization"]})
+
+    def send_json(self, data):
+        body = json_dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # silent
+        pass
+
+
+class UtilsApiAsyncTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.environ_patch = patch.dict(environ, {
+            "BASECAMP_USER_AGENT": "Intelligence (https://github.com/oonid/intelligence)",
+        })
+        cls.environ_patch.start()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubBasecampApiHandler)
+        cls.server_thread = Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.base_uri = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.environ_patch.stop()
+        super().tearDownClass()
+
+    def setUp(self):  # Run once for every test method to set up clean data
+        StubBasecampApiHandler.max_in_flight = 0
+        StubBasecampApiHandler.limited_count = 0
+
+    async def test_bc_api_get_async(self):
+        response = await bc.utils.bc_api_get_async(uri=f'{self.base_uri}/buckets/1/todos/7.json',
+                                                   access_token='access token')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'id': 7, 'authorization': 'Bearer access token'})
+
+    async def test_bc_api_async_client_get_many_with_max_concurrency(self):
+        uris = [f'{self.base_uri}/buckets/1/todos/{todo_id}.json' for todo_id in range(8)]
+
+        async with bc.utils.BcApiAsyncClient(access_token='access token', max_concurrency=2) as client:
+            responses = await client.get_many(uris=uris)
+
+        # responses in order of uris, never more than 2 requests in flight
+        self.assertEqual([response.json()["id"] for response in responses], list(range(8)))
+        self.assertLessEqual(StubBasecampApiHandler.max_in_flight, 2)
+
+    async def test_bc_api_async_client_get_with_retry_after(self):
+        async with bc.utils.BcApiAsyncClient(access_token='access token', backoff=0) as client:
+            response = await client.get(f'{self.base_uri}/limited.json')
+
+        # first request got 429, retried after Retry-After
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'limited_count': 2})
+
+    async def test_bc_api_async_client_get_with_max_retries(self):
+        async with bc.utils.BcApiAsyncClient(access_token='access token', max_retries=0) as client:
+            response = await client.get(f'{self.base_uri}/limited.json')
+
+        # no retry, return the rate-limited response
+        self.assertEqual(response.status_code, 429)
+
+    def test_bc_api_async_client_retry_delay(self):
+        client = bc.utils.BcApiAsyncClient(access_token='access token', backoff=0.5)
+        response = MagicMock()
+
+        response.headers = {"Retry-After": "3"}
+        self.assertTrue(3 <= client.retry_delay(response=response, attempt=0) <= 3.5)
+
+        response.headers = {}  # exponential backoff: 0.5 * 2 ** 2
+        self.assertTrue(2 <= client.retry_delay(response=response, attempt=2) <= 2.5)
@@ -1,12 +1,19 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
 
-from unittest.mock import patch
+from os import environ
+from unittest.mock import patch, MagicMock
 from html import escape
 from pathlib import Path
 from json import loads as json_loads, dumps as json_dumps, load as json_stream_load
 
-from bc.models import BcComment
+import bc.utils
+from bc.models import (BcCloudFile, BcComment, BcMessage, BcQuestionAnswer, BcRecurrenceSchedule, BcScheduleEntry,
+                       BcTodo, BcTodoCompletion, BcTodolist, BcWebhook, BcWebhookQueue)
 
 
 class ViewsProjectTest(TestCase):
@@ -141,6 +148,43 @@ class ViewsProjectTest(TestCase):
                              f'{self.project_2085958497["id"]}</a> {self.project_2085958497["name"]}</li>'
                              .encode(response.charset))
 
+    def test_app_project_main_with_next_page(self):
+
+        with (
+            patch('bc.views.project.session_get_token_and_identity') as mock_get_token_and_identity,
+            patch('bc.views.project.bc_api_get') as mock_request_get,
+            patch('bc.utils.api.bc_api_get') as mock_request_get_next_page
+        ):
+            _token = {'access_token': 'access token', }
+            _identity = {'id': 1, }
+            mock_get_token_and_identity.return_value = _token, _identity
+
+            next_uri = 'https://3.basecampapi.com/195539477/projects.json?page=2'
+            mock_request_get.return_value.status_code = 200
+            mock_request_get.return_value.json.return_value = [self.project, ]
+            mock_request_get.return_value.links = {'next': {'url': next_uri}}
+            mock_request_get.return_value.headers = {"X-Total-Count": 2, }
+
+            mock_request_get_next_page.return_value.status_code = 200
+            mock_request_get_next_page.return_value.json.return_value = [self.project_2085958497, ]
+            mock_request_get_next_page.return_value.links = {}
+
+            # response: https://docs.djangoproject.com/en/dev/ref/request-response/#django.http.HttpResponse
+            response = self.client.get(reverse('app-project-main'))
+
+            mock_request_get.assert_called_once()
+            mock_request_get_next_page.assert_called_once_with(uri=next_uri, access_token=_token["access_token"])
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content,
+                             f'<a href="/bc/">back to main</a><br/>'
+                             f'total projects: 2'
+                             f'<li><a href="/bc/project/{self.project["id"]}">'
+                             f'{self.project["id"]}</a> {self.project["name"]}</li>'
+                             f'<li><a href="/bc/project/{self.project_2085958497["id"]}">'
+                             f'{self.project_2085958497["id"]}</a> {self.project_2085958497["name"]}</li>'
+                             .encode(response.charset))
+
     def test_app_project_detail(self):
         with (
             patch('bc.views.project.session_get_token_and_identity') as mock_get_token_and_identity,
@@ -924,6 +968,78 @@ class ViewsMessageTest(TestCase):
                              f'{self.message["id"]}&quot;&gt;{self.message["id"]}&lt;/a&gt;'
                              f' We won Leto! (db)&lt;/li&gt;<br/>'.encode(response.charset))
 
+    def get_message_board_message_with_hydrate(self, messages):
+        """
+        :param messages: json data of the messages API, also returned by the message API of each
+        :return: response
+        """
+        bucket_id = self.message["bucket"]["id"]
+        details = {bc.utils.api_message_get_bucket_message_uri(bucket_id=bucket_id, message_id=message["id"]): message
+                   for message in messages}
+
+        with (
+            patch('bc.views.message.session_get_token_and_identity') as mock_get_token_and_identity,
+            patch('bc.views.message.bc_api_get') as mock_request_get,
+            patch('bc.utils.api.bc_api_get') as mock_request_get_detail
+        ):
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            mock_request_get.return_value.status_code = 200
+            mock_request_get.return_value.json.return_value = messages
+            mock_request_get.return_value.links = {}
+            mock_request_get_detail.side_effect = lambda uri, access_token: MagicMock(
+                status_code=200, content=json_dumps(details[uri]).encode())
+
+            return self.client.get(reverse('app-message-board-message', kwargs={
+                'bucket_id': bucket_id, 'message_board_id': self.message["parent"]["id"]}) + '?hydrate=1')
+
+    def test_app_message_board_message_with_hydrate(self):
+        messages = [dict(self.message, id=1, subject='First message'), dict(self.message, id=2, subject='Second one')]
+        response = self.get_message_board_message_with_hydrate(messages=messages)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.count(b'(db)'), 2)
+        self.assertEqual(list(BcMessage.objects.filter(id__in=[1, 2]).order_by('id').values_list('subject', flat=True)),
+                         ['First message', 'Second one'])
+        self.assertEqual(BcMessage.objects.get(id=1).parent.id, self.message["parent"]["id"])
+
+    def test_app_message_board_message_with_hydrate_parent_not_in_db(self):
+        # the second message in the other project, its message board not in db
+        messages = [dict(self.message, id=1),
+                    dict(self.message, id=2, bucket=dict(self.message["bucket"], id=2085958497),
+                         parent=dict(self.message["parent"], id=3))]
+        response = self.get_message_board_message_with_hydrate(messages=messages)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Message::Board 3 not found', response.content.decode())
+        # the link to the message board in the project of the message, not of the first one
+        self.assertIn(reverse('app-message-board-detail', kwargs={'bucket_id': 2085958497, 'message_board_id': 3}),
+                      response.content.decode())
+        self.assertFalse(BcMessage.objects.filter(id__in=[1, 2]).exists())  # none saved
+
+    def test_app_message_board_message_with_hydrate_row_without_bucket(self):
+        messages = [dict(self.message, id=1), dict(self.message, id=2)]
+        del messages[1]["bucket"]
+        response = self.get_message_board_message_with_hydrate(messages=messages)
+        self.assertEqual(response.status_code, 400)  # validated before hydrate, not a KeyError
+        self.assertFalse(BcMessage.objects.filter(id__in=[1, 2]).exists())
+
+    def test_app_project_recording_by_type_with_invalid_message_parent(self):
+        message = dict(self.message, parent=dict(self.message["parent"], type='Todolist'))
+
+        with (
+            patch('bc.views.recording.session_get_token_and_identity') as mock_get_token_and_identity,
+            patch('bc.views.recording.bc_api_get') as mock_request_get
+        ):
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            mock_request_get.return_value.status_code = 200
+            mock_request_get.return_value.json.return_value = [message]
+            mock_request_get.return_value.links = {}
+
+            response = self.client.get(reverse('app-project-recording-by-type', kwargs={
+                'bucket_id': message["bucket"]["id"], 'recording_type': 'Message'}))
+
+        self.assertEqual(response.status_code, 400)
+        # the parent types of a message, not of a comment
+        self.assertIn(escape(str(bc.utils.static_get_message_parent_types())), response.content.decode())
+
     def test_app_message_detail(self):
         with (
             patch('bc.views.message.session_get_token_and_identity') as mock_get_token_and_identity,
@@ -1504,3 +1620,464 @@ class ViewsCommentTest(TestCase):
             # make sure the new comment created
             _comment = BcComment.objects.get(pk=self.comment["id"])
             self.assertEqual(_comment.title, self.comment["title"])
+
+    def get_project_comment(self, query=''):
+        with patch('bc.views.comment.session_get_token_and_identity') as mock_get_token_and_identity:
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            return self.client.get(reverse('app-project-comment',
+                                           kwargs={'bucket_id': self.comment["bucket"]["id"]}) + query)
+
+    def test_app_project_comment(self):
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_project_comment()
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('saved comments: 1<br/>', content)
+        self.assertIn(reverse('app-comment-detail', kwargs={'bucket_id': self.comment["bucket"]["id"],
+                                                            'comment_id': self.comment["id"]}), content)
+        self.assertIn(reverse('app-message-detail', kwargs={'bucket_id': self.comment["bucket"]["id"],
+                                                            'message_id': self.comment["parent"]["id"]}), content)
+
+        # the parents loaded with a query per parent model, not per comment
+        _comment = BcComment.objects.get(id=self.comment["id"])
+        for comment_id in range(1, 20):
+            _comment.id = comment_id
+            _comment.save(force_insert=True)
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(len(queries)):
+            response = self.get_project_comment()
+        self.assertIn('saved comments: 20<br/>', response.content.decode())
+
+        self.assertIn('saved comments: 5<br/>', self.get_project_comment(query='?limit=5').content.decode())
+        self.assertEqual(self.get_project_comment(query='?limit=all').status_code, 400)
+
+
+class ViewsTodoTest(TestCase):
+    fixtures = ["bc_bccompany", "bc_bcpeople",
+                "bc_bcproject", "bc_bcprojecttool",
+                "bc_bctodoset", "bc_bctodolist", ]
+
+    @classmethod
+    def setUpTestData(cls):  # Run once to set up non-modified data for all class methods
+        environ["BASECAMP_API_URI"] = "https://3.basecampapi.com"
+        environ["BASECAMP_ACCOUNT_ID"] = "999999999"
+
+        # api_sample.json is collections of API data from bc3-api site https://github.com/basecamp/bc3-api/tree/master
+        test_dir = Path(__file__).resolve().parent
+        with open(test_dir / "api_sample.json") as stream:
+            api_sample_json = json_stream_load(stream)
+
+        # sample API data from https://github.com/basecamp/bc3-api/blob/master/sections/todos.md#get-a-to-do
+        cls.todo_data = json_dumps(api_sample_json["todo"]["1069479523"])
+
+        # sample API data from https://github.com/basecamp/bc3-api/blob/master/sections/todolists.md#get-a-to-do-list
+        cls.todolist_data = json_dumps(api_sample_json["todolist"]["1069479520"])
+
+    def setUp(self):  # Run once for every test method to set up clean data
+        todo = json_loads(self.todo_data)
+        # two todos of the todolist 1069479520, none saved yet
+        self.todos = [todo, dict(todo, id=todo["id"] + 1, title='Other todo')]
+        self.bucket_id = todo["bucket"]["id"]
+        self.not_found_ids = []  # the detail API returns 404
+
+    def mock_todo_detail(self, uri, access_token):
+        for todo in self.todos:
+            if todo["id"] not in self.not_found_ids and uri == bc.utils.api_todo_get_bucket_todo_uri(
+                    bucket_id=self.bucket_id, todo_id=todo["id"]):
+                return MagicMock(status_code=200, content=json_dumps(todo).encode())
+        return MagicMock(status_code=404)
+
+    def get_todo_main(self, query=''):
+        with (
+            patch('bc.views.todo.session_get_token_and_identity') as mock_get_token_and_identity,
+            patch('bc.views.todo.bc_api_get') as mock_request_get,
+            patch('bc.utils.api.bc_api_get', side_effect=self.mock_todo_detail) as mock_request_get_detail
+        ):
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            mock_request_get.return_value.status_code = 200
+            mock_request_get.return_value.json.return_value = self.todos
+            mock_request_get.return_value.links = {}
+
+            response = self.client.get(reverse('app-todo-main', kwargs={'bucket_id': self.bucket_id,
+                                                                        'todolist_id': 1069479520}) + query)
+            return response, mock_request_get_detail.call_count
+
+    def test_app_todo_main(self):
+        response, detail_count = self.get_todo_main()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(detail_count, 0)
+        self.assertNotIn(b'(db)', response.content)
+        self.assertFalse(BcTodo.objects.exists())  # saved only at app_todo_detail, or hydrate
+
+    def test_app_todo_main_with_hydrate(self):
+        response, detail_count = self.get_todo_main(query='?hydrate=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(detail_count, 2)
+        self.assertEqual(response.content.count(b'(db)'), 2)
+        self.assertEqual(BcTodo.objects.get(id=self.todos[1]["id"]).title, 'Other todo')
+        self.assertEqual([_assignee.id for _assignee in BcTodo.objects.get(id=self.todos[0]["id"]).assignees.all()],
+                         [1049715937])
+
+        # saved and not updated since, not requested again
+        response, detail_count = self.get_todo_main(query='?hydrate=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(detail_count, 0)
+
+    def test_app_todo_main_with_hydrate_detail_not_ok(self):
+        self.not_found_ids = [self.todos[1]["id"]]
+        response, _detail_count = self.get_todo_main(query='?hydrate=1')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BcTodo.objects.exists())  # none saved
+
+    def test_app_todo_main_with_hydrate_parent_not_in_db(self):
+        self.todos[1]["parent"] = dict(self.todos[1]["parent"], id=1)
+        response, detail_count = self.get_todo_main(query='?hydrate=1')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Todolist 1 not found', response.content.decode())
+        self.assertFalse(BcTodo.objects.exists())  # none saved
+
+    def test_app_todo_main_with_hydrate_row_without_bucket(self):
+        del self.todos[1]["bucket"]
+        response, detail_count = self.get_todo_main(query='?hydrate=1')
+        self.assertEqual(response.status_code, 400)  # validated before hydrate, not a KeyError
+        self.assertEqual(detail_count, 0)
+        self.assertFalse(BcTodo.objects.exists())
+
+    def get_todolist_main_with_hydrate(self, todolists):
+        """
+        :param todolists: json data of the todolists API, also returned by the todolist API of each
+        :return: response
+        """
+        details = {bc.utils.api_todolist_get_bucket_todolist_uri(bucket_id=self.bucket_id, todolist_id=todolist["id"]):
+                   todolist for todolist in todolists}
+
+        with (
+            patch('bc.views.todolist.session_get_token_and_identity') as mock_get_token_and_identity,
+            patch('bc.views.todolist.bc_api_get') as mock_request_get,
+            patch('bc.utils.api.bc_api_get') as mock_request_get_detail
+        ):
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            mock_request_get.return_value.status_code = 200
+            mock_request_get.return_value.json.return_value = todolists
+            mock_request_get.return_value.links = {}
+            mock_request_get_detail.side_effect = lambda uri, access_token: MagicMock(
+                status_code=200, content=json_dumps(details[uri]).encode())
+
+            return self.client.get(reverse('app-todolist-main', kwargs={'bucket_id': self.bucket_id,
+                                                                        'todoset_id': 1069479339}) + '?hydrate=1')
+
+    def test_app_todolist_main_with_hydrate(self):
+        todolist = json_loads(self.todolist_data)
+        response = self.get_todolist_main_with_hydrate(todolists=[dict(todolist, id=1, title='First todolist'),
+                                                                  dict(todolist, id=2, title='Other todolist')])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.count(b'(db)'), 2)
+        self.assertEqual(BcTodolist.objects.get(id=2).title, 'Other todolist')
+        self.assertEqual(BcTodolist.objects.get(id=1).parent.id, 1069479339)  # the todoset
+
+    def test_app_todolist_main_with_hydrate_parent_not_in_db(self):
+        todolist = json_loads(self.todolist_data)
+        response = self.get_todolist_main_with_hydrate(todolists=[
+            dict(todolist, id=1), dict(todolist, id=2, parent=dict(todolist["parent"], id=3))])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Todoset 3 not found', response.content.decode())
+        self.assertFalse(BcTodolist.objects.filter(id__in=[1, 2]).exists())  # none saved
+
+    def get_todo_detail(self, todo):
+        with (
+            patch('bc.views.todo.session_get_token_and_identity') as mock_get_token_and_identity,
+            patch('bc.views.todo.bc_api_get') as mock_request_get
+        ):
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            mock_request_get.return_value.status_code = 200
+            mock_request_get.return_value.json.return_value = json_loads(json_dumps(todo))  # a copy per visit
+
+            return self.client.get(reverse('app-todo-detail', kwargs={'bucket_id': self.bucket_id,
+                                                                      'todo_id': todo["id"]}))
+
+    def test_app_todo_detail_upsert(self):
+        todo = dict(self.todos[0], completed=True,
+                    completion={'created_at': '2016-12-01T10:00:00.000Z', 'creator': self.todos[0]["creator"]})
+
+        for _ in range(3):  # visited again, the completion not created again
+            response = self.get_todo_detail(todo=todo)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(BcTodoCompletion.objects.count(), 1)
+
+        # updated on Basecamp, the todo and its completion updated
+        todo.update(title='Updated todo', updated_at='2016-12-02T10:00:00.000Z',
+                    completion=dict(todo["completion"], created_at='2016-12-02T09:00:00.000Z'))
+        response = self.get_todo_detail(todo=todo)
+        self.assertEqual(response.status_code, 200)
+        _todo = BcTodo.objects.get(id=todo["id"])
+        self.assertEqual(_todo.title, 'Updated todo')
+        self.assertEqual(BcTodoCompletion.objects.count(), 1)
+        self.assertEqual(_todo.completion.created_at, parse_datetime('2016-12-02T09:00:00.000Z'))
+
+        # un-completed, the completion removed
+        todo.update(completed=False, updated_at='2016-12-03T10:00:00.000Z')
+        todo.pop('completion')
+        response = self.get_todo_detail(todo=todo)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(BcTodoCompletion.objects.exists())
+
+
+class ViewsScheduleTest(TestCase):
+    fixtures = ["bc_bccompany", "bc_bcpeople",
+                "bc_bcproject", "bc_bcprojecttool",
+                "bc_bcrecurrenceschedule", "bc_bcschedule", ]
+
+    @classmethod
+    def setUpTestData(cls):  # Run once to set up non-modified data for all class methods
+        environ["BASECAMP_API_URI"] = "https://3.basecampapi.com"
+        environ["BASECAMP_ACCOUNT_ID"] = "999999999"
+
+        test_dir = Path(__file__).resolve().parent
+        with open(test_dir / "api_sample.json") as stream:
+            api_sample_json = json_stream_load(stream)
+
+        # sample API data from https://github.com/basecamp/bc3-api/blob/master/sections/schedule_entries.md
+        cls.schedule_entry_data = json_dumps(api_sample_json["schedule_entry"]["1069479847"])
+
+    def setUp(self):  # Run once for every test method to set up clean data
+        self.schedule_entry = json_loads(self.schedule_entry_data)
+        self.bucket_id = self.schedule_entry["bucket"]["id"]
+
+    def get_schedule_entry_with_hydrate(self, schedule_entries):
+        """
+        :param schedule_entries: json data of the schedule entries API, also returned by the schedule entry API of each
+        :return: response
+        """
+        details = {bc.utils.api_schedule_get_bucket_schedule_entry_uri(bucket_id=self.bucket_id,
+                                                                       schedule_entry_id=schedule_entry["id"]):
+                   schedule_entry for schedule_entry in schedule_entries}
+
+        with (
+            patch('bc.views.schedule.session_get_token_and_identity') as mock_get_token_and_identity,
+            patch('bc.views.schedule.bc_api_get') as mock_request_get,
+            patch('bc.utils.api.bc_api_get') as mock_request_get_detail
+        ):
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            mock_request_get.return_value.status_code = 200
+            mock_request_get.return_value.json.return_value = schedule_entries
+            mock_request_get.return_value.links = {}
+            mock_request_get_detail.side_effect = lambda uri, access_token: MagicMock(
+                status_code=200, content=json_dumps(details[uri]).encode())
+
+            return self.client.get(reverse('app-schedule-entry', kwargs={
+                'bucket_id': self.bucket_id, 'schedule_id': self.schedule_entry["parent"]["id"]}) + '?hydrate=1')
+
+    def test_app_schedule_entry_with_hydrate(self):
+        response = self.get_schedule_entry_with_hydrate(schedule_entries=[
+            dict(self.schedule_entry, id=1),
+            dict(self.schedule_entry, id=2, summary='Retrospective', starts_at='2022-11-30T10:00:00.000Z')])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.count(b'(db)'), 2)
+        _schedule_entry = BcScheduleEntry.objects.get(id=2)
+        self.assertEqual(_schedule_entry.summary, 'Retrospective')
+        self.assertEqual(_schedule_entry.starts_at, parse_datetime('2022-11-30T10:00:00.000Z'))
+        self.assertEqual(BcScheduleEntry.objects.get(id=1).parent.id, self.schedule_entry["parent"]["id"])
+
+    def test_app_schedule_entry_with_hydrate_parent_not_in_db(self):
+        response = self.get_schedule_entry_with_hydrate(schedule_entries=[
+            dict(self.schedule_entry, id=1), dict(self.schedule_entry, id=2, parent=dict(self.schedule_entry["parent"],
+                                                                                       id=3))])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Schedule 3 not found', response.content.decode())
+        self.assertFalse(BcScheduleEntry.objects.filter(id__in=[1, 2]).exists())  # none saved
+
+    def test_app_schedule_entry_with_hydrate_row_without_bucket(self):
+        schedule_entries = [dict(self.schedule_entry, id=1), dict(self.schedule_entry, id=2)]
+        del schedule_entries[1]["bucket"]
+        response = self.get_schedule_entry_with_hydrate(schedule_entries=schedule_entries)
+        self.assertEqual(response.status_code, 400)  # validated before hydrate, not a KeyError
+        self.assertFalse(BcScheduleEntry.objects.filter(id__in=[1, 2]).exists())
+
+
+class ViewsQuestionnaireTest(TestCase):
+    fixtures = ["bc_bccompany", "bc_bcpeople",
+                "bc_bcproject", "bc_bcprojecttool",
+                "bc_bcquestionnaire", "bc_bcquestion", "bc_bcrecurrenceschedule", ]
+
+    @classmethod
+    def setUpTestData(cls):  # Run once to set up non-modified data for all class methods
+        environ["BASECAMP_API_URI"] = "https://3.basecampapi.com"
+        environ["BASECAMP_ACCOUNT_ID"] = "999999999"
+
+        test_dir = Path(__file__).resolve().parent
+        with open(test_dir / "api_sample.json") as stream:
+            api_sample_json = json_stream_load(stream)
+
+        # sample API data from https://github.com/basecamp/bc3-api/blob/master/sections/questions.md#get-a-question
+        cls.question_data = json_dumps(api_sample_json["question"]["1069479362"])
+
+        # sample API data from https://github.com/basecamp/bc3-api/blob/master/sections/question_answers.md
+        cls.question_answer_data = json_dumps(api_sample_json["question_answer"]["1069479547"])
+
+    def test_app_question_detail_upsert(self):
+        question = json_loads(self.question_data)
+        schedule_count = BcRecurrenceSchedule.objects.count()
+
+        for day in range(1, 4):  # updated on Basecamp at every visit, the schedule of the question updated
+            question.update(updated_at=f'2023-01-0{day}T10:00:00.000Z', schedule=dict(question["schedule"], days=[day]))
+            with (
+                patch('bc.views.questionnaire.session_get_token_and_identity') as mock_get_token_and_identity,
+                patch('bc.views.questionnaire.bc_api_get') as mock_request_get
+            ):
+                mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+                mock_request_get.return_value.status_code = 200
+                mock_request_get.return_value.json.return_value = json_loads(json_dumps(question))
+
+                response = self.client.get(reverse('app-question-detail', kwargs={
+                    'bucket_id': question["bucket"]["id"], 'question_id': question["id"]}))
+                self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(BcRecurrenceSchedule.objects.count(), schedule_count)  # reused, not created again
+        self.assertEqual(BcRecurrenceSchedule.objects.get(bcquestion__id=question["id"]).days, [3])
+
+    def get_question_answer_with_hydrate(self, answers):
+        """
+        :param answers: json data of the question answers API, also returned by the question answer API of each
+        :return: response
+        """
+        question = json_loads(self.question_data)
+        bucket_id = question["bucket"]["id"]
+        details = {bc.utils.api_questionnaire_get_bucket_question_answer_uri(bucket_id=bucket_id,
+                                                                             question_answer_id=answer["id"]): answer
+                   for answer in answers}
+
+        with (
+            patch('bc.views.questionnaire.session_get_token_and_identity') as mock_get_token_and_identity,
+            patch('bc.views.questionnaire.bc_api_get') as mock_request_get,
+            patch('bc.utils.api.bc_api_get') as mock_request_get_detail
+        ):
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            mock_request_get.return_value.status_code = 200
+            mock_request_get.return_value.json.return_value = answers
+            mock_request_get.return_value.links = {}
+            mock_request_get_detail.side_effect = lambda uri, access_token: MagicMock(
+                status_code=200, content=json_dumps(details[uri]).encode())
+
+            return self.client.get(reverse('app-question-answer', kwargs={
+                'bucket_id': bucket_id, 'question_id': question["id"]}) + '?hydrate=1')
+
+    def test_app_question_answer_with_hydrate(self):
+        answer = json_loads(self.question_answer_data)
+        response = self.get_question_answer_with_hydrate(answers=[
+            dict(answer, id=1), dict(answer, id=2, content='<div>Reviewed the pull requests</div>')])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.count(b'(db)'), 2)
+        self.assertEqual(BcQuestionAnswer.objects.get(id=2).content, '<div>Reviewed the pull requests</div>')
+        self.assertEqual(BcQuestionAnswer.objects.get(id=1).parent.id, 1069479362)  # the question
+
+    def test_app_question_answer_with_hydrate_parent_not_in_db(self):
+        answer = json_loads(self.question_answer_data)
+        response = self.get_question_answer_with_hydrate(answers=[
+            dict(answer, id=1), dict(answer, id=2, parent=dict(answer["parent"], id=3))])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Question 3 not found', response.content.decode())
+        self.assertFalse(BcQuestionAnswer.objects.filter(id__in=[1, 2]).exists())  # none saved
+
+
+class ViewsWebhookMainTest(TestCase):
+    fixtures = ["bc_bccompany", "bc_bcpeople", "bc_bcproject", "bc_bcprojecttool",
+                "bc_bcvault", "bc_bcwebhook", "bc_bccloudfile", "bc_bcgoogledocument"]
+
+    def get_webhook_main(self, query=''):
+        with patch('bc.views.webhook.session_get_token_and_identity') as mock_get_token_and_identity:
+            mock_get_token_and_identity.return_value = {'access_token': 'access token', }, {'id': 1, }
+            return self.client.get(reverse('app-webhook-main') + query)
+
+    def test_app_webhook_main(self):
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_webhook_main()
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('webhooks: 3<br/>', content)
+        self.assertIn('cloud_file_created by Annie Bryan: CloudFile 968814336', content)
+        self.assertIn('todo_copied by Annie Bryan (recording not in db)', content)
+        _cloud_file = BcCloudFile.objects.get(id=968814336)
+        self.assertIn(reverse('app-vault-detail', kwargs={'bucket_id': _cloud_file.bucket_id,
+                                                          'vault_id': _cloud_file.parent_object_id}), content)
+
+        # the recordings and their parents loaded with a query per model, not per webhook
+        for _webhook in list(BcWebhook.objects.all()):
+            for _ in range(9):
+                _webhook.id += 1000
+                _webhook.save(force_insert=True)
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(len(queries)):
+            response = self.get_webhook_main()
+        self.assertIn('webhooks: 30<br/>', response.content.decode())
+
+    def test_app_webhook_main_with_kind_and_limit(self):
+        response = self.get_webhook_main(query='?kind=cloud_file_created')
+        self.assertIn('webhooks: 1<br/>', response.content.decode())
+        self.assertIn('webhooks: 2<br/>', self.get_webhook_main(query='?limit=2').content.decode())
+        self.assertEqual(self.get_webhook_main(query='?limit=-1').status_code, 400)
+
+    def test_app_webhook_main_with_no_token(self):
+        with patch('bc.views.webhook.session_get_token_and_identity') as mock_get_token_and_identity:
+            mock_get_token_and_identity.return_value = None, None
+            response = self.client.get(reverse('app-webhook-main'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('bc-auth'))
+
+
+class ViewsWebhookTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):  # Run once to set up non-modified data for all class methods
+
+        # api_sample.json is collections of API data from bc3-api site https://github.com/basecamp/bc3-api/tree/master
+        test_dir = Path(__file__).resolve().parent
+        with open(test_dir / "api_sample.json") as stream:
+            api_sample_json = json_stream_load(stream)
+
+        # sample API data from https://github.com/basecamp/bc3-api/blob/master/sections/webhooks.md
+        cls.webhook_data_1479523571 = json_dumps(api_sample_json["webhook"]["1479523571"])
+
+    def setUp(self):  # Run once for every test method to set up clean data
+        self.webhook = json_loads(self.webhook_data_1479523571)
+
+    def post_webhook(self, data, uri=None):
+        return self.client.post(uri or reverse('app-webhook-receiver'), data=data, content_type='application/json')
+
+    def test_app_webhook_receiver(self):
+        response = self.post_webhook(data=self.webhook)
+        self.assertEqual(response.status_code, 200)
+        _item = BcWebhookQueue.objects.get(webhook_id=self.webhook["id"])
+        self.assertEqual(_item.status, BcWebhookQueue.STATUS_PENDING)
+        self.assertEqual(_item.payload, self.webhook)
+
+        # redelivered webhook queued once
+        response = self.post_webhook(data=self.webhook)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BcWebhookQueue.objects.count(), 1)
+
+    def test_app_webhook_receiver_with_invalid_payload(self):
+        response = self.post_webhook(data='not json')
+        self.assertEqual(response.status_code, 400)
+
+        self.webhook.pop('recording')
+        response = self.post_webhook(data=self.webhook)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, b'webhook payload has no recording')
+
+        response = self.post_webhook(data=[self.webhook])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BcWebhookQueue.objects.exists())
+
+    def test_app_webhook_receiver_with_get(self):
+        response = self.client.get(reverse('app-webhook-receiver'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_app_webhook_receiver_with_secret(self):
+        with patch.dict(environ, {"BASECAMP_WEBHOOK_SECRET": "secret"}):
+            response = self.post_webhook(data=self.webhook)
+            self.assertEqual(response.status_code, 403)
+
+            response = self.post_webhook(data=self.webhook, uri=reverse('app-webhook-receiver') + '?secret=secret')
+            self.assertEqual(response.status_code, 200)
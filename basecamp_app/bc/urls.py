@@ -24,6 +24,7 @@ urlpatterns = [
     path('recording/', views.app_recording_main, name='app-recording-main'),
     path('recording/type/<recording_type>', views.app_recording_by_type, name='app-recording-by-type'),
     # comment
+    path('project/<int:bucket_id>/comment/', views.app_project_comment, name='app-project-comment'),
     path('project/<int:bucket_id>/comment/<int:comment_id>', views.app_comment_detail, name='app-comment-detail'),
     # message_type
     path('project/<int:bucket_id>/message/type', views.app_message_type, name='app-message-type'),
@@ -68,4 +69,7 @@ urlpatterns = [
     path('project/<int:bucket_id>/vault/<int:vault_id>/uploads', views.app_vault_uploads, name='app-vault-uploads'),
     path('project/<int:bucket_id>/document/<int:document_id>', views.app_document_detail, name='app-document-detail'),
     path('project/<int:bucket_id>/upload/<int:upload_id>', views.app_upload_detail, name='app-upload-detail'),
+    # webhook
+    path('webhook/', views.app_webhook_main, name='app-webhook-main'),
+    path('webhook/receiver', views.app_webhook_receiver, name='app-webhook-receiver'),
 ]
@@ -1,6 +1,10 @@
 from .const import *
+from .api_cache import *
 from .api import *  # api uses const, so put const above api
+from .api_async import *
 from .repr import *  # db uses repr, so put repr above db
 from .db import *
+from .sync import *  # sync uses db, so put db above sync
+from .webhook import *
 from .session import *
 from .urls import *
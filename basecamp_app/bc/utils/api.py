@@ -1,15 +1,275 @@
 from os import environ
-from requests import get as http_get
+from atexit import register as atexit_register
+from codecs import getincrementaldecoder
+from concurrent.futures import ThreadPoolExecutor
+from json import JSONDecoder, JSONDecodeError
+from math import ceil
+from threading import Lock
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from requests import Session
+from requests.adapters import HTTPAdapter
 
 from bc.utils import static_get_recording_types
+from .api_cache import bc_api_cache_get, bc_api_cache_set_streamed
 
 # utilities to process environment variables and APIs
 
+_bc_api_session = None  # process-wide session, created on first use by bc_api_session()
+_bc_api_session_lock = Lock()
 
-def bc_api_get(uri, access_token):
-    basecamp_user_agent = environ["BASECAMP_USER_AGENT"]
-    return http_get(url=uri,
-                    headers={"Authorization": "Bearer " + access_token, "User-Agent": basecamp_user_agent})
+
+def bc_api_session():
+    """
+    process-wide (thread-safe) http session, so sequential requests reuse the TCP+TLS connection to the API host.
+    configurable with environment variables:
+    * BASECAMP_API_POOL_CONNECTIONS: number of hosts to keep a connection pool for (default: 4)
+    * BASECAMP_API_POOL_MAXSIZE: number of kept-alive connections per host (default: 10)
+    * BASECAMP_API_KEEP_ALIVE: set "0" to close the connection after each request (default: "1")
+    :return: requests.Session
+    """
+    global _bc_api_session
+
+    if _bc_api_session is None:
+        with _bc_api_session_lock:
+            if _bc_api_session is None:  # check again, other thread may create the session while waiting the lock
+                adapter = HTTPAdapter(pool_connections=int(environ.get("BASECAMP_API_POOL_CONNECTIONS", 4)),
+                                      pool_maxsize=int(environ.get("BASECAMP_API_POOL_MAXSIZE", 10)))
+                session = Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                # the header set is the same for every request, read the user agent only once
+                session.headers.update({"User-Agent": environ["BASECAMP_USER_AGENT"]})
+                if environ.get("BASECAMP_API_KEEP_ALIVE", "1") == "0":
+                    session.headers.update({"Connection": "close"})
+                _bc_api_session = session
+
+    return _bc_api_session
+
+
+def bc_api_close():
+    """
+    close the pooled connections, call on worker shutdown (registered to atexit and gunicorn worker_exit).
+    the next call of bc_api_session() will create a new session.
+    :return:
+    """
+    global _bc_api_session
+
+    with _bc_api_session_lock:
+        if _bc_api_session is not None:
+            _bc_api_session.close()
+            _bc_api_session = None
+
+
+atexit_register(bc_api_close)
+
+
+def bc_api_get(uri, access_token, stream=False):
+    """
+    GET through the pooled session and the response cache (revalidated with ETag / Last-Modified), see bc_api_cache().
+    :param uri:
+    :param access_token:
+    :param stream: do not read the body, to decode a list with bc_api_iter_json as it downloads
+    :return: requests.Response
+    """
+    if stream:
+        return bc_api_cache_get(session=bc_api_session(), uri=uri, access_token=access_token, stream=True)
+    return bc_api_cache_get(session=bc_api_session(), uri=uri, access_token=access_token)
+
+
+def _bc_api_skip_whitespace(text, position):
+    while position < len(text) and text[position] in ' \t\n\r':
+        position += 1
+    return position
+
+
+def bc_api_iter_json(response, chunk_size=65536):
+    """
+    iterate the records of a list API (json array) as the body is read, instead of response.json() that decodes the
+    whole list first. with bc_api_get(stream=True) the body is read from the socket chunk by chunk: the first records
+    are saved while the rest is downloading, and the list of records is never built.
+    a response already read (not streamed, or from the cache) is decoded the same way from its content.
+    once the array is read to the end, its number of records is kept in response.bc_api_json_count, the page size
+    used by bc_api_iter_pages to predict the next pages.
+    :param response: requests.Response of a list API, status 200
+    :param chunk_size: bytes read from the socket at once
+    :return: generator of json data, ValueError if the body is not a json array
+    """
+    streamed = response._content is False  # body not read yet
+    keep = streamed and hasattr(response, 'bc_api_cache_key')  # the body cached once read, see bc_api_cache_get
+    chunks = response.iter_content(chunk_size=chunk_size) if streamed else [response.content]
+    text_decoder = getincrementaldecoder(response.encoding or 'utf-8')()
+    decoder = JSONDecoder()
+    kept = []
+    text = ''
+    position = 0
+    started = ended = False
+    expect_value = True  # after '[' or ','
+    empty = True
+    count = 0
+
+    try:
+        for chunk in chunks:
+            if keep:
+                kept.append(chunk)
+            text = text[position:] + text_decoder.decode(chunk)
+            position = 0
+
+            while not ended:
+                position = _bc_api_skip_whitespace(text, position)
+                if position == len(text):  # read more
+                    break
+
+                if not started:
+                    if text[position] != '[':
+                        raise ValueError('json body is not an array')
+                    started = True
+                    position += 1
+                elif text[position] == ']' and (empty or not expect_value):
+                    ended = True
+                    position += 1
+                elif not expect_value:
+                    if text[position] != ',':
+                        raise ValueError(f'json array expects "," at {text[position:position + 20]!r}')
+                    expect_value = True
+                    position += 1
+                else:
+                    try:
+                        value, end = decoder.raw_decode(text, position)
+                    except JSONDecodeError:  # incomplete record, read more
+                        break
+                    if _bc_api_skip_whitespace(text, end) == len(text):  # may be incomplete (eg: number), read more
+                        break
+                    yield value
+                    count += 1
+                    position = end
+                    expect_value = empty = False
+
+        text += text_decoder.decode(b'', final=True)
+        if not ended or text[position:].strip():
+            raise ValueError('json body is not a complete array')
+        response.bc_api_json_count = count
+    finally:
+        if streamed and not ended:  # stopped by the caller or error, the rest of the body not read
+            response.close()
+
+    if keep:
+        bc_api_cache_set_streamed(response=response, content=b''.join(kept))
+
+
+def bc_api_get_next_uri(response):
+    """
+    https://github.com/basecamp/bc3-api/blob/master/README.md#pagination
+    :param response:
+    :return: uri of the next page from header Link rel="next", None at the last page
+    """
+    if 'next' in response.links and 'url' in response.links["next"]:
+        return response.links["next"]["url"]
+    return None
+
+
+def bc_api_get_page_size(response):
+    """
+    :param response: response of a list API, already iterated by the caller
+    :return: number of records of the page, None if the page is streamed and not read to the end
+    """
+    if hasattr(response, 'bc_api_json_count'):  # counted by bc_api_iter_json
+        return response.bc_api_json_count
+    if response._content is False:  # streamed, the body not read
+        return None
+    return len(response.json())
+
+
+def bc_api_iter_pages(response, access_token, max_workers=None, predict=True, stream=False):
+    """
+    iterate the response of every page of a list API, starting with the response (first page) given.
+    when header X-Total-Count exists, the remaining page uris are predicted from the page size and fetched
+    concurrently (bounded by max_workers), otherwise follow the header Link rel="next" page by page.
+    the page size is the number of records of the first page, counted once the caller iterated it: by
+    bc_api_iter_json if streamed, else from its content. a streamed first page not read to the end is not counted, the
+    pages are followed by the Link rel="next". the predicted pages stop at the first one without Link rel="next" (the
+    list shrank while fetching), the remaining requests are cancelled.
+    pages are yielded in order, stop iterating at a page with status code other than 200.
+
+    :param response: response of the first page (already requested by the caller)
+    :param access_token:
+    :param max_workers: number of concurrent requests, default: env BASECAMP_API_PAGE_WORKERS or 4
+    :param predict: set False to always follow the next link, when the caller may stop before the last page
+    :param stream: the pages followed by the next link not read, to decode them with bc_api_iter_json (the predicted
+                   pages are read anyway, as they are fetched ahead)
+    :return: generator of responses
+    """
+    yield response
+
+    if response.status_code != 200:  # not OK, caller should stop at this page
+        return
+
+    next_uri = bc_api_get_next_uri(response)
+    if not next_uri:  # single page
+        return
+
+    page_uris = []
+    next_page = dict(parse_qsl(urlsplit(next_uri).query)).get('page', '')
+    if predict and "X-Total-Count" in response.headers and next_page.isdigit():
+        page_size = bc_api_get_page_size(response)
+        if page_size:
+            last_page = ceil(int(response.headers["X-Total-Count"]) / page_size)
+            page_uris = [api_get_page_uri(uri=next_uri, page=page) for page in range(int(next_page), last_page + 1)]
+
+    if page_uris:
+        if max_workers is None:
+            max_workers = int(environ.get("BASECAMP_API_PAGE_WORKERS", 4))
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(page_uris))))
+        try:
+            # map yields in order of page_uris while the requests run concurrently
+            for response in executor.map(lambda uri: bc_api_get(uri=uri, access_token=access_token), page_uris):
+                yield response
+                if response.status_code != 200:  # not OK, caller should stop at this page
+                    return
+                if not bc_api_get_next_uri(response):  # the last page, the pages predicted after it are empty
+                    return
+        finally:  # also on caller stop iterating, do not wait the remaining requests
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # the list may grow while fetching, continue the link of the last page (if any)
+        next_uri = bc_api_get_next_uri(response)
+
+    while next_uri:  # as long as next url exists
+        response = (bc_api_get(uri=next_uri, access_token=access_token, stream=True) if stream else
+                    bc_api_get(uri=next_uri, access_token=access_token))
+        yield response
+        if response.status_code != 200:  # not OK, caller should stop at this page
+            return
+        next_uri = bc_api_get_next_uri(response)
+
+
+def bc_api_get_many(uris, access_token, max_workers=None):
+    """
+    GET the uris concurrently with a bounded pool of threads, eg: the detail APIs of the rows of a list
+    :param uris: list of uri from api_*_uri builders
+    :param access_token:
+    :param max_workers: requests in flight, default: env BASECAMP_API_DETAIL_WORKERS or 8
+    :return: list of requests.Response, in order of uris
+    """
+    if not uris:
+        return []
+    if max_workers is None:
+        max_workers = int(environ.get("BASECAMP_API_DETAIL_WORKERS", 8))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(uris)))) as executor:
+        return list(executor.map(lambda uri: bc_api_get(uri=uri, access_token=access_token), uris))
+
+
+def api_get_page_uri(uri, page):
+    """
+    :param uri: uri of a list API, with or without query parameter page
+    :param page:
+    :return: uri with query parameter page replaced
+    """
+    scheme, netloc, path, query, fragment = urlsplit(uri)
+    query_list = [(key, value) for key, value in parse_qsl(query, keep_blank_values=True) if key != 'page']
+    query_list.append(('page', page))
+    return urlunsplit((scheme, netloc, path, urlencode(query_list, safe=':,'), fragment))
 
 
 def api_message_get_bucket_message_types_uri(bucket_id):
@@ -152,24 +412,36 @@ def api_todo_get_bucket_todo_uri(bucket_id, todo_id):
     return f'{basecamp_api_uri}/{basecamp_account_id}/buckets/{bucket_id}/todos/{todo_id}.json'
 
 
-def api_recording_get_recordings_uri(recording_type, bucket=None):
+def api_recording_get_recordings_uri(recording_type, bucket=None, sort=None, direction=None):
     """
     https://github.com/basecamp/bc3-api/blob/master/sections/recordings.md#get-recordings
     :param recording_type: Required parameters.
         which must be Comment, Document, Message, Question::Answer, Schedule::Entry, Todo, Todolist, Upload, or Vault.
     :param bucket: Single/comma separated list of project IDs. Default: All active projects visible to the current user.
+    :param sort: created_at or updated_at. Default: created_at.
+    :param direction: desc or asc. Default: desc.
     :return:
     """
     basecamp_api_uri = environ["BASECAMP_API_URI"]
     basecamp_account_id = environ["BASECAMP_ACCOUNT_ID"]  # id of the organization
     if recording_type not in static_get_recording_types():  # undefined recording_type
         raise ValueError('undefined recording_type')
+    if sort and sort not in ['created_at', 'updated_at']:
+        raise ValueError('undefined sort')
+    if direction and direction not in ['desc', 'asc']:
+        raise ValueError('undefined direction')
     # recording_type defined
     api_uri = f'{basecamp_api_uri}/{basecamp_account_id}/projects/recordings.json?type={recording_type}'
 
     if bucket:  # defined bucket
         api_uri += f'&bucket={bucket}'
 
+    if sort:  # defined sort
+        api_uri += f'&sort={sort}'
+
+    if direction:  # defined direction
+        api_uri += f'&direction={direction}'
+
     return api_uri
 
 
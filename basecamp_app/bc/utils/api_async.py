@@ -0,0 +1,105 @@
+from os import environ
+from asyncio import Semaphore, gather, sleep as async_sleep
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from random import uniform
+from httpx import AsyncClient, Limits
+
+__all__ = ["BcApiAsyncClient", "bc_api_get_async"]
+
+# utilities to request APIs with asyncio, the uri from the same api_*_uri builders used by bc_api_get
+
+
+class BcApiAsyncClient:
+    """
+    asyncio counterpart of bc_api_get, for async views or management commands that fan out many requests.
+    the number of requests in flight is bounded by a semaphore, and a rate-limited response (429) is retried after
+    the header Retry-After (or exponential backoff when undefined) plus a random jitter.
+    https://github.com/basecamp/bc3-api/blob/master/README.md#rate-limiting-429-too-many-requests
+
+    async with BcApiAsyncClient(access_token=token["access_token"]) as client:
+        responses = await client.get_many(uris=[api_todo_get_bucket_todo_uri(bucket_id, todo_id) for todo_id in ids])
+    """
+
+    retry_status_codes = [429, 503]
+
+    def __init__(self, access_token, max_concurrency=None, max_retries=None, backoff=1.0, timeout=30.0):
+        """
+        :param access_token:
+        :param max_concurrency: requests in flight, default: env BASECAMP_API_ASYNC_CONCURRENCY or 10
+        :param max_retries: retries of a rate-limited request, default: env BASECAMP_API_ASYNC_RETRIES or 5
+        :param backoff: base seconds of exponential backoff, also the maximum of random jitter
+        :param timeout: seconds of request timeout
+        """
+        if max_concurrency is None:
+            max_concurrency = int(environ.get("BASECAMP_API_ASYNC_CONCURRENCY", 10))
+        if max_retries is None:
+            max_retries = int(environ.get("BASECAMP_API_ASYNC_RETRIES", 5))
+
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client = AsyncClient(
+            headers={"Authorization": "Bearer " + access_token, "User-Agent": environ["BASECAMP_USER_AGENT"]},
+            limits=Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=timeout)
+        self._semaphore = None  # created inside the running event loop, at __aenter__
+
+    async def __aenter__(self):
+        self._semaphore = Semaphore(self.max_concurrency)
+        await self._client.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._client.__aexit__(exc_type, exc_value, traceback)
+
+    def retry_delay(self, response, attempt):
+        """
+        :param response: rate-limited response
+        :param attempt: 0 for the first retry
+        :return: seconds to wait before retry
+        """
+        retry_after = response.headers.get("Retry-After")
+        delay = None
+        if retry_after:
+            if retry_after.isdigit():  # delay in seconds
+                delay = int(retry_after)
+            else:  # HTTP date
+                try:
+                    delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+
+        if delay is None:  # undefined Retry-After, exponential backoff
+            delay = self.backoff * 2 ** attempt
+
+        return max(0.0, delay) + uniform(0, self.backoff)  # jitter, to not retry all requests at the same time
+
+    async def get(self, uri):
+        """
+        :param uri: from api_*_uri builders
+        :return: httpx.Response, the last response if still rate-limited after max_retries
+        """
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                response = await self._client.get(uri)
+
+            if response.status_code not in self.retry_status_codes or attempt >= self.max_retries:
+                return response
+
+            # wait outside the semaphore, let other requests use the slot
+            await async_sleep(self.retry_delay(response=response, attempt=attempt))
+            attempt += 1
+
+    async def get_many(self, uris):
+        """
+        :param uris: list of uri from api_*_uri builders
+        :return: list of httpx.Response, in order of uris
+        """
+        return await gather(*[self.get(uri) for uri in uris])
+
+
+async def bc_api_get_async(uri, access_token):
+    async with BcApiAsyncClient(access_token=access_token) as client:
+        return await client.get(uri)
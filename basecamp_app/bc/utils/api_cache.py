@@ -0,0 +1,288 @@
+from os import environ, listdir, makedirs, replace as os_replace, remove as os_remove
+from os.path import join as path_join
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from hashlib import sha256
+from json import dump as json_dump, load as json_load
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+# utilities to cache the responses of APIs, revalidated with conditional requests (ETag / Last-Modified)
+# https://github.com/basecamp/bc3-api/blob/master/README.md#use-http-caching
+
+
+class BcApiCacheLocMem:
+    """
+    per-process LRU of cached responses, the least recently used entry removed when more than max_entries.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()  # entries are shared by the page workers of bc_api_iter_pages
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class BcApiCacheFile:
+    """
+    cached responses as files in a directory, shared by the processes (workers) on the same host.
+    the entries are stored as json, the body base64 encoded: a file written by anyone else in the directory is read as
+    data, never run (as it would be with pickle).
+    """
+
+    def __init__(self, location):
+        self.location = location
+        makedirs(self.location, exist_ok=True)
+
+    def _path(self, key):
+        return path_join(self.location, f'{key}.bccache')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json_load(f)
+            return dict(entry, content=b64decode(entry["content"], validate=True))
+        except (OSError, ValueError, KeyError, TypeError):  # not cached, or not an entry (eg: of an old version)
+            return None
+
+    def set(self, key, entry):
+        # write to a temporary file then rename, other processes never read a partial entry
+        with NamedTemporaryFile(mode='w', encoding='utf-8', dir=self.location, delete=False) as f:
+            json_dump(dict(entry, content=b64encode(entry["content"]).decode('ascii')), f)
+        os_replace(f.name, self._path(key))
+
+    def clear(self):
+        for filename in listdir(self.location):
+            if filename.endswith('.bccache'):
+                os_remove(path_join(self.location, filename))
+
+
+class BcApiCacheDjango:
+    """
+    cached responses in the Django cache framework (settings.CACHES), e.g. memcached or redis shared by the hosts.
+    the cache may be shared with other entries (sessions, the reference cache), so the keys are prefixed and
+    versioned: clear() moves to the next version instead of clearing the whole cache, the entries of the previous
+    versions are left to the eviction of the cache.
+    """
+
+    key_prefix = 'bc_api_cache'
+
+    def __init__(self, alias='default'):
+        from django.core.cache import caches  # only import django when this backend is used
+        self._cache = caches[alias]
+
+    def _version(self):
+        # read on every call, the clear of another process is seen at once
+        return self._cache.get_or_set(f'{self.key_prefix}:version', 1, timeout=None)
+
+    def get(self, key):
+        return self._cache.get(f'{self.key_prefix}:{key}', version=self._version())
+
+    def set(self, key, entry):
+        # validated by the API, never expire
+        self._cache.set(f'{self.key_prefix}:{key}', entry, timeout=None, version=self._version())
+
+    def clear(self):
+        try:
+            self._cache.incr(f'{self.key_prefix}:version')
+        except ValueError:  # no version yet, or evicted: the next version of the default one
+            self._cache.set(f'{self.key_prefix}:version', 2, timeout=None)
+
+
+_bc_api_cache = None  # process-wide cache backend, created on first use by bc_api_cache()
+_bc_api_cache_disabled = object()  # the backend when BASECAMP_API_CACHE is "none", the environment read only once
+_bc_api_cache_lock = Lock()
+_bc_api_cache_stats = {'hits': 0, 'misses': 0, 'revalidations': 0}
+_bc_api_cache_stats_lock = Lock()
+
+
+def bc_api_cache():
+    """
+    process-wide cache backend of bc_api_get, configurable with environment variables:
+    * BASECAMP_API_CACHE: "locmem" (default), "file", "django", or "none" to disable the cache
+    * BASECAMP_API_CACHE_LOCATION: directory of "file", cache alias of "django" (default: "default")
+    * BASECAMP_API_CACHE_MAX_ENTRIES: number of responses kept by "locmem" (default: 1000)
+    :return: the backend, None if disabled
+    """
+    global _bc_api_cache
+
+    if _bc_api_cache is None:
+        with _bc_api_cache_lock:
+            if _bc_api_cache is None:  # check again, other thread may create the backend while waiting the lock
+                backend = environ.get("BASECAMP_API_CACHE", "locmem")
+                if backend == "none":
+                    _bc_api_cache = _bc_api_cache_disabled
+                elif backend == "file":
+                    _bc_api_cache = BcApiCacheFile(location=environ["BASECAMP_API_CACHE_LOCATION"])
+                elif backend == "django":
+                    _bc_api_cache = BcApiCacheDjango(alias=environ.get("BASECAMP_API_CACHE_LOCATION", "default"))
+                else:
+                    _bc_api_cache = BcApiCacheLocMem(
+                        max_entries=int(environ.get("BASECAMP_API_CACHE_MAX_ENTRIES", 1000)))
+
+    return None if _bc_api_cache is _bc_api_cache_disabled else _bc_api_cache
+
+
+def bc_api_cache_reset():
+    """
+    drop the backend (and the entries of locmem) and the stats, the next call of bc_api_cache() reads the environment.
+    :return:
+    """
+    global _bc_api_cache
+
+    with _bc_api_cache_lock:
+        _bc_api_cache = None
+    with _bc_api_cache_stats_lock:
+        for stat in _bc_api_cache_stats:
+            _bc_api_cache_stats[stat] = 0
+
+
+def bc_api_cache_stats():
+    """
+    * hits: not modified (304), the response served from the cache
+    * misses: not cached, the response downloaded
+    * revalidations: cached but modified, the response downloaded again
+    :return: dict of the counters since start (or bc_api_cache_reset)
+    """
+    with _bc_api_cache_stats_lock:
+        return dict(_bc_api_cache_stats)
+
+
+def _bc_api_cache_count(stat):
+    with _bc_api_cache_stats_lock:
+        _bc_api_cache_stats[stat] += 1
+
+
+def bc_api_cache_key(uri, access_token):
+    # the response depends on the user (access token), never share the entry between users
+    return sha256(f'{access_token} {uri}'.encode()).hexdigest()
+
+
+def bc_api_cache_conditional_headers(entry):
+    """
+    :param entry: cached entry, or None
+    :return: dict of headers If-None-Match / If-Modified-Since from the validators of the entry
+    """
+    headers = {}
+    if entry is not None:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def bc_api_cache_entry(response):
+    """
+    :param response: downloaded response
+    :return: entry to cache, None if the response is not cacheable (not OK, or without validators)
+    """
+    if response.status_code != 200:
+        return None
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not isinstance(etag, str):
+        etag = None
+    if not isinstance(last_modified, str):
+        last_modified = None
+    if etag is None and last_modified is None:
+        return None
+
+    return {
+        'etag': etag,
+        'last_modified': last_modified,
+        'headers': dict(response.headers),  # keep Link and X-Total-Count, used by bc_api_iter_pages
+        'content': response.content,
+        'encoding': response.encoding,
+    }
+
+
+def bc_api_cache_response(uri, entry):
+    """
+    :param uri:
+    :param entry: cached entry
+    :return: requests.Response (status 200) with the cached body and headers, flagged with from_cache
+    """
+    response = Response()
+    response.status_code = 200
+    response.url = uri
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.encoding = entry["encoding"]
+    response._content = entry["content"]
+    response.from_cache = True
+    return response
+
+
+def bc_api_cache_get(session, uri, access_token, stream=False):
+    """
+    GET with the cache: send the validators of the cached entry, 304 Not Modified returns the cached response.
+    :param session: requests.Session
+    :param uri:
+    :param access_token:
+    :param stream: do not read the body, a downloaded response is cached once read by bc_api_iter_json
+    :return: requests.Response
+    """
+    headers = {"Authorization": "Bearer " + access_token}
+    kwargs = {'stream': True} if stream else {}
+    cache = bc_api_cache()
+    if cache is None:  # disabled
+        return session.get(url=uri, headers=headers, **kwargs)
+
+    key = bc_api_cache_key(uri=uri, access_token=access_token)
+    entry = cache.get(key)
+    headers.update(bc_api_cache_conditional_headers(entry=entry))
+    response = session.get(url=uri, headers=headers, **kwargs)
+
+    if entry is not None and response.status_code == 304:  # not modified
+        _bc_api_cache_count('hits')
+        if stream:  # release the connection to the pool, the (empty) body is never read
+            response.close()
+        return bc_api_cache_response(uri=uri, entry=entry)
+
+    _bc_api_cache_count('misses' if entry is None else 'revalidations')
+    if stream:  # the body not read yet, kept by bc_api_iter_json if the response has validators
+        if response.status_code == 200 and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            response.bc_api_cache_key = key
+        return response
+
+    new_entry = bc_api_cache_entry(response=response)
+    if new_entry is not None:
+        cache.set(key, new_entry)
+    return response
+
+
+def bc_api_cache_set_streamed(response, content):
+    """
+    keep the body of a streamed response, read by bc_api_iter_json, in the response and in the cache
+    :param response: requests.Response from bc_api_cache_get(stream=True), with bc_api_cache_key
+    :param content: the body (bytes)
+    :return:
+    """
+    response._content = content
+    response._content_consumed = True
+
+    cache = bc_api_cache()
+    if cache is not None:
+        new_entry = bc_api_cache_entry(response=response)
+        if new_entry is not None:
+            cache.set(response.bc_api_cache_key, new_entry)
@@ -1,38 +1,41 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
 from django.urls import reverse
 
-from bc.models import (BcProject, BcPeople, BcTodo, BcTodolist, BcScheduleEntry, BcQuestionAnswer, BcMessage,
-                       BcMessageBoard, BcVault, BcUpload, BcDocument)
+from bc.cache import reference_cache_invalidate
+from bc.identity import identity_map_get, identity_map_in_bulk, identity_map_invalidate
+from bc.models import BcProject, BcCompany, BcPeople, BcMessage
+from bc.registry import registry_get
 from bc.serializers import BcPeopleSerializer
+from bc.structs import struct_convert, struct_get, struct_hash
 from bc.utils import (repr_message_detail_not_found, repr_http_response_template_string,
                       repr_template_response_parent_not_in_list, repr_template_response_entity_not_found,
                       static_get_comment_parent_types, static_get_message_parent_types, static_get_vault_parent_types)
 
 
 def db_get_bucket(bucket_id):
-    try:
-        _bucket = BcProject.objects.get(id=bucket_id)
-        _exception = None
-    except BcProject.DoesNotExist:
-        _bucket = None
-        template_str = 'bucket {{ bucket_id }} not found<br/><a href="{{ href }}">save project to db</a> first.'
-        context_dict = {'bucket_id': bucket_id,
-                        'href': reverse('app-project-detail-update-db', kwargs={'project_id': bucket_id})}
-        _exception = repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+    _bucket = identity_map_get(BcProject, bucket_id)
+    _exception = None if _bucket else _db_repr_bucket_not_found(bucket_id=bucket_id)
 
     return _bucket, _exception
 
 
+def _db_repr_bucket_not_found(bucket_id):
+    template_str = 'bucket {{ bucket_id }} not found<br/><a href="{{ href }}">save project to db</a> first.'
+    context_dict = {'bucket_id': bucket_id,
+                    'href': reverse('app-project-detail-update-db', kwargs={'project_id': bucket_id})}
+    return repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+
+
 def db_get_or_create_person(person):
-    try:
-        _exception = None  # assign _exception above _recording to comply the coverage :)
-        _creator = BcPeople.objects.get(id=person["id"])
-    except BcPeople.DoesNotExist:
+    _exception = None
+    _creator = identity_map_get(BcPeople, person["id"])
+    if not _creator:
         serializer = BcPeopleSerializer(data=person)
         if serializer.is_valid():
             _creator = serializer.save()
-            _exception = None
         else:  # invalid serializer
-            _creator = None
             template_str = 'creator serializer error: {{ serializer_errors }}'
             context_dict = {'serializer_errors': serializer.errors}
             _exception = repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
@@ -40,6 +43,133 @@ def db_get_or_create_person(person):
     return _creator, _exception
 
 
+def db_bulk_sync_people(people, count=None):
+    """
+    insert or update (upsert) a batch of people (eg: a page of get all people API), with their companies.
+    the existing people resolved with one query by id and email address, then one upsert query each for companies and
+    people (conflict on id), instead of the per person queries of db_get_or_create_person.
+    a person with the email address of other (existing) person ID is skipped, as db_get_or_create_person returns
+    the existing person by email address. the people not changed since saved (same payload_hash) are not written.
+    :param people: list of person from API, each with company field
+    :param count: function(outcome, value) called with 'inserted', 'updated' and 'unchanged', eg: counters of bc_sync
+    :return: list of BcPeople synced (written, or not changed since saved), _exception
+    """
+    _people_fields = [field.name for field in BcPeople._meta.fields if field.name not in ['company', 'payload_hash']]
+    people_by_id = {}
+    for person in people:
+        if 'company' not in person:
+            template_str = 'people bulk sync error: person {{ person_id }} has no company field'
+            context_dict = {'person_id': person["id"]}
+            return [], repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+
+        try:
+            payload_hash = struct_hash(struct_convert(person, struct=struct_get('Person')))
+        except ValueError as e:  # API data not fit to the struct
+            template_str = 'people bulk sync error: person {{ person_id }} {{ exception }}'
+            context_dict = {'person_id': person["id"], 'exception': repr(e)}
+            return [], repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+
+        people_by_id[person["id"]] = BcPeople(company_id=person["company"]["id"], payload_hash=payload_hash,
+                                               **{field: person.get(field) for field in _people_fields})
+
+    # email address is unique, skip the person that the email address used by other person ID
+    emails = {}
+    for _person in people_by_id.values():
+        emails.setdefault(_person.email_address, _person.id)  # the first person in the batch owns the email address
+    existing_emails = {}
+    saved_hashes = {}
+    for person_id, email_address, payload_hash in BcPeople.objects.filter(
+            Q(email_address__in=emails.keys()) | Q(id__in=people_by_id.keys())).values_list(
+            'id', 'email_address', 'payload_hash'):
+        existing_emails[email_address] = person_id
+        saved_hashes[person_id] = payload_hash
+    _people = [_person for _person in people_by_id.values()
+               if existing_emails.get(_person.email_address, emails[_person.email_address]) == _person.id]
+
+    for _person in _people:
+        try:
+            _person.clean_fields(exclude=['company'])  # validate (and convert) the fields, as the serializer did
+        except ValidationError as e:
+            template_str = 'people bulk sync error: person {{ person_id }} {{ errors }}'
+            context_dict = {'person_id': _person.id, 'errors': e.message_dict}
+            return [], repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+
+    # the people not changed since saved (the same payload_hash) are not written, nor their companies
+    changed = [_person for _person in _people if saved_hashes.get(_person.id) != _person.payload_hash]
+    changed_ids = {_person.id for _person in changed}
+    companies = {person["company"]["id"]: BcCompany(id=person["company"]["id"], name=person["company"]["name"])
+                 for person in people if person["id"] in changed_ids}
+
+    if changed:
+        with transaction.atomic():
+            BcCompany.objects.bulk_create(companies.values(), update_conflicts=True,
+                                          unique_fields=['id'], update_fields=['name'])
+            BcPeople.objects.bulk_create(changed, update_conflicts=True, unique_fields=['id'],
+                                         update_fields=[field for field in _people_fields if field != 'id'] +
+                                         ['company', 'payload_hash'])
+
+    # bulk_create does not send post_save, drop the stale instances loaded earlier in the scope and the cached rows
+    for _company in companies.values():
+        identity_map_invalidate(model=BcCompany, pk=_company.id)
+    for _person in changed:
+        identity_map_invalidate(model=BcPeople, pk=_person.id)
+    reference_cache_invalidate(model=BcCompany, pks=companies.keys())
+    reference_cache_invalidate(model=BcPeople, pks=changed_ids)
+
+    if count:
+        count('inserted', sum(1 for _person in changed if _person.id not in saved_hashes))
+        count('updated', sum(1 for _person in changed if _person.id in saved_hashes))
+        count('unchanged', len(_people) - len(changed))
+
+    return _people, None
+
+
+def db_bulk_set_many_to_many(model, name, relations):
+    """
+    set a many-to-many field of a batch of instances at once, as getattr(instance, name).set(pks) of each instance:
+    the current rows of the through table read with one query, then one bulk_create of the missing rows and one delete
+    of the stale rows, instead of the queries of .set() per instance. no m2m_changed signal.
+    :param model: eg: BcTodo
+    :param name: many-to-many field, eg: 'assignees'
+    :param relations: dict {instance pk: list of related pks}, the rows wanted for each instance
+    :return: (number of rows added, number of rows removed)
+    """
+    if not relations:
+        return 0, 0
+
+    field = model._meta.get_field(name)
+    through = field.remote_field.through
+    source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+    wanted = {(pk, related_pk) for pk, related_pks in relations.items() for related_pk in related_pks}
+    current = {(pk, related_pk): through_pk for through_pk, pk, related_pk in through.objects.filter(
+        **{f'{source}__in': list(relations)}).values_list('pk', source, target)}
+
+    added = [through(**{source: pk, target: related_pk}) for pk, related_pk in sorted(wanted - current.keys())]
+    removed = [through_pk for key, through_pk in current.items() if key not in wanted]
+    if added or removed:
+        with transaction.atomic():
+            if added:
+                through.objects.bulk_create(added)
+            if removed:
+                through.objects.filter(pk__in=removed).delete()
+    return len(added), len(removed)
+
+
+def db_get_saved(model, rows):
+    """
+    the rows of an API list saved to db, with one id__in query for the page instead of objects.get per row.
+    rows without id are ignored.
+    :param model: eg: BcTodo, BcMessage
+    :param rows: json data of a page of the API list
+    :return: dict {id: (title, updated_at)} of the rows saved to db, the stored title and updated_at
+    """
+    ids = {row["id"] for row in rows if 'id' in row}
+    if not ids:
+        return {}
+    return {_id: (title, updated_at)
+            for _id, title, updated_at in model.objects.filter(id__in=ids).values_list('id', 'title', 'updated_at')}
+
+
 def db_get_message(message, bucket_id):
     if 'type' in message and message["type"] == 'Message':
         try:
@@ -59,6 +189,31 @@ def db_get_message(message, bucket_id):
     return _message, _exception
 
 
+def _db_repr_parent_not_found(parent, bucket_id):
+    return repr_template_response_entity_not_found(
+        entity_id=parent["id"], entity_type=parent["type"],
+        href=registry_get(parent["type"]).get_url(bucket_id=bucket_id, recording_id=parent["id"]))
+
+
+def _db_get_parent(parent, bucket_id, list_parent_types):
+    """
+    :param parent: parent of a recording from API
+    :param bucket_id:
+    :param list_parent_types: the allowed parent types, eg: static_get_comment_parent_types()
+    :return: the parent model instance, _exception
+    """
+    if parent['type'] in list_parent_types:
+        _parent = registry_get(parent["type"]).model.objects.filter(id=parent["id"]).first()
+        _exception = None if _parent else _db_repr_parent_not_found(parent=parent, bucket_id=bucket_id)
+
+    else:  # the views have filtered the type in list_parent_types, should never be here
+        _parent = None
+        _exception = repr_template_response_parent_not_in_list(parent_id=parent["id"], parent_type=parent["type"],
+                                                               list_parent_types=list_parent_types)
+
+    return _parent, _exception
+
+
 def db_get_comment_parent(parent, bucket_id):
     """
     as mentioned in static_get_comment_parent_types()
@@ -67,92 +222,52 @@ def db_get_comment_parent(parent, bucket_id):
     :param bucket_id:
     :return:
     """
+    return _db_get_parent(parent=parent, bucket_id=bucket_id, list_parent_types=static_get_comment_parent_types())
 
-    if parent['type'] == 'Upload':
-        # process parent BcUpload
-        try:
-            _parent = BcUpload.objects.get(id=parent["id"])
-            _exception = None
-        except BcUpload.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-upload-detail', kwargs={'bucket_id': bucket_id, 'upload_id': parent["id"]}))
-
-    elif parent['type'] == 'Todo':
-        # process parent BcTodo
-        try:
-            _parent = BcTodo.objects.get(id=parent["id"])
-            _exception = None
-        except BcTodo.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-todo-detail', kwargs={'bucket_id': bucket_id, 'todo_id': parent["id"]}))
-
-    elif parent['type'] == 'Todolist':
-        # process parent BcTodolist
-        try:
-            _parent = BcTodolist.objects.get(id=parent["id"])
-            _exception = None
-        except BcTodolist.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-todolist-detail', kwargs={'bucket_id': bucket_id, 'todolist_id': parent["id"]}))
-
-    elif parent['type'] == 'Schedule::Entry':
-        # process parent BcScheduleEntry
-        try:
-            _parent = BcScheduleEntry.objects.get(id=parent["id"])
-            _exception = None
-        except BcScheduleEntry.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-schedule-entry-detail',
-                             kwargs={'bucket_id': bucket_id, 'schedule_entry_id': parent["id"]}))
-
-    elif parent['type'] == 'Question::Answer':
-        # process parent BcQuestionAnswer
-        try:
-            _parent = BcQuestionAnswer.objects.get(id=parent["id"])
-            _exception = None
-        except BcQuestionAnswer.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-question-answer-detail',
-                             kwargs={'bucket_id': bucket_id, 'question_answer_id': parent["id"]}))
-
-    elif parent['type'] == 'Message':
-        # process parent BcMessage
-        try:
-            _parent = BcMessage.objects.get(id=parent["id"])
-            _exception = None
-        except BcMessage.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-message-detail', kwargs={'bucket_id': bucket_id, 'message_id': parent["id"]}))
-
-    elif parent['type'] == 'Document':
-        # process parent BcDocument
-        try:
-            _parent = BcDocument.objects.get(id=parent["id"])
-            _exception = None
-        except BcDocument.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-document-detail', kwargs={'bucket_id': bucket_id, 'document_id': parent["id"]}))
-
-    else:  # condition above has filter the type in to get_recording_parent_types, should never be here
-        _parent = None
-        _exception = repr_template_response_parent_not_in_list(parent_id=parent["id"], parent_type=parent["type"],
-                                                               list_parent_types=static_get_comment_parent_types())
 
-    return _parent, _exception
+def db_get_recordings_relations(recordings, list_parent_types):
+    """
+    resolve bucket, parent and creator of a batch of recordings (eg: a page of recordings API) with a query per model,
+    instead of the per recording queries of db_get_bucket, db_get_comment_parent and db_get_or_create_person.
+    the parent ids grouped by type, then each parent model fetched with one id__in query. the creators not in db are
+    created one by one with db_get_or_create_person.
+    :param recordings: list of recording from API, each with bucket, parent and creator fields
+    :param list_parent_types: the allowed parent types, eg: static_get_comment_parent_types()
+    :return: dict of buckets {id: BcProject}, parents {(type, id): parent} and creators {id: BcPeople}, _exception
+    """
+    bucket_ids = {recording["bucket"]["id"] for recording in recordings}
+    parent_ids = {}
+    for recording in recordings:
+        if recording["parent"]["type"] not in list_parent_types:
+            return None, repr_template_response_parent_not_in_list(
+                parent_id=recording["parent"]["id"], parent_type=recording["parent"]["type"],
+                list_parent_types=list_parent_types)
+        parent_ids.setdefault(recording["parent"]["type"], set()).add(recording["parent"]["id"])
+
+    buckets = identity_map_in_bulk(BcProject, bucket_ids)
+    for bucket_id in bucket_ids:
+        if bucket_id not in buckets:
+            return None, _db_repr_bucket_not_found(bucket_id=bucket_id)
+
+    parents = {}
+    for parent_type, ids in parent_ids.items():
+        model = registry_get(parent_type).model
+        for parent_id, _parent in model.objects.in_bulk(list(ids)).items():
+            parents[(parent_type, parent_id)] = _parent
+
+    for recording in recordings:
+        if (recording["parent"]["type"], recording["parent"]["id"]) not in parents:
+            return None, _db_repr_parent_not_found(parent=recording["parent"], bucket_id=recording["bucket"]["id"])
+
+    creators = identity_map_in_bulk(BcPeople, {recording["creator"]["id"] for recording in recordings})
+    for recording in recordings:
+        if recording["creator"]["id"] not in creators:
+            _creator, _exception = db_get_or_create_person(person=recording["creator"])
+            if not _creator:  # create person error
+                return None, _exception
+            creators[recording["creator"]["id"]] = _creator
+
+    return {'buckets': buckets, 'parents': parents, 'creators': creators}, None
 
 
 def db_get_message_parent(parent, bucket_id):
@@ -163,25 +278,7 @@ def db_get_message_parent(parent, bucket_id):
     :param bucket_id:
     :return:
     """
-
-    if parent['type'] == 'Message::Board':
-        # process parent BcMessageBoard
-        try:
-            _parent = BcMessageBoard.objects.get(id=parent["id"])
-            _exception = None
-        except BcMessageBoard.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-message-board-detail',
-                             kwargs={'bucket_id': bucket_id, 'message_board_id': parent["id"]}))
-
-    else:  # condition above has filter the type in to get_vault_parent_types, should never be here
-        _parent = None
-        _exception = repr_template_response_parent_not_in_list(
-            parent_id=parent["id"], parent_type=parent["type"], list_parent_types=static_get_message_parent_types())
-
-    return _parent, _exception
+    return _db_get_parent(parent=parent, bucket_id=bucket_id, list_parent_types=static_get_message_parent_types())
 
 
 def db_get_vault_parent(parent, bucket_id):
@@ -192,21 +289,4 @@ def db_get_vault_parent(parent, bucket_id):
     :param bucket_id:
     :return:
     """
-
-    if parent['type'] == 'Vault':
-        # process parent BcVault
-        try:
-            _parent = BcVault.objects.get(id=parent["id"])
-            _exception = None
-        except BcVault.DoesNotExist:
-            _parent = None
-            _exception = repr_template_response_entity_not_found(
-                entity_id=parent["id"], entity_type=parent["type"],
-                href=reverse('app-vault-detail', kwargs={'bucket_id': bucket_id, 'vault_id': parent["id"]}))
-
-    else:  # condition above has filter the type in to get_vault_parent_types, should never be here
-        _parent = None
-        _exception = repr_template_response_parent_not_in_list(
-            parent_id=parent["id"], parent_type=parent["type"], list_parent_types=static_get_vault_parent_types())
-
-    return _parent, _exception
+    return _db_get_parent(parent=parent, bucket_id=bucket_id, list_parent_types=static_get_vault_parent_types())
@@ -1,9 +1,52 @@
 from django.urls import reverse
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.template import Template, Context
-
-
-def repr_message_detail(message, bucket_id, message_obj=None, as_list=False):
-    _saved_on_db = '(db)' if message_obj else ''
+from django.utils.dateparse import parse_datetime
+from functools import lru_cache
+from os import environ
+
+
+@lru_cache(maxsize=int(environ.get("BASECAMP_TEMPLATE_CACHE_SIZE", 256)))
+def repr_get_template(template_str):
+    """
+    the compiled template of a template string, kept in an LRU keyed on the string, so it is lexed and parsed once
+    per process instead of on every response. size by env BASECAMP_TEMPLATE_CACHE_SIZE (default: 256)
+    :param template_str:
+    :return: Template, shared: render it with a new Context
+    """
+    return Template(template_str)
+
+
+@receiver(setting_changed)
+def repr_on_setting_changed(setting, **kwargs):
+    if setting == 'TEMPLATES':  # compiled with the engine of the old settings
+        repr_get_template.cache_clear()
+
+
+def repr_saved_on_db(row, saved):
+    """
+    :param row: json data of a row of an API list
+    :param saved: dict {id: (title, updated_at)} of db_get_saved
+    :return: '(db)' if the row saved to db, '(db, outdated)' if updated on Basecamp since saved, else ''
+    """
+    if row["id"] not in saved:
+        return ''
+    _title, updated_at = saved[row["id"]]
+    row_updated_at = parse_datetime(row["updated_at"]) if row.get("updated_at") else None
+    return '(db, outdated)' if row_updated_at and updated_at and row_updated_at > updated_at else '(db)'
+
+
+def repr_message_detail(message, bucket_id, message_obj=None, as_list=False, saved_on_db=None):
+    """
+    :param message:
+    :param bucket_id:
+    :param message_obj: the saved message, for '(db)'
+    :param as_list:
+    :param saved_on_db: overrides message_obj, eg: repr_saved_on_db() of a list
+    :return:
+    """
+    _saved_on_db = ('(db)' if message_obj else '') if saved_on_db is None else saved_on_db
     _repr = (f'<a href="' + reverse('app-message-detail',
                                     kwargs={'bucket_id': bucket_id, 'message_id': message["id"]}) +
              f'">{message["id"]}</a> {message["title"]} {_saved_on_db}')
@@ -20,7 +63,7 @@ def repr_message_detail_not_found(message, bucket_id):
 
 def repr_http_response_template_string(template_str, context_dict=None):
     # sanitize to avoid xss
-    t = Template(template_str)
+    t = repr_get_template(template_str)
     c = Context({} if context_dict is None else context_dict)
     return t.render(context=c)
 
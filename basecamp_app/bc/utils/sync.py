@@ -0,0 +1,497 @@
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from threading import Lock
+
+from bc.models import (BcPeople, BcProject, BcProjectTool, BcMessageCategory, BcRecurrenceSchedule, BcTodolist,
+                       BcTodoCompletion, BcSyncState)
+from bc.identity import identity_map_get, identity_map_in_bulk, identity_map_add
+from bc.registry import registry_get, registry_get_model, registry_get_recording_model, registry_get_recording_types
+from bc.structs import (UNSET, struct_convert, struct_decode, struct_get_fields, struct_get_recording, struct_hash,
+                        struct_to_data)
+from bc.utils import (bc_api_get_many, db_get_bucket, db_get_or_create_person, db_bulk_sync_people,
+                      db_bulk_set_many_to_many,
+                      repr_http_response_template_string, repr_template_response_entity_not_found,
+                      repr_template_response_parent_not_in_list)
+
+# utilities to persist (upsert) API data of any recording type, used by the bc_sync management command, the detail
+# views and the hydrate mode of the list views.
+# the API data are the structs of bc.structs (attributes, UNSET if absent), not dicts
+
+_sync_write_lock = Lock()  # SQLite allows only one writer, serialize the writes of the sync workers
+
+
+def static_get_sync_type_models():
+    """
+    :return: dict {Basecamp type: model} of the recordings saved by sync_save_recording, from the type registry
+    """
+    return {bc_type: registry_get_model(bc_type) for bc_type in registry_get_recording_types()}
+
+
+def sync_get_field_names(model):
+    """
+    :param model:
+    :return: names of the non-relation fields of the model, the keys copied as is from API data
+    """
+    return [field.name for field in model._meta.concrete_fields if not field.is_relation]
+
+
+def sync_get_or_create_person(person):
+    """
+    :param person: Person struct from API
+    :return: BcPeople, _exception
+    """
+    _person = identity_map_get(BcPeople, person.id)
+    if _person:  # the struct copied to a dict for the serializer only if not loaded yet
+        return _person, None
+    return db_get_or_create_person(person=struct_to_data(person))
+
+
+def sync_upsert(model, fields):
+    """
+    insert or update (upsert) a row keyed on the Basecamp id, one INSERT ... ON CONFLICT (id) DO UPDATE query instead
+    of the SELECT then INSERT or UPDATE of update_or_create. the fields not given keep their saved values.
+    no post_save signal, as db_bulk_sync_people: not for the models of the identity map and the reference cache.
+    :param model:
+    :param fields: dict {name: value}, with id
+    :return: the model instance of the given fields
+    """
+    _instance = model(**fields)
+    model.objects.bulk_create([_instance], update_conflicts=True, unique_fields=['id'],
+                              update_fields=[name for name in fields if name != 'id'])
+    return _instance
+
+
+def sync_has_payload_hash(model):
+    """
+    the synced entities of many rows (recordings, projects, people) store the payload_hash, not the tools of a project
+    (todoset, message board, schedule, questionnaire) nor the questions, one row each and rarely listed again
+    :param model:
+    :return: True if the model stores the struct_hash of its API data
+    """
+    return any(field.name == 'payload_hash' for field in model._meta.fields)
+
+
+def sync_is_unchanged(_record, data, payload_hash=None):
+    """
+    :param _record: the saved model instance, or None
+    :param data: struct from API, with updated_at
+    :param payload_hash: struct_hash of the API data, None if the model has no payload_hash (compared by updated_at)
+    :return: True if the API data is not changed since saved, the write can be skipped
+    """
+    if not _record:
+        return False
+    if payload_hash:
+        return _record.payload_hash == payload_hash
+    updated_at = getattr(data, 'updated_at', UNSET)
+    return bool(updated_at and _record.updated_at == parse_datetime(updated_at))
+
+
+def sync_get_payload_hashes(model, ids):
+    """
+    the payload hashes of a batch of records (eg: a page) with one query, to compare them before the writes
+    :param model:
+    :param ids: Basecamp ids
+    :return: dict {id: payload_hash} of the saved records, empty if the model has no payload_hash
+    """
+    if not ids or not sync_has_payload_hash(model):
+        return {}
+    return dict(model.objects.filter(id__in=ids).values_list('id', 'payload_hash'))
+
+
+def sync_save_recurrence_schedule(schedule, _schedule=None):
+    """
+    recurrence schedule has no id, update the instance referred by the recording, or create a new one
+    :param schedule: RecurrenceSchedule struct from API
+    :param _schedule: BcRecurrenceSchedule of the existing recording, or None
+    :return: BcRecurrenceSchedule
+    """
+    # days kept as a list (jsonb array on PostgreSQL), for days__contains and its GIN index
+    fields = struct_get_fields(schedule, [name for name in sync_get_field_names(BcRecurrenceSchedule) if name != 'id'])
+    if _schedule is None:
+        return BcRecurrenceSchedule.objects.create(**fields)
+
+    for name, value in fields.items():
+        setattr(_schedule, name, value)
+    _schedule.save()
+    return _schedule
+
+
+def sync_save_todo_completion(completion, _creator, _completion=None):
+    """
+    :param completion: Completion struct from API
+    :param _creator: BcPeople of the completion creator
+    :param _completion: BcTodoCompletion of the existing todo, or None
+    :return: BcTodoCompletion
+    """
+    if _completion is None:
+        return BcTodoCompletion.objects.create(created_at=completion.created_at, creator=_creator)
+
+    _completion.created_at = completion.created_at
+    _completion.creator = _creator
+    _completion.save()
+    return _completion
+
+
+def sync_set_many_to_many(many_to_many):
+    """
+    set the many-to-many fields collected by sync_save_recording for a batch of recordings, one read, one insert and
+    one delete per field (db_bulk_set_many_to_many)
+    :param many_to_many: dict {(model, field name): {recording id: list of related ids}}
+    :return:
+    """
+    if not many_to_many:
+        return
+    with _sync_write_lock, transaction.atomic():
+        for (model, name), relations in many_to_many.items():
+            db_bulk_set_many_to_many(model=model, name=name, relations=relations)
+
+
+def sync_save_recording(model, data, count=None, many_to_many=None):
+    """
+    insert or update a recording (todoset, todo, message, vault, comment, etc.) from API data.
+    bucket (project) and parent should be saved before, creator and people (assignees, participants, etc.) created
+    if not exist. the recording upserted with its dependent rows (completion, recurrence schedules) reused, not
+    written if not changed since saved (payload_hash, or updated_at if the model has none: sync_has_payload_hash).
+    :param model: one of static_get_sync_type_models()
+    :param data: recording struct from API, eg: struct_get('Todo')
+    :param count: function(outcome) called with 'inserted', 'updated' or 'unchanged', eg: counters of bc_sync
+    :param many_to_many: dict collecting the people of the many-to-many fields (assignees, participants, etc.) of a
+                         batch, set later with sync_set_many_to_many. None to set them with the recording
+    :return: the model instance, _exception
+    """
+    field_names = [field.name for field in model._meta.get_fields()]
+    fields = struct_get_fields(data, sync_get_field_names(model))
+    fields["bucket_id"] = data.bucket.id
+    if sync_has_payload_hash(model):
+        fields["payload_hash"] = struct_hash(data)
+
+    # process creator
+    _creator, _exception = sync_get_or_create_person(person=data.creator)
+    if not _creator:  # create person error
+        return None, _exception
+    fields["creator"] = _creator
+
+    # process parent as generic relation
+    if 'parent' in field_names:
+        if data.parent:
+            parent_type = registry_get(data.parent.type)
+            if not parent_type or not parent_type.is_recording:
+                return None, repr_template_response_parent_not_in_list(
+                    parent_id=data.parent.id, parent_type=data.parent.type,
+                    list_parent_types=registry_get_recording_types())
+            fields["parent_content_type"] = parent_type.content_type
+            fields["parent_object_id"] = data.parent.id
+        else:  # no parent, as root vault has no parent
+            fields["parent_content_type"] = None
+            fields["parent_object_id"] = None
+
+    if model is BcTodolist:  # internal field, as app_todolist_detail
+        fields["is_todolist_group"] = bool(data.group_position_url)
+
+    if 'category' in field_names:  # message category (message types) should be saved before
+        fields["category_id"] = data.category.id if data.category else None
+
+    # process people of many-to-many fields
+    people_fields = {}
+    for name in ['assignees', 'completion_subscribers', 'participants']:
+        if name in field_names and getattr(data, name) is not UNSET:
+            people_fields[name] = []
+            for person in getattr(data, name) or []:
+                _person, _exception = sync_get_or_create_person(person=person)
+                if not _person:  # create person error
+                    return None, _exception
+                people_fields[name].append(_person)
+
+    # process completion creator
+    if 'completion' in field_names and data.completion:
+        _completion_creator, _exception = sync_get_or_create_person(person=data.completion.creator)
+        if not _completion_creator:  # create person error
+            return None, _exception
+
+    _record = model.objects.filter(id=data.id).first()
+    # after the people, their errors reported even if unchanged
+    if sync_is_unchanged(_record=_record, data=data, payload_hash=fields.get("payload_hash")):
+        if count:
+            count('unchanged')
+        return _record, None
+    outcome = 'updated' if _record else 'inserted'
+
+    with _sync_write_lock, transaction.atomic():
+        for name in ['schedule', 'repetition_schedule', 'recurrence_schedule']:
+            if name in field_names and getattr(data, name):
+                fields[name] = sync_save_recurrence_schedule(schedule=getattr(data, name),
+                                                             _schedule=getattr(_record, name) if _record else None)
+
+        _old_completion = _record.completion if _record and 'completion' in field_names else None
+        if 'completion' in field_names:
+            if data.completion:
+                fields["completion"] = sync_save_todo_completion(
+                    completion=data.completion, _creator=_completion_creator, _completion=_old_completion)
+            else:  # not completed (or un-completed)
+                fields["completion"] = None
+
+        _record = sync_upsert(model=model, fields=fields)
+
+        if _old_completion and not fields.get('completion'):  # remove the completion of un-completed todo
+            _old_completion.delete()
+
+        relations = {} if many_to_many is None else many_to_many
+        for name, people in people_fields.items():
+            relations.setdefault((model, name), {})[_record.id] = [_person.id for _person in people]
+        if many_to_many is None:
+            for (_model, name), _relations in relations.items():
+                db_bulk_set_many_to_many(model=_model, name=name, relations=_relations)
+
+    if count:
+        count(outcome)
+    return _record, None
+
+
+def sync_save_recording_data(data):
+    """
+    insert or update a recording from the json data of its detail API, as the *_detail views.
+    bucket, parent and message category should be checked before, see sync_save_recording
+    :param data: json data of a recording
+    :return: the model instance, _exception
+    """
+    try:
+        record = struct_convert(data, struct=struct_get_recording(data))
+    except (KeyError, ValueError) as e:  # unknown type, or API data not fit to the struct
+        template_str = 'recording data error: {{ exception }}'
+        context_dict = {'exception': repr(e)}
+        return None, repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+
+    return sync_save_recording(model=registry_get_recording_model(data["type"]), data=record)
+
+
+def sync_save_project(project, count=None):
+    """
+    insert or update a project with the tools in the dock, not written if not changed since saved
+    :param project: Project struct from API
+    :param count: function(outcome), see sync_save_recording
+    :return: BcProject
+    """
+    fields = struct_get_fields(project, sync_get_field_names(BcProject))
+    fields["payload_hash"] = struct_hash(project)
+
+    _project = BcProject.objects.filter(id=project.id).first()
+    if sync_is_unchanged(_record=_project, data=project, payload_hash=fields["payload_hash"]):
+        if count:
+            count('unchanged')
+        return _project
+    outcome = 'updated' if _project else 'inserted'
+
+    with _sync_write_lock, transaction.atomic():
+        _project, _created = BcProject.objects.update_or_create(id=project.id, defaults=fields)
+
+        tools = []
+        for tool in project.dock or []:
+            tool_fields = struct_get_fields(tool, sync_get_field_names(BcProjectTool))
+            _tool, _created = BcProjectTool.objects.update_or_create(id=tool.id, defaults=tool_fields)
+            tools.append(_tool)
+        db_bulk_set_many_to_many(model=BcProject, name='dock', relations={_project.id: [_tool.id for _tool in tools]})
+
+    if count:
+        count(outcome)
+    return _project
+
+
+def sync_save_message_category(category):
+    """
+    :param category: MessageCategory struct from API (message type)
+    :return: BcMessageCategory
+    """
+    fields = struct_get_fields(category, sync_get_field_names(BcMessageCategory))
+
+    with _sync_write_lock:
+        _category, _created = BcMessageCategory.objects.update_or_create(id=category.id, defaults=fields)
+
+    return _category
+
+
+def sync_get_state(resource):
+    """
+    :param resource: the synced resource, eg: the list API uri
+    :return: datetime of the high-water mark, None if never synced
+    """
+    _state = BcSyncState.objects.filter(resource=resource).first()
+    return _state.updated_at if _state else None
+
+
+def sync_set_state(resource, updated_at):
+    """
+    save the high-water mark, never move it backward
+    :param resource: the synced resource, eg: the list API uri
+    :param updated_at: datetime of the latest updated_at of the synced records
+    :return:
+    """
+    with _sync_write_lock:
+        _state = BcSyncState.objects.filter(resource=resource).first()
+        if _state is None:
+            BcSyncState.objects.create(resource=resource, updated_at=updated_at)
+        elif _state.updated_at < updated_at:
+            _state.updated_at = updated_at
+            _state.save()
+
+
+def sync_is_changed(data, updated_at):
+    """
+    :param data: record struct from API
+    :param updated_at: datetime of the high-water mark, None if never synced
+    :return: True if the record updated after the high-water mark
+    """
+    return updated_at is None or parse_datetime(data.updated_at) > updated_at
+
+
+def static_get_sync_people_fields():
+    """
+    :return: names of the people fields of the recordings, one person or a list
+    """
+    return ['creator', 'assignees', 'completion_subscribers', 'participants']
+
+
+def sync_load_people(records):
+    """
+    resolve the people of the records (creators, assignees, etc.) at once, instead of a query per person: the existing
+    people in one query, the new ones (with company) upserted in one batch. kept in the identity map, read from there
+    by sync_save_recording.
+    :param records: list of recording structs from API
+    :return: _exception
+    """
+    people = {}
+    for record in records:
+        values = [getattr(record, name, UNSET) for name in static_get_sync_people_fields()]
+        completion = getattr(record, 'completion', UNSET)
+        if completion:
+            values.append(completion.creator)
+        for value in values:
+            for person in (value if isinstance(value, list) else [value]):
+                if person:
+                    people.setdefault(person.id, person)
+
+    existing = identity_map_in_bulk(BcPeople, list(people))
+    new_people = [struct_to_data(person) for person_id, person in people.items()
+                  if person_id not in existing and person.company]
+    if new_people:  # the people without company are left to db_get_or_create_person, as it reports the error
+        _people, _exception = db_bulk_sync_people(people=new_people)
+        if _exception:
+            return _exception
+        for _person in _people:
+            identity_map_add(_person)
+    return None
+
+
+def sync_get_missing_parents(records):
+    """
+    the parents of a batch of recordings not saved to db, with one query per parent model instead of one per
+    recording, eg: before the recordings of the hydrate mode or of the recordings API are saved.
+    a parent in the batch itself is not missing. the parents of a type not saved by sync_save_recording are left to
+    sync_save_recording, as it reports the error.
+    :param records: list of recording structs from API
+    :return: list of the parents (Ref struct) not in db, sorted by type and id
+    """
+    batch = {(record.type, record.id) for record in records}
+    parents = {}  # Basecamp type: {id: Ref}
+    for record in records:
+        parent = getattr(record, 'parent', UNSET)
+        if parent and (parent.type, parent.id) not in batch:
+            parents.setdefault(parent.type, {})[parent.id] = parent
+
+    missing = []
+    for parent_type, refs in sorted(parents.items()):
+        _type = registry_get(parent_type)
+        if not _type or not _type.is_recording:
+            continue
+        saved_ids = set(_type.model.objects.filter(id__in=refs.keys()).values_list('id', flat=True))
+        missing.extend(refs[parent_id] for parent_id in sorted(refs.keys() - saved_ids))
+    return missing
+
+
+def sync_check_rows(rows):
+    """
+    :param rows: json data of a list API, see sync_hydrate_recordings
+    :return: _exception if a row is not a recording of known type in a project, else None
+    """
+    for row in rows:
+        if not (isinstance(row, dict) and 'id' in row and row.get('type') in registry_get_recording_types() and
+                'updated_at' in row and isinstance(row.get('bucket'), dict) and row["bucket"].get('type') == 'Project'):
+            template_str = 'hydrate error: row {{ row_id }} is not a recording of known type in a project'
+            context_dict = {'row_id': row.get('id') if isinstance(row, dict) else None}
+            return repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+    return None
+
+
+def sync_hydrate_recordings(rows, get_uri, access_token, max_workers=None):
+    """
+    save the rows of a list view (eg: the todos of a todolist) to db at once: the detail APIs of the rows fetched
+    concurrently (bc_api_get_many), the people resolved in batch (sync_load_people), then all recordings saved in one
+    transaction, their many-to-many fields set in bulk. the rows already saved, and not updated since, are skipped.
+    bucket (project) and parents should be saved before, as the detail views: a row not in a project (sync_check_rows)
+    or whose parent is not in db (sync_get_missing_parents) is an error, and none of the rows saved.
+    :param rows: json data of the list API (all pages), each with id, type, updated_at and bucket
+    :param get_uri: function(row) returns the uri of the detail API of the row
+    :param access_token:
+    :param max_workers: requests in flight, see bc_api_get_many
+    :return: number of recordings saved, _exception
+    """
+    _exception = sync_check_rows(rows=rows)
+    if _exception:
+        return 0, _exception
+
+    saved = {}
+    for bc_type in {row["type"] for row in rows}:
+        saved.update(registry_get_recording_model(bc_type).objects.filter(
+            id__in=[row["id"] for row in rows if row["type"] == bc_type]).values_list('id', 'updated_at'))
+    rows = [row for row in rows if row["id"] not in saved or parse_datetime(row["updated_at"]) > saved[row["id"]]]
+    if not rows:
+        return 0, None
+
+    for bucket_id in {row["bucket"]["id"] for row in rows}:
+        _bucket, _exception = db_get_bucket(bucket_id=bucket_id)
+        if not _bucket:  # not exists
+            return 0, _exception
+
+    uris = [get_uri(row) for row in rows]
+    records = []
+    for row, uri, response in zip(rows, uris, bc_api_get_many(uris=uris, access_token=access_token,
+                                                                max_workers=max_workers)):
+        if response.status_code != 200:  # not OK
+            template_str = 'hydrate error: {{ status_code }} {{ uri }}'
+            context_dict = {'status_code': response.status_code, 'uri': uri}
+            return 0, repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+        try:
+            records.append(struct_decode(response.content, name=row["type"]))
+        except ValueError as e:  # API data not fit to the struct
+            template_str = 'hydrate error: {{ uri }} {{ exception }}'
+            context_dict = {'uri': uri, 'exception': repr(e)}
+            return 0, repr_http_response_template_string(template_str=template_str, context_dict=context_dict)
+
+    missing = sync_get_missing_parents(records=records)
+    if missing:  # should be saved before, as the detail views
+        parent = missing[0]
+        # the parent in the bucket of its child, the batch may span more than one bucket
+        child = next(record for record in records if getattr(record, 'parent', UNSET)
+                     and (record.parent.type, record.parent.id) == (parent.type, parent.id))
+        return 0, repr_template_response_entity_not_found(
+            entity_id=parent.id, entity_type=parent.type,
+            href=registry_get(parent.type).get_url(bucket_id=child.bucket.id, recording_id=parent.id))
+
+    _exception = sync_load_people(records=records)
+    if _exception:
+        return 0, _exception
+
+    many_to_many = {}
+    with transaction.atomic():
+        for record in records:
+            if getattr(record, 'category', None) and not BcMessageCategory.objects.filter(
+                    id=record.category.id).exists():  # message category should be saved before the message
+                sync_save_message_category(category=record.category)
+
+            _record, _exception = sync_save_recording(model=registry_get_recording_model(record.type), data=record,
+                                                      many_to_many=many_to_many)
+            if not _record:
+                transaction.set_rollback(True)  # none of the recordings saved
+                return 0, _exception
+        sync_set_many_to_many(many_to_many=many_to_many)
+
+    return len(records), None
@@ -0,0 +1,292 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from copy import deepcopy
+from datetime import timedelta
+
+from bc.identity import identity_map_get, identity_map_in_bulk, identity_map_invalidate
+from bc.models import BcPeople, BcProject, BcWebhook, BcWebhookQueue
+from bc.registry import registry_get
+from bc.serializers import BcWebhookSerializer
+from bc.utils import db_get_or_create_person
+
+# durable queue of the received webhooks, filled by app_webhook_receiver and drained by bc_webhook_worker.
+# https://github.com/basecamp/bc3-api/blob/master/sections/webhooks.md
+
+
+def webhook_queue_validate(payload):
+    """
+    only the shape is checked, the content is validated by BcWebhookSerializer in the worker
+    :param payload: decoded json of the webhook request body
+    :return: error message, None if valid
+    """
+    if not isinstance(payload, dict):
+        return 'webhook payload is not an object'
+    if not isinstance(payload.get('id'), int) or isinstance(payload.get('id'), bool):
+        return 'webhook payload has no id'
+    for key in ['kind', 'created_at']:
+        if not isinstance(payload.get(key), str):
+            return f'webhook payload has no {key}'
+    for key in ['recording', 'creator']:
+        if not isinstance(payload.get(key), dict):
+            return f'webhook payload has no {key}'
+    return None
+
+
+def webhook_queue_put(payload):
+    """
+    :param payload: decoded json of the webhook request body
+    :return: True if queued, False if the webhook id already queued (Basecamp redelivers on timeout), _exception
+    """
+    _exception = webhook_queue_validate(payload=payload)
+    if _exception:
+        return False, _exception
+
+    try:
+        with transaction.atomic():  # savepoint, the caller transaction usable after the IntegrityError
+            BcWebhookQueue.objects.create(webhook_id=payload["id"], payload=payload)
+    except IntegrityError:  # unique webhook_id
+        return False, None
+    return True, None
+
+
+def webhook_queue_claim(worker_id, batch_size=50, claim_timeout=300):
+    """
+    claim the available webhooks for a worker: pending and due, or processing by a worker that died (not finished
+    after claim_timeout seconds).
+    :param worker_id: unique id of the worker
+    :param batch_size:
+    :param claim_timeout: seconds
+    :return: list of BcWebhookQueue claimed, in order of arrival
+    """
+    now = timezone.now()
+    available = (Q(status=BcWebhookQueue.STATUS_PENDING, available_at__lte=now) |
+                 Q(status=BcWebhookQueue.STATUS_PROCESSING, claimed_at__lt=now - timedelta(seconds=claim_timeout)))
+
+    with transaction.atomic():
+        queryset = BcWebhookQueue.objects.filter(available).order_by('available_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:  # eg: PostgreSQL, workers never wait each other
+            queryset = queryset.select_for_update(skip_locked=True)
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        # filter available again, other worker may claim the same rows between the select and the update (SQLite)
+        BcWebhookQueue.objects.filter(available, id__in=ids).update(
+            status=BcWebhookQueue.STATUS_PROCESSING, claimed_at=now, claimed_by=worker_id)
+
+    return list(BcWebhookQueue.objects.filter(id__in=ids, claimed_by=worker_id, claimed_at=now).order_by('id'))
+
+
+def webhook_queue_process(item, max_attempts=5, backoff=30):
+    """
+    save the webhook with BcWebhookSerializer, at most once per webhook id. on error, the webhook is retried after
+    an exponential backoff, until max_attempts.
+    :param item: BcWebhookQueue claimed by webhook_queue_claim
+    :param max_attempts:
+    :param backoff: seconds before the first retry, doubled on every retry
+    :return: the status of the item
+    """
+    error = ''
+    if not BcWebhook.objects.filter(id=item.webhook_id).exists():  # else saved before, eg: reclaimed after a crash
+        try:
+            with transaction.atomic():
+                serializer = BcWebhookSerializer(data=item.payload)
+                if serializer.is_valid():
+                    serializer.save()
+                else:  # invalid serializer, roll back the recording created in to_internal_value
+                    error = f'serializer error: {serializer.errors}'
+                    transaction.set_rollback(True)
+        except Exception as e:  # eg: database locked, retry later
+            error = repr(e)
+        if error:
+            identity_map_invalidate()  # may keep the instances created in the rolled back transaction
+
+    webhook_queue_finish(item=item, error=error, max_attempts=max_attempts, backoff=backoff)
+    item.save(update_fields=webhook_queue_finish_fields())
+
+    return item.status
+
+
+def webhook_queue_finish_fields():
+    return ['attempts', 'error', 'status', 'processed_at', 'available_at']
+
+
+def webhook_queue_finish(item, error, max_attempts=5, backoff=30):
+    """
+    set the status of a processed item (not saved): done, pending to retry after the backoff, or failed
+    :param item: BcWebhookQueue
+    :param error: empty if the webhook saved
+    :param max_attempts:
+    :param backoff: seconds before the first retry, doubled on every retry
+    :return:
+    """
+    now = timezone.now()
+    item.attempts += 1
+    item.error = error
+    if not error:
+        item.status = BcWebhookQueue.STATUS_DONE
+        item.processed_at = now
+    elif item.attempts >= max_attempts:
+        item.status = BcWebhookQueue.STATUS_FAILED
+        item.processed_at = now
+    else:
+        item.status = BcWebhookQueue.STATUS_PENDING
+        item.available_at = now + timedelta(seconds=backoff * 2 ** (item.attempts - 1))
+
+
+def webhook_get_recording_model(recording_type):
+    """
+    :param recording_type: webhook recording (or parent) type
+    :return: the model, None if unknown
+    """
+    _type = registry_get(recording_type)
+    if not _type or not (_type.is_webhook_recording or _type.is_webhook_base_child):
+        return None
+    return _type.model
+
+
+def webhook_get_recording_url(recording):
+    """
+    :param recording: model instance of a recording (or parent), or None
+    :return: uri of its detail view, None if no view
+    """
+    if recording is None or not hasattr(recording, 'bucket_id'):
+        return None
+    _type = registry_get(getattr(recording, 'type', None))
+    return _type.get_url(bucket_id=recording.bucket_id, recording_id=recording.id) if _type else None
+
+
+def webhook_queue_preload(payloads):
+    """
+    load the people, projects, recordings and parents referred by the payloads to the identity map (should be in
+    identity_map_scope), with a query per model, then BcWebhookSerializer finds them without a query.
+    the people not in db are created, once per person.
+    :param payloads: list of webhook payload
+    :return:
+    """
+    people = {}
+    bucket_ids = set()
+    recording_ids = {}
+    for payload in payloads:
+        recording = payload["recording"]
+        people[payload["creator"]["id"]] = payload["creator"]
+        if isinstance(recording.get('creator'), dict):
+            people[recording["creator"]["id"]] = recording["creator"]
+        if isinstance(recording.get('bucket'), dict) and recording["bucket"].get('type') == 'Project':
+            bucket_ids.add(recording["bucket"]["id"])
+        for _recording in [recording, recording.get('parent')]:
+            if isinstance(_recording, dict) and webhook_get_recording_model(_recording.get('type')):
+                recording_ids.setdefault(_recording["type"], set()).add(_recording["id"])
+
+    _people = identity_map_in_bulk(BcPeople, people.keys())
+    for person_id, person in people.items():
+        if person_id not in _people:
+            db_get_or_create_person(person=deepcopy(person))  # kept in the identity map, error left to serializer
+    identity_map_in_bulk(BcProject, bucket_ids)
+    for recording_type, ids in recording_ids.items():
+        identity_map_in_bulk(webhook_get_recording_model(recording_type), ids)
+
+
+def webhook_queue_build(item):
+    """
+    validate the webhook of an item with BcWebhookSerializer, the recording linked (or created, a base child not in db)
+    :param item: BcWebhookQueue
+    :return: BcWebhook not saved (None if invalid), _exception
+    """
+    serializer = BcWebhookSerializer(data=deepcopy(item.payload))
+    if not serializer.is_valid():
+        return None, f'serializer error: {serializer.errors}'
+
+    validated_data = dict(serializer.validated_data)
+    _creator = serializer.creator
+    if not _creator:  # not created by webhook_queue_preload, invalid person
+        _creator, _exception = db_get_or_create_person(person=validated_data.pop('creator'))
+        if not _creator:
+            return None, _exception
+    return BcWebhook(creator=_creator, recording=serializer.recording, **validated_data), None
+
+
+def webhook_queue_update_recording(recording, _recording):
+    """
+    update a recording saved before the batch to the state of its latest webhook: the non-relation fields of the model
+    given by the webhook recording, if the webhook recording is newer
+    :param recording: webhook recording
+    :param _recording: the saved model instance
+    :return: True if updated
+    """
+    updated_at = parse_datetime(recording.get('updated_at') or '')
+    if not updated_at or updated_at <= _recording.updated_at:
+        return False
+
+    fields = [field for field in type(_recording)._meta.concrete_fields
+              if not (field.is_relation or field.primary_key) and field.name in recording and
+              field.name != 'payload_hash' and not isinstance(recording[field.name], (dict, list))]
+    for field in fields:
+        setattr(_recording, field.name, field.to_python(recording[field.name]))
+    _recording.save(update_fields=[field.name for field in fields])
+    return True
+
+
+def webhook_queue_apply(items, max_attempts=5, backoff=30):
+    """
+    batch mode of webhook_queue_process, for a burst of webhooks: the referred people, projects, recordings and
+    parents loaded with a query per model (webhook_queue_preload), the webhooks coalesced per recording, all BcWebhook
+    written with one bulk_create and the status of the items with one bulk_update.
+    per recording, its latest valid webhook links the recording (a recording not in db created from it, in a savepoint
+    so that an invalid webhook does not keep the recording it created), and updates the recording saved before to its
+    state. the older webhooks of the recording are only linked to it.
+    should be in identity_map_scope. if the batch can not be written, every item processed by webhook_queue_process.
+    :param items: list of BcWebhookQueue claimed by webhook_queue_claim
+    :param max_attempts:
+    :param backoff: seconds before the first retry, doubled on every retry
+    :return: list of the status of the items
+    """
+    saved_ids = set(BcWebhook.objects.filter(id__in=[item.webhook_id for item in items]).values_list('id', flat=True))
+    pending = [item for item in items if item.webhook_id not in saved_ids]  # else saved before, eg: reclaimed
+
+    # coalesce per recording, the latest webhook first
+    recordings = {}
+    for item in sorted(pending, key=lambda item: (item.payload["created_at"], item.webhook_id), reverse=True):
+        recording = item.payload["recording"]
+        recordings.setdefault((recording.get('type'), recording.get('id')), []).append(item)
+
+    errors = {}
+    try:
+        with transaction.atomic():
+            webhook_queue_preload(payloads=[item.payload for item in pending])
+
+            webhooks = []
+            for (recording_type, recording_id), items_of_recording in recordings.items():
+                linked = False  # the recording linked (or not found) by the latest valid webhook of the recording
+                for item in items_of_recording:
+                    if linked:  # the recording in the identity map, nothing written by the serializer
+                        _webhook, _exception = webhook_queue_build(item=item)
+                    else:
+                        model = webhook_get_recording_model(recording_type)
+                        _saved = identity_map_get(model, recording_id) if model else None  # preloaded
+                        with transaction.atomic():  # savepoint
+                            _webhook, _exception = webhook_queue_build(item=item)
+                            if not _webhook:  # roll back the recording created in to_internal_value
+                                transaction.set_rollback(True)
+                        if not _webhook and model and not _saved:
+                            identity_map_invalidate(model, recording_id)
+                        if _webhook:
+                            linked = True
+                            if _saved:
+                                webhook_queue_update_recording(recording=item.payload["recording"], _recording=_saved)
+
+                    if _webhook:
+                        webhooks.append(_webhook)
+                    else:
+                        errors[item.webhook_id] = _exception
+
+            BcWebhook.objects.bulk_create(webhooks)
+    except Exception:  # eg: an invalid field, find it with the webhooks one by one
+        identity_map_invalidate()  # may keep the instances created in the rolled back transaction
+        return [webhook_queue_process(item=item, max_attempts=max_attempts, backoff=backoff) for item in items]
+
+    for item in items:
+        webhook_queue_finish(item=item, error=errors.get(item.webhook_id, ''), max_attempts=max_attempts,
+                             backoff=backoff)
+    BcWebhookQueue.objects.bulk_update(items, fields=webhook_queue_finish_fields())
+
+    return [item.status for item in items]
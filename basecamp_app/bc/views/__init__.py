@@ -11,3 +11,4 @@ from .todolist import *
 from .todolist_group import *
 from .todoset import *
 from .vault import *
+from .webhook import *
@@ -1,13 +1,15 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
+from django.template import Context
 from django.urls import reverse
 
 from bc.models import BcComment
+from bc.registry import registry_get
 from bc.utils import (session_get_token_and_identity, bc_api_get,
-                      db_get_bucket, db_get_comment_parent, db_get_or_create_person,
-                      api_comment_get_bucket_comment_uri,
+                      db_get_bucket, db_get_comment_parent,
+                      api_comment_get_bucket_comment_uri, sync_save_recording_data,
                       static_get_comment_parent_uri, static_get_comment_parent_types,
                       repr_http_response_template_string, repr_template_response_entity_creator_bucket_parent,
-                      repr_template_response_simple_with_back)
+                      repr_template_response_simple_with_back, repr_get_template)
 
 
 def app_comment_detail(request, bucket_id, comment_id):
@@ -42,27 +44,11 @@ def app_comment_detail(request, bucket_id, comment_id):
         if not _parent:  # not exists
             return HttpResponseBadRequest(_exception)
 
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=comment["creator"])
-        if not _creator:  # create person error
+        # process comment, insert or update with creator
+        _comment, _exception = sync_save_recording_data(data=comment)
+        if not _comment:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'bucket' key from comment. key 'bucket' still used in processing parent
-        comment.pop('bucket')
-
-        # remove 'parent' key from comment, will use model instance parent instead
-        comment.pop('parent')
-
-        # remove 'creator' key from comment, will use model instance creator instead
-        comment.pop('creator')
-
-        # process comment
-        try:
-            _comment = BcComment.objects.get(id=comment["id"])
-        except BcComment.DoesNotExist:
-            _comment = BcComment.objects.create(bucket=_bucket, parent=_parent, creator=_creator, **comment)
-            _comment.save()
-
     else:
         _exception = repr_template_response_entity_creator_bucket_parent(
             entity_type=comment["type"], entity_title=comment["title"],
@@ -75,3 +61,42 @@ def app_comment_detail(request, bucket_id, comment_id):
         back_href=reverse('app-project-detail', kwargs={'project_id': bucket_id}),
         body=f'title: {_comment_title}<br/>{parent_str}')
     return HttpResponse(_response)
+
+
+def app_project_comment(request, bucket_id):
+    """
+    the comments of the project saved to db, the latest first, with their parents: a query per parent model
+    (with_generic_relations) instead of a query per comment. ?limit= (default: 100)
+    """
+    token, identity = session_get_token_and_identity(request)
+    if not (token and identity):  # no token or identity, redirect to auth
+        return HttpResponseRedirect(reverse('bc-auth'))
+
+    limit = request.GET.get('limit', '100')
+    if not limit.isdigit():
+        return HttpResponseBadRequest('limit should be a number')
+
+    comment_list = []
+    for _comment in BcComment.objects.filter(bucket_id=bucket_id).order_by(
+            '-created_at', '-id').with_generic_relations()[:int(limit)]:
+        _parent_type = registry_get(_comment.parent.type) if _comment.parent else None
+        comment_list.append({
+            'comment': _comment,
+            'url': reverse('app-comment-detail', kwargs={'bucket_id': bucket_id, 'comment_id': _comment.id}),
+            'parent_url': _parent_type.get_url(bucket_id=bucket_id, recording_id=_comment.parent.id)
+            if _parent_type else None,
+        })
+
+    # sanitize to avoid xss
+    t = repr_get_template('<a href="{{ back_href }}">back</a><br/>'
+                          'saved comments: {{ comment_list|length }}<br/>'
+                          '{% for item in comment_list %}'
+                          '<li><a href="{{ item.url }}">{{ item.comment.id }}</a> {{ item.comment.title }} '
+                          'by {{ item.comment.creator.name }}, '
+                          '{% if item.parent_url %}<a href="{{ item.parent_url }}">{% endif %}'
+                          '{{ item.comment.parent.type }} {{ item.comment.parent.id }}'
+                          '{% if item.parent_url %}</a>{% endif %} {{ item.comment.parent.title }}</li>'
+                          '{% endfor %}')
+    c = Context({'back_href': reverse('app-project-detail', kwargs={'project_id': bucket_id}),
+                 'comment_list': comment_list})
+    return HttpResponse(t.render(context=c))
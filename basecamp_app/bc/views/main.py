@@ -31,6 +31,7 @@ def basecamp_main(request):
         '<li><a href="'+reverse('app-people-main')+'">people</a></li>'
         '<li><a href="'+reverse('app-project-main')+'">project</a></li>'
         '<li><a href="'+reverse('app-recording-main')+'">recording</a></li>'
+        '<li><a href="'+reverse('app-webhook-main')+'">webhook</a></li>'
         '</ul>')
 
 
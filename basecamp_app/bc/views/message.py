@@ -1,11 +1,13 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.urls import reverse
 
+from bc.identity import identity_map_get
 from bc.models import BcMessageCategory, BcMessageBoard, BcMessage
-from bc.utils import (session_get_token_and_identity, bc_api_get, repr_message_detail,
-                      db_get_bucket, db_get_message, db_get_or_create_person,
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, repr_message_detail,
+                      db_get_bucket, db_get_saved, repr_saved_on_db,
                       api_message_get_bucket_message_types_uri, api_message_get_bucket_message_board_uri,
                       api_message_get_bucket_message_board_messages_uri, api_message_get_bucket_message_uri,
+                      sync_hydrate_recordings, sync_save_recording_data,
                       repr_http_response_template_string, repr_template_response_entity_not_found,
                       repr_template_response_entity_creator_bucket_parent, repr_template_response_simple_with_back)
 
@@ -23,24 +25,24 @@ def app_message_type(request, bucket_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     message_type_list = ""
-    for message_type in data:
 
-        # process message_type
-        try:
-            _message_category = BcMessageCategory.objects.get(id=message_type["id"])
-        except BcMessageCategory.DoesNotExist:
-            # save message_category
-            _message_category = BcMessageCategory.objects.create(**message_type)
-            _message_category.save()
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
 
-        message_type_list += f'<li>{_message_category.icon} {_message_category.name}</li>'
+        for message_type in page.json():
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            # process message_type
+            try:
+                _message_category = BcMessageCategory.objects.get(id=message_type["id"])
+            except BcMessageCategory.DoesNotExist:
+                # save message_category
+                _message_category = BcMessageCategory.objects.create(**message_type)
+                _message_category.save()
+
+            message_type_list += f'<li>{_message_category.icon} {_message_category.name}</li>'
 
     total_count = 0
     if "X-Total-Count" in response.headers:
@@ -75,25 +77,11 @@ def app_message_board_detail(request, bucket_id, message_board_id):
     if not _bucket:  # not exists
         return HttpResponseBadRequest(_exception)
 
-    # remove 'bucket' key from message_board, will use model instance bucket instead
-    message_board.pop('bucket')
-
-    # process creator
-    _creator, _exception = db_get_or_create_person(person=message_board["creator"])
-    if not _creator:  # create person error
+    # process message_board, insert or update with creator
+    _message_board, _exception = sync_save_recording_data(data=message_board)
+    if not _message_board:  # create person or save error
         return HttpResponseBadRequest(_exception)
 
-    # remove 'creator' key from message_board, will use model instance creator instead
-    message_board.pop('creator')
-
-    # process message_board
-    try:
-        _message_board = BcMessageBoard.objects.get(id=message_board["id"])
-    except BcMessageBoard.DoesNotExist:
-        # save message_board
-        _message_board = BcMessageBoard.objects.create(bucket=_bucket, creator=_creator, **message_board)
-        _message_board.save()
-
     _response = repr_template_response_simple_with_back(
         back_href=reverse('app-project-detail', kwargs={'project_id': bucket_id}),
         body=f'title: {_message_board.title}<br/>'
@@ -117,36 +105,49 @@ def app_message_board_message(request, bucket_id, message_board_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     message_list = ""
-    for message in data:
 
-        # process bucket first, because at processing parent still need a valid bucket
-        _bucket, _exception = db_get_bucket(bucket_id=message["bucket"]["id"])
-        if not _bucket:  # not exists
+    pages = []  # all pages first, to hydrate their rows at once
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+        pages.append(page.json())
+
+    if request.GET.get('hydrate'):  # save the details of all rows to db, eg: ?hydrate=1
+        _count, _exception = sync_hydrate_recordings(
+            rows=[message for data in pages for message in data], access_token=token["access_token"],
+            get_uri=lambda message: api_message_get_bucket_message_uri(bucket_id=bucket_id, message_id=message["id"]))
+        if _exception:  # hydrate error
             return HttpResponseBadRequest(_exception)
 
-        # check message_board, if not exist on db, save via message_board_detail
-        try:
-            _message_board = BcMessageBoard.objects.get(id=message_board_id)
-        except BcMessageBoard.DoesNotExist:
-            # message board save only at message_board_detail
-            _exception = repr_template_response_entity_not_found(
-                entity_id=message_board_id, entity_type=message["parent"]["type"],
-                href=reverse('app-message-board-detail',
-                             kwargs={'bucket_id': bucket_id, 'message_board_id': message_board_id}))
-            return HttpResponseBadRequest(_exception)
+    _message_board = None
+    for data in pages:
+
+        # process messages, one query for the page. save message only at app_message_detail
+        saved = db_get_saved(model=BcMessage, rows=[message for message in data if message.get("type") == 'Message'])
+
+        for message in data:
 
-        # process message
-        _message, _exception = db_get_message(message=message, bucket_id=_bucket.id)
-        # returned _message can be None, currently ignore the exception as we only show the list
+            # process bucket first, because at processing parent still need a valid bucket
+            _bucket, _exception = db_get_bucket(bucket_id=message["bucket"]["id"])
+            if not _bucket:  # not exists
+                return HttpResponseBadRequest(_exception)
 
-        message_list += repr_message_detail(message=message, bucket_id=_bucket.id, message_obj=_message, as_list=True)
+            # check message_board once, if not exist on db, save via message_board_detail
+            if not _message_board:
+                try:
+                    _message_board = BcMessageBoard.objects.get(id=message_board_id)
+                except BcMessageBoard.DoesNotExist:
+                    # message board save only at message_board_detail
+                    _exception = repr_template_response_entity_not_found(
+                        entity_id=message_board_id, entity_type=message["parent"]["type"],
+                        href=reverse('app-message-board-detail',
+                                     kwargs={'bucket_id': bucket_id, 'message_board_id': message_board_id}))
+                    return HttpResponseBadRequest(_exception)
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            message_list += repr_message_detail(message=message, bucket_id=_bucket.id, as_list=True,
+                                                saved_on_db=repr_saved_on_db(row=message, saved=saved))
 
     total_count = 0
     if "X-Total-Count" in response.headers:
@@ -185,9 +186,7 @@ def app_message_detail(request, bucket_id, message_id):
             return HttpResponseBadRequest(_exception)
 
         # process parent message_board
-        try:
-            parent = BcMessageBoard.objects.get(id=message["parent"]["id"])
-        except BcMessageBoard.DoesNotExist:
+        if not BcMessageBoard.objects.filter(id=message["parent"]["id"]).exists():
             # can not insert new BcMessageBoard with limited data of message["parent"]
             _exception = repr_template_response_entity_not_found(
                 entity_id=message["parent"]["id"], entity_type=message["parent"]["type"],
@@ -196,25 +195,9 @@ def app_message_detail(request, bucket_id, message_id):
                                      'message_board_id': message["parent"]["id"]}))
             return HttpResponseBadRequest(_exception)
 
-        # remove 'parent' key from message, will use model instance parent instead
-        message.pop('parent')
-
-        # remove 'bucket' key from message, will use model instance bucket instead
-        message.pop('bucket')
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=message["creator"])
-        if not _creator:  # create person error
-            return HttpResponseBadRequest(_exception)
-
-        # remove 'creator' key from message, will use model instance creator instead
-        message.pop('creator')
-
         # process message_category
-        if 'category' in message:  # category is optional, so do not need else on this if
-            try:
-                category = BcMessageCategory.objects.get(id=message["category"]["id"])
-            except BcMessageCategory.DoesNotExist:
+        if 'category' in message:  # category is optional
+            if not identity_map_get(BcMessageCategory, message["category"]["id"]):
                 # can not insert new Message Category with limited data of message["category"]
                 template_str = ('Message category not found: {{ entity_category }}<br/>'
                                 '<a href="{{ href }}">save message types to db</a> first.')
@@ -223,20 +206,10 @@ def app_message_detail(request, bucket_id, message_id):
                 return HttpResponseBadRequest(
                     repr_http_response_template_string(template_str=template_str, context_dict=context_dict))
 
-            # remove 'category' key from message, will use model instance of category instead
-            message.pop('category')
-
-        else:  # category is optional, if key 'category' not found, set category as None
-            category = None
-
-        # process message
-        try:
-            _message = BcMessage.objects.get(id=message["id"])
-        except BcMessage.DoesNotExist:
-            # save message
-            _message = BcMessage.objects.create(parent=parent, bucket=_bucket, creator=_creator,
-                                                category=category, **message)
-            _message.save()
+        # process message, insert or update with creator and category
+        _message, _exception = sync_save_recording_data(data=message)
+        if not _message:  # create person or save error
+            return HttpResponseBadRequest(_exception)
 
     else:
         _exception = repr_template_response_entity_creator_bucket_parent(
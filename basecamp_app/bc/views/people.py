@@ -1,8 +1,9 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.urls import reverse
-from django.template import Template, RequestContext
+from django.template import RequestContext
 
-from bc.utils import (session_get_token_and_identity, bc_api_get, db_get_or_create_person,
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, bc_api_iter_json,
+                      db_bulk_sync_people, repr_get_template,
                       api_people_my_profile_uri, api_people_get_person_uri, api_people_get_all_people_uri)
 
 
@@ -61,7 +62,7 @@ def app_people_person(request):
 
     # all methods (GET, POST, etc.)
 
-    t = Template(
+    t = repr_get_template(
             '<a href="' + reverse('app-people-main') + '">back</a><br/>'
             '<form action="' + reverse('app-people-person') + '" method="post">'
             '{% csrf_token %}'
@@ -82,10 +83,11 @@ def app_people_person(request):
     return HttpResponse(t.render(c))
 
 
-def app_people_load_all_to_db(request):
+def app_people_load_all_to_db(request, batch_size=100):
     """
     load manually all people data from API to db, access the URL directly (refer to the urls.py)
     :param request:
+    :param batch_size: people per db_bulk_sync_people
     :return:
     """
 
@@ -93,63 +95,37 @@ def app_people_load_all_to_db(request):
     if not (token and identity):  # no token or identity, redirect to auth
         return HttpResponseRedirect(reverse('bc-auth'))
 
-    # request to get all projects APIa
-    response = bc_api_get(uri=api_people_get_all_people_uri(), access_token=token["access_token"])
+    # request to get all people API, the pages decoded as they download (bc_api_iter_json)
+    response = bc_api_get(uri=api_people_get_all_people_uri(), access_token=token["access_token"], stream=True)
 
-    if response.status_code != 200:  # not OK
-        return HttpResponse('', status=response.status_code)
-
-    # if OK
-    data = response.json()
-    # print(f'X-Total-Count: {response.headers["X-Total-Count"]}')
-
-    for person in data:
-        if person["personable_type"] not in ['DummyUser', 'Tombstone']:
-            if not person["employee"] or 'bot' in person["name"]:
-                print(person)
-            # process company
-            if "company" in person and "id" in person["company"]:
-                _people, _exception = db_get_or_create_person(person=person)
-                if not _people:  # create person error
-                    return HttpResponseBadRequest(_exception)
-
-            else:
-                print(f'person {person["name"]} <{person["email_address"]}> has no company information.')
-
-    total_data = len(data)  # initial total
-
-    if 'next' in response.links and 'url' in response.links["next"]:
-        next_url = response.links["next"]["url"]
-    else:
-        next_url = None
-
-    while next_url:  # as long as next url exists
-        response = bc_api_get(uri=next_url, access_token=token["access_token"])
-
-        if response.status_code != 200:  # not OK
-            return HttpResponse('', status=response.status_code)
+    total_data = 0
+    people = []
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"], stream=True):
+        if page.status_code != 200:  # not OK
+            return HttpResponse('', status=page.status_code)
 
         # if OK
-        data = response.json()
-
-        for person in data:
+        for person in bc_api_iter_json(page):
+            total_data += 1
             if person["personable_type"] not in ['DummyUser', 'Tombstone']:
                 if not person["employee"] or 'bot' in person["name"]:
                     print(person)
                 # process company
                 if "company" in person and "id" in person["company"]:
-                    _people, _exception = db_get_or_create_person(person=person)
-                    if not _people:  # create person error
-                        return HttpResponseBadRequest(_exception)
+                    people.append(person)
 
                 else:
                     print(f'person {person["name"]} <{person["email_address"]}> has no company information.')
 
-        total_data += len(data)
+            # save people in batches while the page is downloading
+            if len(people) >= batch_size:
+                _people, _exception = db_bulk_sync_people(people=people)
+                if _exception:  # bulk sync people error
+                    return HttpResponseBadRequest(_exception)
+                people = []
 
-        if 'next' in response.links and 'url' in response.links["next"]:
-            next_url = response.links["next"]["url"]
-        else:
-            next_url = None
+    _people, _exception = db_bulk_sync_people(people=people)
+    if _exception:  # bulk sync people error
+        return HttpResponseBadRequest(_exception)
 
     return HttpResponse(f'load people to db: {total_data}')
@@ -1,9 +1,10 @@
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse
-from django.template import Template, Context
+from django.template import Context
 
-from bc.utils import (session_get_token_and_identity, bc_api_get, api_project_get_all_projects_uri,
-                      api_project_get_project_uri, static_get_recording_types)
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, db_bulk_set_many_to_many,
+                      repr_get_template,
+                      api_project_get_all_projects_uri, api_project_get_project_uri, static_get_recording_types)
 from bc.models import BcProject, BcProjectTool
 
 
@@ -19,18 +20,17 @@ def app_project_main(request):
     if response.status_code != 200:  # not OK
         return HttpResponse('', status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     project_list = []
-    for project in data:
-        project_list.append({
-            'id': project["id"],
-            'name': project["name"],
-            'url': reverse('app-project-detail', kwargs={'project_id': project["id"]})})
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse('', status=page.status_code)
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+        for project in page.json():
+            project_list.append({
+                'id': project["id"],
+                'name': project["name"],
+                'url': reverse('app-project-detail', kwargs={'project_id': project["id"]})})
 
     total_count = 0
     if "X-Total-Count" in response.headers:
@@ -39,10 +39,10 @@ def app_project_main(request):
     total_count_str = f'total projects: {total_count}' if total_count > 0 else ''
 
     # sanitize to avoid xss
-    t = Template('<a href="' + reverse('bc-main') + '">back to main</a><br/>{{total_count_str}}'
-                 '{% for project in project_list %}'
-                 '<li><a href="{{ project.url }}">{{ project.id }}</a> {{ project.name }}</li>'
-                 '{% endfor %}')
+    t = repr_get_template('<a href="' + reverse('bc-main') + '">back to main</a><br/>{{total_count_str}}'
+                          '{% for project in project_list %}'
+                          '<li><a href="{{ project.url }}">{{ project.id }}</a> {{ project.name }}</li>'
+                          '{% endfor %}')
     c = Context({'total_count_str': total_count_str, 'project_list': project_list})
     return HttpResponse(t.render(context=c))
 
@@ -132,36 +132,33 @@ def app_project_detail(request, project_id, update_db=False):
             project = BcProject.objects.create(**data)
 
         # process tools in the dock, make sure all tools exist
+        tools = BcProjectTool.objects.in_bulk([tool["id"] for tool in project_dock])
         for tool in project_dock:
+            if tool["id"] not in tools:
+                tools[tool["id"]] = BcProjectTool.objects.create(**tool)
 
-            try:
-                _tool = BcProjectTool.objects.get(id=tool["id"])
-            except BcProjectTool.DoesNotExist:
-                _tool = BcProjectTool.objects.create(**tool)
-
-            # make sure tool in the project exist
-            if not project.dock.filter(id=_tool.id).exists():
-                project.dock.add(_tool)
+        # make sure the tools in the project exist, with one read and one insert
+        db_bulk_set_many_to_many(model=BcProject, name='dock', relations={project.id: list(tools)})
 
     # sanitize to avoid xss
-    t = Template('<a href="' + reverse('app-project-main') + '">back</a><br/>'
-                 'project: {{ project.id }}<br/>'
-                 'name: {{ project.name }}<br/>'
-                 'purpose: {{ project.purpose }}<br/>'
-                 'created_at: {{ project.created_at }}<br/>'
-                 'enabled tools: <br/>'
-                 '{% for tool in tool_list %}'
-                 '{% if tool.url == "#" %}'
-                 '<li>{{ tool.id }} {{ tool.title }} ({{ tool.name }})</li>'
-                 '{% else %}'
-                 '<li><a href="{{ tool.url }}">{{ tool.id }}</a> {{ tool.title }} ({{ tool.name }})</li>'
-                 '{% endif %}'
-                 '{% endfor %}<br/>'
-                 '<a href="{{ message_types_url }}">message types</a><br/>'
-                 'recording types: <br/>'
-                 '{% for recording_type in recording_type_list %}'
-                 '<li><a href="{{ recording_type.url }}">{{ recording_type.type }}</a></li>'
-                 '{% endfor %}<br/>')
+    t = repr_get_template('<a href="' + reverse('app-project-main') + '">back</a><br/>'
+                          'project: {{ project.id }}<br/>'
+                          'name: {{ project.name }}<br/>'
+                          'purpose: {{ project.purpose }}<br/>'
+                          'created_at: {{ project.created_at }}<br/>'
+                          'enabled tools: <br/>'
+                          '{% for tool in tool_list %}'
+                          '{% if tool.url == "#" %}'
+                          '<li>{{ tool.id }} {{ tool.title }} ({{ tool.name }})</li>'
+                          '{% else %}'
+                          '<li><a href="{{ tool.url }}">{{ tool.id }}</a> {{ tool.title }} ({{ tool.name }})</li>'
+                          '{% endif %}'
+                          '{% endfor %}<br/>'
+                          '<a href="{{ message_types_url }}">message types</a><br/>'
+                          'recording types: <br/>'
+                          '{% for recording_type in recording_type_list %}'
+                          '<li><a href="{{ recording_type.url }}">{{ recording_type.type }}</a></li>'
+                          '{% endfor %}<br/>')
     message_types_url = reverse('app-message-type', kwargs={'bucket_id': project_id})
     c = Context({'project': data,
                  'tool_list': tool_list,
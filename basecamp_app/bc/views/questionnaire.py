@@ -1,13 +1,14 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.urls import reverse
-from json import dumps as json_dumps
 
-from bc.models import BcQuestionnaire, BcQuestion, BcQuestionAnswer, BcRecurrenceSchedule
-from bc.utils import (session_get_token_and_identity, bc_api_get, db_get_bucket, db_get_or_create_person,
+from bc.models import BcQuestionnaire, BcQuestion, BcQuestionAnswer
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, db_get_bucket,
+                      db_get_saved, repr_saved_on_db,
                       api_questionnaire_get_bucket_questionnaire_uri,
                       api_questionnaire_get_bucket_questionnaire_questions_uri,
                       api_questionnaire_get_bucket_question_uri, api_questionnaire_get_bucket_question_answers_uri,
                       api_questionnaire_get_bucket_question_answer_uri,
+                      sync_hydrate_recordings, sync_save_recording_data,
                       repr_http_response_template_string, repr_template_response_entity_not_found,
                       repr_template_response_entity_creator_bucket_parent, repr_template_response_entity_creator_bucket,
                       repr_template_response_simple_with_back)
@@ -36,25 +37,11 @@ def app_questionnaire_detail(request, bucket_id, questionnaire_id):
         if not _bucket:  # not exists
             return HttpResponseBadRequest(_exception)
 
-        # remove 'bucket' key from questionnaire, will use model instance bucket instead
-        questionnaire.pop('bucket')
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=questionnaire["creator"])
-        if not _creator:  # create person error
+        # process questionnaire, insert or update with creator
+        _questionnaire, _exception = sync_save_recording_data(data=questionnaire)
+        if not _questionnaire:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'creator' key from questionnaire, will use model instance creator instead
-        questionnaire.pop('creator')
-
-        # process questionnaire
-
-        try:
-            _questionnaire = BcQuestionnaire.objects.get(id=questionnaire["id"])
-        except BcQuestionnaire.DoesNotExist:
-            _questionnaire = BcQuestionnaire.objects.create(bucket=_bucket, creator=_creator, **questionnaire)
-            _questionnaire.save()
-
     else:
         _exception = repr_template_response_entity_creator_bucket(entity_type=questionnaire["type"],
                                                                   entity_title=questionnaire["title"])
@@ -84,27 +71,26 @@ def app_questionnaire_question(request, bucket_id, questionnaire_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     question_list = ""
-    for question in data:
 
-        # process question
-        try:
-            _question = BcQuestion.objects.get(id=question["id"])
-        except BcQuestion.DoesNotExist:
-            # save question only at app_question_detail
-            _question = None
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+
+        data = page.json()
 
-        _saved_on_db = " (db)" if _question else ""
+        # process questions, one query for the page. save question only at app_question_detail
+        saved = db_get_saved(model=BcQuestion, rows=data)
 
-        question_list += (f'<li><a href="' + reverse('app-question-detail',
-                                                     kwargs={'bucket_id': bucket_id, 'question_id': question["id"]}) +
-                          f'">{question["id"]}</a> {question["title"]} {_saved_on_db}</li>')
+        for question in data:
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            _saved_on_db = f' {repr_saved_on_db(row=question, saved=saved)}' if question["id"] in saved else ""
+
+            question_list += (f'<li><a href="' +
+                              reverse('app-question-detail',
+                                      kwargs={'bucket_id': bucket_id, 'question_id': question["id"]}) +
+                              f'">{question["id"]}</a> {question["title"]} {_saved_on_db}</li>')
 
     total_count = 0
     if "X-Total-Count" in response.headers:
@@ -146,9 +132,7 @@ def app_question_detail(request, bucket_id, question_id):
 
         if question["parent"]["type"] == "Questionnaire":
             # process parent BcQuestionnaire
-            try:
-                parent = BcQuestionnaire.objects.get(id=question["parent"]["id"])
-            except BcQuestionnaire.DoesNotExist:
+            if not BcQuestionnaire.objects.filter(id=question["parent"]["id"]).exists():
                 # can not insert new Questionnaire with limited data of question["parent"]
                 _exception = repr_template_response_entity_not_found(
                     entity_id=question["parent"]["id"], entity_type=question["parent"]["type"],
@@ -157,40 +141,12 @@ def app_question_detail(request, bucket_id, question_id):
                                          'questionnaire_id': question["parent"]["id"]}))
                 return HttpResponseBadRequest(_exception)
 
-        else:  # condition above has filter the type in to Questionnaire, should never be here
-            parent = None
-
-        # remove 'parent' key from question, will use model instance parent instead
-        question.pop('parent')
-
-        # remove 'bucket' key from question, will use model instance bucket instead
-        question.pop('bucket')
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=question["creator"])
-        if not _creator:  # create person error
+        # process question, insert or update with creator and schedule. schedule has no id, the one referred by the
+        # saved question reused, not created again at every visit
+        _question, _exception = sync_save_recording_data(data=question)
+        if not _question:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'creator' key from question, will use model instance creator instead
-        question.pop('creator')
-
-        # process question and schedule (because schedule has no id, the only access via ForeignKey)
-
-        try:
-            _question = BcQuestion.objects.get(id=question["id"])
-        except BcQuestion.DoesNotExist:
-
-            json_days = json_dumps(question["schedule"]["days"])
-            question["schedule"].pop('days')
-            schedule = BcRecurrenceSchedule.objects.create(days=json_days, **question["schedule"])
-            schedule.save()
-            # remove 'schedule' key from question, will use model instance question instead
-            question.pop('schedule')
-
-            _question = BcQuestion.objects.create(parent=parent, bucket=_bucket, creator=_creator,
-                                                  schedule=schedule, **question)
-            _question.save()
-
     else:
         template_str = ('{{ entity_type }} {{ entity_title }} has no schedule or creator or bucket type Project or '
                         'parent type in {{ list_parent_types }}')
@@ -222,28 +178,36 @@ def app_question_answer(request, bucket_id, question_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     answer_list = ""
-    for answer in data:
 
-        # process question
-        try:
-            _question_answer = BcQuestionAnswer.objects.get(id=answer["id"])
-        except BcQuestionAnswer.DoesNotExist:
-            # save todolist only at app_todolist_detail
-            _question_answer = None
+    pages = []  # all pages first, to hydrate their rows at once
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+        pages.append(page.json())
+
+    if request.GET.get('hydrate'):  # save the details of all rows to db, eg: ?hydrate=1
+        _count, _exception = sync_hydrate_recordings(
+            rows=[answer for data in pages for answer in data], access_token=token["access_token"],
+            get_uri=lambda answer: api_questionnaire_get_bucket_question_answer_uri(
+                bucket_id=bucket_id, question_answer_id=answer["id"]))
+        if _exception:  # hydrate error
+            return HttpResponseBadRequest(_exception)
+
+    for data in pages:
 
-        _saved_on_db = " (db)" if _question_answer else ""
+        # process answers, one query for the page. save question_answer only at app_question_answer_detail
+        saved = db_get_saved(model=BcQuestionAnswer, rows=data)
 
-        answer_list += (f'<li><a href="' +
-                        reverse('app-question-answer-detail',
-                                kwargs={'bucket_id': bucket_id, 'question_answer_id': answer["id"]}) +
-                        f'">{answer["id"]}</a> {answer["title"]}</li>')
+        for answer in data:
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            _saved_on_db = f' {repr_saved_on_db(row=answer, saved=saved)}' if answer["id"] in saved else ""
+
+            answer_list += (f'<li><a href="' +
+                            reverse('app-question-answer-detail',
+                                    kwargs={'bucket_id': bucket_id, 'question_answer_id': answer["id"]}) +
+                            f'">{answer["id"]}</a> {answer["title"]} {_saved_on_db}</li>')
 
     total_count = 0
     if "X-Total-Count" in response.headers:
@@ -283,9 +247,7 @@ def app_question_answer_detail(request, bucket_id, question_answer_id):
 
         if answer["parent"]["type"] == "Question":
             # process parent BcQuestion
-            try:
-                parent = BcQuestion.objects.get(id=answer["parent"]["id"])
-            except BcQuestion.DoesNotExist:
+            if not BcQuestion.objects.filter(id=answer["parent"]["id"]).exists():
                 # can not insert new Question with limited data of answer["parent"]
                 _exception = repr_template_response_entity_not_found(
                     entity_id=answer["parent"]["id"], entity_type=answer["parent"]["type"],
@@ -293,31 +255,11 @@ def app_question_answer_detail(request, bucket_id, question_answer_id):
                                  kwargs={'bucket_id': answer["bucket"]["id"], 'question_id': answer["parent"]["id"]}))
                 return HttpResponseBadRequest(_exception)
 
-        else:  # condition above has filter the type in to Question, should never be here
-            parent = None
-
-        # remove 'parent' key from question, will use model instance parent instead
-        answer.pop('parent')
-
-        # remove 'bucket' key from answer, will use model instance bucket instead
-        answer.pop('bucket')
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=answer["creator"])
-        if not _creator:  # create person error
+        # process question answer, insert or update with creator
+        _question_answer, _exception = sync_save_recording_data(data=answer)
+        if not _question_answer:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'creator' key from question, will use model instance creator instead
-        answer.pop('creator')
-
-        # process question answer
-        try:
-            _question_answer = BcQuestionAnswer.objects.get(id=answer["id"])
-        except BcQuestionAnswer.DoesNotExist:
-            _question_answer = BcQuestionAnswer.objects.create(parent=parent, bucket=_bucket, creator=_creator,
-                                                               **answer)
-            _question_answer.save()
-
     else:
         _exception = repr_template_response_entity_creator_bucket_parent(
             entity_type=answer["type"], entity_title=answer["title"], list_parent_types=["Question"])
@@ -1,9 +1,9 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.urls import reverse
 
-from bc.utils import (session_get_token_and_identity, bc_api_get, repr_message_detail,
-                      db_get_bucket, db_get_comment_parent, db_get_or_create_person,
-                      db_get_message, db_get_message_parent,
+from bc.models import BcMessage
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, repr_message_detail,
+                      db_get_bucket, db_get_recordings_relations, db_get_saved, repr_saved_on_db,
                       api_recording_get_recordings_uri, api_recording_get_bucket_recording_parent_comment_uri,
                       static_get_recording_types, static_get_comment_parent_types, static_get_message_parent_types,
                       repr_http_response_template_string, repr_template_response_entity_creator_bucket_parent,
@@ -42,16 +42,17 @@ def app_recording_by_type(request, recording_type):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-    recording_total = len(data)
+    # if OK, process all pages
+    recording_total = 0
     recording_keys = []
-    for recording in data:
-        # print(recording)
-        recording_keys = recording.keys()
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
 
-    if 'next' in response.links and 'url' in response.links["next"]:
-        print(response.links["next"]["url"])
+        data = page.json()
+        recording_total += len(data)
+        for recording in data:
+            recording_keys = recording.keys()
 
     total_count = 0
     if "X-Total-Count" in response.headers:
@@ -85,104 +86,66 @@ def app_project_recording_by_type(request, bucket_id, recording_type):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-    recording_total = len(data)
+    # if OK, process all pages
+    recording_total = 0
     recording_keys = []
     recording_list = ""
-    for recording in data:
-
-        if recording["type"] in ['Comment']:
-
-            if ('parent' in recording and recording["parent"]["type"] in static_get_comment_parent_types() and
-                    'bucket' in recording and recording["bucket"]["type"] == "Project" and 'creator' in recording):
-
-                # process bucket first, because at processing parent still need a valid bucket
-                _bucket, _exception = db_get_bucket(bucket_id=recording["bucket"]["id"])
-                if not _bucket:  # not exists
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+
+        data = page.json()
+        recording_total += len(data)
+
+        # resolve bucket, parent and creator of the page at once, with a query per model instead of per recording
+        _relations = {}
+        for _type, list_parent_types in [('Comment', static_get_comment_parent_types()),
+                                         ('Message', static_get_message_parent_types())]:
+            recordings = [recording for recording in data if recording["type"] == _type]
+            for recording in recordings:
+                if not ('parent' in recording and recording["parent"]["type"] in list_parent_types and
+                        'bucket' in recording and recording["bucket"]["type"] == "Project" and 'creator' in recording):
+                    _exception = repr_template_response_entity_creator_bucket_parent(
+                        entity_type=recording["type"], entity_title=recording["title"],
+                        list_parent_types=list_parent_types)
                     return HttpResponseBadRequest(_exception)
 
-                # process parent with type listed in static_get_comment_parent_types
-                _parent, _exception = db_get_comment_parent(parent=recording["parent"],
-                                                            bucket_id=recording["bucket"]["id"])
-                if not _parent:  # not exists
+            if recordings:
+                _relations[_type], _exception = db_get_recordings_relations(recordings=recordings,
+                                                                            list_parent_types=list_parent_types)
+                if not _relations[_type]:  # bucket or parent not exists, or create person error
                     return HttpResponseBadRequest(_exception)
 
-                # process creator
-                _creator, _exception = db_get_or_create_person(person=recording["creator"])
-                if not _creator:  # create person error
-                    return HttpResponseBadRequest(_exception)
-
-                # remove 'bucket' key from recording. key 'bucket' still used in processing parent
-                recording.pop('bucket')
-
-                # remove 'parent' key from recording, will use model instance parent instead
-                recording.pop('parent')
-
-                # remove 'creator' key from recording, will use model instance creator instead
-                recording.pop('creator')
-
-                _parent_comment_uri = reverse('app-project-recording-parent-comment',
-                                              kwargs={'bucket_id': _bucket.id, 'parent_id': _parent.id})
-
-                recording_list += (f'<li>{recording["id"]} '
-                                   f'<a href="{_parent_comment_uri}">parent_comment</a> {recording["title"]}</li>')
+        # messages saved to db, one query for the page. save message only at app_message_detail
+        saved = db_get_saved(model=BcMessage, rows=[recording for recording in data if recording["type"] == 'Message'])
 
-            else:
-                _exception = repr_template_response_entity_creator_bucket_parent(
-                    entity_type=recording["type"], entity_title=recording["title"],
-                    list_parent_types=static_get_comment_parent_types())
-                return HttpResponseBadRequest(_exception)
+        for recording in data:
 
-        elif recording["type"] in ['Message']:
-            if ('parent' in recording and recording["parent"]["type"] in static_get_message_parent_types() and
-                    'bucket' in recording and recording["bucket"]["type"] == "Project" and 'creator' in recording):
+            if recording["type"] in ['Comment', 'Message']:
+                _bucket = _relations[recording["type"]]["buckets"][recording["bucket"]["id"]]
+                _parent = _relations[recording["type"]]["parents"][(recording["parent"]["type"],
+                                                                     recording["parent"]["id"])]
 
-                # process bucket first, because at processing parent still need a valid bucket
-                _bucket, _exception = db_get_bucket(bucket_id=recording["bucket"]["id"])
-                if not _bucket:  # not exists
-                    return HttpResponseBadRequest(_exception)
-
-                # process parent with type listed in static_get_message_parent_types
-                _parent, _exception = db_get_message_parent(parent=recording["parent"],
-                                                            bucket_id=recording["bucket"]["id"])
-                if not _parent:  # not exists
-                    return HttpResponseBadRequest(_exception)
-
-                # process creator
-                _creator, _exception = db_get_or_create_person(person=recording["creator"])
-                if not _creator:  # create person error
-                    return HttpResponseBadRequest(_exception)
-
-                # remove 'bucket' key from recording. key 'bucket' still used in processing parent
+                # remove 'bucket', 'parent' and 'creator' keys from recording, will use model instances instead
                 recording.pop('bucket')
-
-                # remove 'parent' key from recording, will use model instance parent instead
                 recording.pop('parent')
-
-                # remove 'creator' key from recording, will use model instance creator instead
                 recording.pop('creator')
 
-                # process Message
-                _message, _exception = db_get_message(message=recording, bucket_id=_bucket.id)
-                # returned message can be None, currently ignore the exception as we only show the list
-
-                recording_list += (
-                    repr_message_detail(message=recording, bucket_id=_bucket.id, message_obj=_message, as_list=True))
+                if recording["type"] == 'Comment':
+                    _parent_comment_uri = reverse('app-project-recording-parent-comment',
+                                                  kwargs={'bucket_id': _bucket.id, 'parent_id': _parent.id})
 
-            else:
-                _exception = repr_template_response_entity_creator_bucket_parent(
-                    entity_type=recording["type"], entity_title=recording["title"],
-                    list_parent_types=static_get_comment_parent_types())
-                return HttpResponseBadRequest(_exception)
+                    recording_list += (f'<li>{recording["id"]} '
+                                       f'<a href="{_parent_comment_uri}">parent_comment</a> {recording["title"]}</li>')
 
-        else:  # others recording type
-            print(f'{recording_type}: {recording.keys()}')
+                else:  # process Message
+                    recording_list += repr_message_detail(message=recording, bucket_id=_bucket.id, as_list=True,
+                                                          saved_on_db=repr_saved_on_db(row=recording, saved=saved))
 
-        recording_keys = recording.keys()
+            else:  # others recording type
+                print(f'{recording_type}: {recording.keys()}')
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            recording_keys = recording.keys()
 
     total_count = 0
     if "X-Total-Count" in response.headers:
@@ -208,21 +171,21 @@ def app_project_recording_parent_comment(request, bucket_id, parent_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     count = 0
     comment_list = ""
-    for comment in data:
-        print(comment)
 
-        comment_list += (f'<li><a href="' + reverse('app-comment-detail',
-                                                    kwargs={'bucket_id': bucket_id, 'comment_id': comment["id"]}) +
-                         f'">{comment["id"]}</a> {comment["title"]}</li>')
-        count += 1
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+
+        for comment in page.json():
+            print(comment)
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            comment_list += (f'<li><a href="' + reverse('app-comment-detail',
+                                                        kwargs={'bucket_id': bucket_id, 'comment_id': comment["id"]}) +
+                             f'">{comment["id"]}</a> {comment["title"]}</li>')
+            count += 1
 
     total_count_str = ''
     if "X-Total-Count" in response.headers:
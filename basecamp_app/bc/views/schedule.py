@@ -1,11 +1,12 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.urls import reverse
-from json import dumps as json_dumps
 
-from bc.models import BcSchedule, BcScheduleEntry, BcRecurrenceSchedule
-from bc.utils import (session_get_token_and_identity, bc_api_get, db_get_bucket, db_get_or_create_person,
+from bc.models import BcSchedule, BcScheduleEntry
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, db_get_bucket,
+                      db_get_saved, repr_saved_on_db,
                       api_schedule_get_bucket_schedule_uri, api_schedule_get_bucket_schedule_entries_uri,
                       api_schedule_get_bucket_schedule_entry_uri,
+                      sync_hydrate_recordings, sync_save_recording_data,
                       repr_http_response_template_string, repr_template_response_entity_not_found,
                       repr_template_response_entity_creator_bucket, repr_template_response_simple_with_back)
 
@@ -33,24 +34,11 @@ def app_schedule_detail(request, bucket_id, schedule_id):
         if not _bucket:  # not exists
             return HttpResponseBadRequest(_exception)
 
-        # remove 'bucket' key from schedule, will use model instance bucket instead
-        schedule.pop('bucket')
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=schedule["creator"])
-        if not _creator:  # create person error
+        # process schedule, insert or update with creator
+        _schedule, _exception = sync_save_recording_data(data=schedule)
+        if not _schedule:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'creator' key from schedule, will use model instance creator instead
-        schedule.pop('creator')
-
-        # process schedule
-        try:
-            _schedule = BcSchedule.objects.get(id=schedule["id"])
-        except BcSchedule.DoesNotExist:
-            _schedule = BcSchedule.objects.create(bucket=_bucket, creator=_creator, **schedule)
-            _schedule.save()
-
     else:
         _exception = repr_template_response_entity_creator_bucket(entity_type=schedule["type"],
                                                                   entity_title=schedule["title"])
@@ -81,27 +69,36 @@ def app_schedule_entry(request, bucket_id, schedule_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     entry_list = ""
-    for entry in data:
 
-        # process entry
-        try:
-            _entry = BcScheduleEntry.objects.get(id=entry["id"])
-        except BcScheduleEntry.DoesNotExist:
-            # save schedule_entry only at app_schedule_entry_detail
-            _entry = None
+    pages = []  # all pages first, to hydrate their rows at once
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+        pages.append(page.json())
+
+    if request.GET.get('hydrate'):  # save the details of all rows to db, eg: ?hydrate=1
+        _count, _exception = sync_hydrate_recordings(
+            rows=[entry for data in pages for entry in data], access_token=token["access_token"],
+            get_uri=lambda entry: api_schedule_get_bucket_schedule_entry_uri(
+                bucket_id=bucket_id, schedule_entry_id=entry["id"]))
+        if _exception:  # hydrate error
+            return HttpResponseBadRequest(_exception)
+
+    for data in pages:
+
+        # process entries, one query for the page. save schedule_entry only at app_schedule_entry_detail
+        saved = db_get_saved(model=BcScheduleEntry, rows=data)
 
-        _saved_on_db = " (db)" if _entry else ""
+        for entry in data:
 
-        entry_list += (f'<li><a href="' + reverse('app-schedule-entry-detail',
-                                                  kwargs={'bucket_id': bucket_id, 'schedule_entry_id': entry["id"]}) +
-                       f'">{entry["id"]}</a> {entry["title"]} {_saved_on_db}</li>')
+            _saved_on_db = f' {repr_saved_on_db(row=entry, saved=saved)}' if entry["id"] in saved else ""
 
-    if 'next' in response.links and 'url' in response.links["next"]:
-        print(response.links["next"]["url"])
+            entry_list += (f'<li><a href="' +
+                           reverse('app-schedule-entry-detail',
+                                   kwargs={'bucket_id': bucket_id, 'schedule_entry_id': entry["id"]}) +
+                           f'">{entry["id"]}</a> {entry["title"]} {_saved_on_db}</li>')
 
     total_count = 0
     if "X-Total-Count" in response.headers:
@@ -142,9 +139,7 @@ def app_schedule_entry_detail(request, bucket_id, schedule_entry_id):
 
         if schedule_entry["parent"]["type"] == "Schedule":
             # process parent BcSchedule
-            try:
-                parent = BcSchedule.objects.get(id=schedule_entry["parent"]["id"])
-            except BcSchedule.DoesNotExist:
+            if not BcSchedule.objects.filter(id=schedule_entry["parent"]["id"]).exists():
                 # can not insert new Schedule with limited data of schedule_entry["parent"]
                 _exception = repr_template_response_entity_not_found(
                     entity_id=schedule_entry["parent"]["id"], entity_type=schedule_entry["parent"]["type"],
@@ -153,68 +148,12 @@ def app_schedule_entry_detail(request, bucket_id, schedule_entry_id):
                                          'schedule_id': schedule_entry["parent"]["id"]}))
                 return HttpResponseBadRequest(_exception)
 
-        else:  # condition above has filter the type in to Schedule, should never be here
-            parent = None
-
-        # remove 'parent' key from schedule entry, will use model instance parent instead
-        schedule_entry.pop('parent')
-
-        # remove 'bucket' key from schedule entry, will use model instance bucket instead
-        schedule_entry.pop('bucket')
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=schedule_entry["creator"])
-        if not _creator:  # create person error
+        # process schedule entry, insert or update with creator, participants and (optional) recurrence schedule.
+        # the recurrence schedule reused, not created again at every visit
+        _schedule_entry, _exception = sync_save_recording_data(data=schedule_entry)
+        if not _schedule_entry:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'creator' key from schedule entry, will use model instance creator instead
-        schedule_entry.pop('creator')
-
-        # process participants
-        participants = []
-        for participant in schedule_entry["participants"]:
-
-            _participant, _exception = db_get_or_create_person(person=participant)
-            if not _participant:  # create person error
-                return HttpResponseBadRequest(_exception)
-
-            # list of assignee objects, will be appended later as many-to-many
-            participants.append(_participant)
-
-        # remove 'participants' key from schedule entry
-        schedule_entry.pop('participants')
-
-        # (optional) process recurrence schedule
-        if 'recurrence_schedule' in schedule_entry:
-
-            json_days = json_dumps(schedule_entry["recurrence_schedule"]["days"])
-            schedule_entry["recurrence_schedule"].pop('days')
-            schedule = BcRecurrenceSchedule.objects.create(days=json_days, **schedule_entry["recurrence_schedule"])
-            schedule.save()
-            # remove 'recurrence_schedule' key from schedule entry, will use model instance question instead
-            schedule_entry.pop('recurrence_schedule')
-
-            # process schedule entry
-            try:
-                _schedule_entry = BcScheduleEntry.objects.get(id=schedule_entry["id"])
-            except BcScheduleEntry.DoesNotExist:
-                _schedule_entry = BcScheduleEntry.objects.create(parent=parent, bucket=_bucket, creator=_creator,
-                                                                 recurrence_schedule=schedule, **schedule_entry)
-                _schedule_entry.save()
-
-        else:  # without recurrence schedule
-
-            # process schedule entry
-            try:
-                _schedule_entry = BcScheduleEntry.objects.get(id=schedule_entry["id"])
-            except BcScheduleEntry.DoesNotExist:
-                _schedule_entry = BcScheduleEntry.objects.create(parent=parent, bucket=_bucket, creator=_creator,
-                                                                 **schedule_entry)
-                _schedule_entry.save()
-
-        # set participants
-        _schedule_entry.participants.set(participants)
-
     else:
         template_str = ('{{ entity_type }} {{ entity_title }} has no participants or creator or bucket type Project or '
                         'parent type in {{ list_parent_types }}')
@@ -1,9 +1,11 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.urls import reverse
 
-from bc.models import BcTodoset, BcTodolist, BcTodo, BcTodoCompletion
-from bc.utils import (session_get_token_and_identity, bc_api_get, db_get_bucket, db_get_or_create_person,
+from bc.models import BcTodoset, BcTodolist, BcTodo
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, db_get_bucket,
+                      db_get_saved, repr_saved_on_db,
                       api_todo_get_bucket_todolist_todos_uri, api_todo_get_bucket_todo_uri,
+                      sync_hydrate_recordings, sync_save_recording_data,
                       repr_http_response_template_string, repr_template_response_entity_not_found,
                       repr_template_response_entity_creator_bucket_parent, repr_template_response_simple_with_back)
 
@@ -20,41 +22,49 @@ def app_todo_main(request, bucket_id, todolist_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     count = 0
     todo_list = ""
-    for todo in data:
 
-        if ('parent' in todo and todo["parent"]["type"] in ["Todoset", "Todolist"] and
-                'bucket' in todo and todo["bucket"]["type"] == "Project" and 'creator' in todo):
-
-            # process todo
-            try:
-                _todo = BcTodo.objects.get(id=todo["id"])
-            except BcTodo.DoesNotExist:
-                # save todo only at app_todo_detail
-                _todo = None
+    pages = []  # all pages first, to hydrate their rows at once
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+        pages.append(page.json())
+
+    # validate all rows first, before hydrate writes them to db
+    for data in pages:
+        for todo in data:
+            if not ('parent' in todo and todo["parent"]["type"] in ["Todoset", "Todolist"] and
+                    'bucket' in todo and todo["bucket"]["type"] == "Project" and 'creator' in todo):
+                _exception = repr_template_response_entity_creator_bucket_parent(
+                    entity_type=todo["type"], entity_title=todo["title"], list_parent_types=["Todoset", "Todolist"])
+                return HttpResponseBadRequest(_exception)
 
-        else:
-            _exception = repr_template_response_entity_creator_bucket_parent(
-                entity_type=todo["type"], entity_title=todo["title"], list_parent_types=["Todoset", "Todolist"])
+    if request.GET.get('hydrate'):  # save the details of all rows to db, eg: ?hydrate=1
+        _count, _exception = sync_hydrate_recordings(
+            rows=[todo for data in pages for todo in data], access_token=token["access_token"],
+            get_uri=lambda todo: api_todo_get_bucket_todo_uri(bucket_id=bucket_id, todo_id=todo["id"]))
+        if _exception:  # hydrate error
             return HttpResponseBadRequest(_exception)
 
-        _todo_title = _todo.title if _todo else todo["title"]
-        _saved_on_db = " (db)" if _todo else ""
+    for data in pages:
 
-        todo_list += (f'<li><a href="' + reverse('app-todo-detail',
-                                                 kwargs={'bucket_id': bucket_id, 'todo_id': todo["id"]}) +
-                      f'">{todo["id"]}</a> '
-                      f'{_todo_title} ' +
-                      ('(completed) ' if todo["completed"] else f'(not-complete) ') +
-                      f'{todo["comments_count"]} comments {_saved_on_db}</li>')
-        count += 1
+        # process todos, one query for the page. save todo only at app_todo_detail
+        saved = db_get_saved(model=BcTodo, rows=data)
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+        for todo in data:
+
+            _todo_title = saved[todo["id"]][0] if todo["id"] in saved else todo["title"]
+            _saved_on_db = f' {repr_saved_on_db(row=todo, saved=saved)}' if todo["id"] in saved else ""
+
+            todo_list += (f'<li><a href="' + reverse('app-todo-detail',
+                                                     kwargs={'bucket_id': bucket_id, 'todo_id': todo["id"]}) +
+                          f'">{todo["id"]}</a> '
+                          f'{_todo_title} ' +
+                          ('(completed) ' if todo["completed"] else f'(not-complete) ') +
+                          f'{todo["comments_count"]} comments {_saved_on_db}</li>')
+            count += 1
 
     total_count_str = ''
     if "X-Total-Count" in response.headers:
@@ -93,9 +103,7 @@ def app_todo_detail(request, bucket_id, todo_id):
 
         if todo["parent"]["type"] == "Todoset":
             # process parent BcTodoset
-            try:
-                parent = BcTodoset.objects.get(id=todo["parent"]["id"])
-            except BcTodoset.DoesNotExist:
+            if not BcTodoset.objects.filter(id=todo["parent"]["id"]).exists():
                 # can not insert new Todoset with limited data of todolist["parent"]
                 _exception = repr_template_response_entity_not_found(
                     entity_id=todo["parent"]["id"], entity_type=todo["parent"]["type"],
@@ -105,9 +113,7 @@ def app_todo_detail(request, bucket_id, todo_id):
 
         elif todo["parent"]["type"] == "Todolist":
             # process parent BcTodolist
-            try:
-                parent = BcTodolist.objects.get(id=todo["parent"]["id"])
-            except BcTodolist.DoesNotExist:
+            if not BcTodolist.objects.filter(id=todo["parent"]["id"]).exists():
                 # can not insert new Todolist with limited data of todolist["parent"]
                 _exception = repr_template_response_entity_not_found(
                     entity_id=todo["parent"]["id"], entity_type=todo["parent"]["type"],
@@ -115,91 +121,19 @@ def app_todo_detail(request, bucket_id, todo_id):
                                  kwargs={'bucket_id': todo["bucket"]["id"], 'todolist_id': todo["parent"]["id"]}))
                 return HttpResponseBadRequest(_exception)
 
-        else:  # condition above has filter the type in to Todoset or Todolist, should never be here
-            parent = None
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=todo["creator"])
-        if not _creator:  # create person error
+        # process todo, insert or update with creator, completion, assignees and completion_subscribers.
+        # the completion reused, not created again at every visit
+        _todo, _exception = sync_save_recording_data(data=todo)
+        if not _todo:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'bucket' key from todo. key 'bucket' still used in processing parent
-        todo.pop('bucket')
-
-        # remove 'parent' key from todo, will use model instance parent instead
-        todo.pop('parent')
-
-        # remove 'creator' key from todo, will use model instance creator instead
-        todo.pop('creator')
-
-        # process completion if any
-        completion = None
-        if 'completion' in todo:
-            # process completion creator
-            _completion_creator, _exception = db_get_or_create_person(person=todo["completion"]["creator"])
-            if not _completion_creator:  # create person error
-                return HttpResponseBadRequest(_exception)
-
-            # remove 'creator' key from completion, will use model instance creator instead
-            todo["completion"].pop('creator')
-
-            # process completion
-            completion = BcTodoCompletion.objects.create(creator=_completion_creator, **todo["completion"])
-            completion.save()
-
-            # remove 'completion' key from todo
-            todo.pop('completion')
-
-        # process assignees
-        assignees = []
-        for assignee in todo["assignees"]:
-            _assignee, _exception = db_get_or_create_person(person=assignee)
-            if not _assignee:  # create person error
-                return HttpResponseBadRequest(_exception)
-
-            # list of assignee objects, will be appended later as many-to-many
-            assignees.append(_assignee)
-
-        # remove 'assignees' key from todo
-        todo.pop('assignees')
-
-        # process completion_subscribers
-        completion_subscribers = []
-        for subscriber in todo["completion_subscribers"]:
-            _subscriber, _exception = db_get_or_create_person(person=subscriber)
-            if not _subscriber:  # create person error
-                return HttpResponseBadRequest(_exception)
-
-            # list of subscriber objects, will be appended later as many-to-many
-            completion_subscribers.append(_subscriber)
-
-        # remove 'completion_subscribers' key from todo
-        todo.pop('completion_subscribers')
-
-        # process todo
-        try:
-            _todo = BcTodo.objects.get(id=todo["id"])
-        except BcTodo.DoesNotExist:
-            if completion:  # completion exists
-                _todo = BcTodo.objects.create(parent=parent, bucket=_bucket, creator=_creator, completion=completion,
-                                              **todo)
-            else:  # undefined completion
-                _todo = BcTodo.objects.create(parent=parent, bucket=_bucket, creator=_creator, **todo)
-
-            # save todo model
-            _todo.save()
-
-        # set assignees and completion_subscribers
-        _todo.assignees.set(assignees)
-        _todo.completion_subscribers.set(completion_subscribers)
-
     else:
         _exception = repr_template_response_entity_creator_bucket_parent(
             entity_type=todo["type"], entity_title=todo["title"], list_parent_types=["Todoset", "Todolist"])
         return HttpResponseBadRequest(_exception)
 
-    assignees_str = [assignee.name for assignee in assignees]
-    completion_subscribers_str = [subscriber.name for subscriber in completion_subscribers]
+    assignees_str = [assignee.name for assignee in _todo.assignees.all()]
+    completion_subscribers_str = [subscriber.name for subscriber in _todo.completion_subscribers.all()]
 
     _response = repr_template_response_simple_with_back(
         back_href=reverse('app-project-detail', kwargs={'project_id': bucket_id}),
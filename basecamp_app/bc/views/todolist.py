@@ -2,8 +2,10 @@ from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadReque
 from django.urls import reverse
 
 from bc.models import BcTodoset, BcTodolist
-from bc.utils import (session_get_token_and_identity, bc_api_get, db_get_bucket, db_get_or_create_person,
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, db_get_bucket,
+                      db_get_saved, repr_saved_on_db,
                       api_todolist_get_bucket_todoset_todolists_uri, api_todolist_get_bucket_todolist_uri,
+                      sync_hydrate_recordings, sync_save_recording_data,
                       repr_http_response_template_string, repr_template_response_entity_not_found,
                       repr_template_response_entity_creator_bucket_parent, repr_template_response_simple_with_back)
 
@@ -28,42 +30,53 @@ def app_todolist_main(request, bucket_id, todoset_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     count = 0
     todolist_list = ""
-    for todolist in data:
 
-        if ('parent' in todolist and todolist["parent"]["type"] in ["Todoset", "Todolist"] and
-                'bucket' in todolist and todolist["bucket"]["type"] == "Project" and 'creator' in todolist):
-
-            # process todolist
-            try:
-                _todolist = BcTodolist.objects.get(id=todolist["id"])
-            except BcTodolist.DoesNotExist:
-                # save todolist only at app_todolist_detail
-                _todolist = None
+    pages = []  # all pages first, to hydrate their rows at once
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+        pages.append(page.json())
+
+    # validate all rows first, before hydrate writes them to db
+    for data in pages:
+        for todolist in data:
+            if not ('parent' in todolist and todolist["parent"]["type"] in ["Todoset", "Todolist"] and
+                    'bucket' in todolist and todolist["bucket"]["type"] == "Project" and 'creator' in todolist):
+                _exception = repr_template_response_entity_creator_bucket_parent(
+                    entity_type=todolist["type"], entity_title=todolist["title"],
+                    list_parent_types=["Todoset", "Todolist"])
+                return HttpResponseBadRequest(_exception)
 
-        else:
-            _exception = repr_template_response_entity_creator_bucket_parent(
-                entity_type=todolist["type"], entity_title=todolist["title"], list_parent_types=["Todoset", "Todolist"])
+    if request.GET.get('hydrate'):  # save the details of all rows to db, eg: ?hydrate=1
+        _count, _exception = sync_hydrate_recordings(
+            rows=[todolist for data in pages for todolist in data], access_token=token["access_token"],
+            get_uri=lambda todolist: api_todolist_get_bucket_todolist_uri(
+                bucket_id=bucket_id, todolist_id=todolist["id"]))
+        if _exception:  # hydrate error
             return HttpResponseBadRequest(_exception)
 
-        _todolist_title = _todolist.title if _todolist else todolist["title"]
-        _saved_on_db = " (db)" if _todolist else ""
+    for data in pages:
 
-        todolist_list += (f'<li><a href="' + reverse('app-todolist-detail',
-                                                     kwargs={'bucket_id': bucket_id, 'todolist_id': todolist["id"]}) +
-                          f'">{todolist["id"]}</a> '
-                          f'{_todolist_title} ' +
-                          ('(completed) ' if todolist["completed"] else f'({todolist["completed_ratio"]}) ') +
-                          f'{todolist["comments_count"]} comments {_saved_on_db}</li>')
+        # process todolists, one query for the page. save todolist only at app_todolist_detail
+        saved = db_get_saved(model=BcTodolist, rows=data)
 
-        count += 1
+        for todolist in data:
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            _todolist_title = saved[todolist["id"]][0] if todolist["id"] in saved else todolist["title"]
+            _saved_on_db = f' {repr_saved_on_db(row=todolist, saved=saved)}' if todolist["id"] in saved else ""
+
+            todolist_list += (f'<li><a href="' +
+                              reverse('app-todolist-detail',
+                                      kwargs={'bucket_id': bucket_id, 'todolist_id': todolist["id"]}) +
+                              f'">{todolist["id"]}</a> '
+                              f'{_todolist_title} ' +
+                              ('(completed) ' if todolist["completed"] else f'({todolist["completed_ratio"]}) ') +
+                              f'{todolist["comments_count"]} comments {_saved_on_db}</li>')
+
+            count += 1
 
     total_count_str = ''
     if "X-Total-Count" in response.headers:
@@ -109,9 +122,7 @@ def app_todolist_detail(request, bucket_id, todolist_id):
 
         if todolist["parent"]["type"] == "Todoset":
             # process parent BcTodoset
-            try:
-                parent = BcTodoset.objects.get(id=todolist["parent"]["id"])
-            except BcTodoset.DoesNotExist:
+            if not BcTodoset.objects.filter(id=todolist["parent"]["id"]).exists():
                 # can not insert new Todoset with limited data of todolist["parent"]
                 _exception = repr_template_response_entity_not_found(
                     entity_id=todolist["parent"]["id"], entity_type=todolist["parent"]["type"],
@@ -122,9 +133,7 @@ def app_todolist_detail(request, bucket_id, todolist_id):
 
         elif todolist["parent"]["type"] == "Todolist":
             # process parent BcTodolist
-            try:
-                parent = BcTodolist.objects.get(id=todolist["parent"]["id"])
-            except BcTodolist.DoesNotExist:
+            if not BcTodolist.objects.filter(id=todolist["parent"]["id"]).exists():
                 # can not insert new Todolist with limited data of todolist["parent"]
                 _exception = repr_template_response_entity_not_found(
                     entity_id=todolist["parent"]["id"], entity_type=todolist["parent"]["type"],
@@ -133,45 +142,23 @@ def app_todolist_detail(request, bucket_id, todolist_id):
                                          'todolist_id': todolist["parent"]["id"]}))
                 return HttpResponseBadRequest(_exception)
 
-        else:  # condition above has filter the type in to Todoset or Todolist, should never be here
-            parent = None
-
-        # remove 'parent' key from todolist, will use model instance parent instead
-        todolist.pop('parent')
-
-        # remove 'bucket' key from todolist, will use model instance bucket instead
-        todolist.pop('bucket')
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=todolist["creator"])
-        if not _creator:  # create person error
-            return HttpResponseBadRequest(_exception)
-
-        # remove 'creator' key from todolist, will use model instance creator instead
-        todolist.pop('creator')
-
         # process todolist
-
         if 'groups_url' in todolist:  # type todolist
-            is_todolist_group = False
             todolist_group_str = ('<a href="' +
                                   reverse('app-todolist_group-main',
                                           kwargs={'bucket_id': bucket_id,
                                                   'todolist_id': todolist_id}) + '">todolist_groups</a><br/>')
 
         elif 'group_position_url' in todolist:  # type todolist_group
-            is_todolist_group = True
             todolist_group_str = f'group position url: {todolist["group_position_url"]}<br/>'
 
         else:  # unknown type
             return HttpResponseBadRequest(f'todolist type unknown no groups_url or group_position_url')
 
-        try:
-            _todolist = BcTodolist.objects.get(id=todolist["id"])
-        except BcTodolist.DoesNotExist:
-            _todolist = BcTodolist.objects.create(parent=parent, bucket=_bucket, creator=_creator,
-                                                  is_todolist_group=is_todolist_group, **todolist)
-            _todolist.save()
+        # insert or update with creator, is_todolist_group by group_position_url
+        _todolist, _exception = sync_save_recording_data(data=todolist)
+        if not _todolist:  # create person or save error
+            return HttpResponseBadRequest(_exception)
 
     else:
         _exception = repr_template_response_entity_creator_bucket_parent(
@@ -2,9 +2,10 @@ from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadReque
 from django.urls import reverse
 
 from bc.models import BcTodolist
-from bc.utils import (session_get_token_and_identity, bc_api_get, api_todolist_group_get_todolist_groups_uri,
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages, db_get_saved,
+                      api_todolist_group_get_todolist_groups_uri,
                       repr_http_response_template_string, repr_template_response_entity_creator_bucket_parent,
-                      repr_template_response_simple_with_back)
+                      repr_template_response_simple_with_back, repr_saved_on_db)
 
 
 def app_todolist_group_main(request, bucket_id, todolist_id):
@@ -20,46 +21,45 @@ def app_todolist_group_main(request, bucket_id, todolist_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     count = 0
     todolist_group_list = ""
-    for todolist_group in data:
 
-        if ('parent' in todolist_group and todolist_group["parent"]["type"] in ["Todoset", "Todolist"] and
-                'bucket' in todolist_group and todolist_group["bucket"]["type"] == "Project" and
-                'creator' in todolist_group):
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
 
-            # process todolist_group as todolist
-            try:
-                _todolist_group = BcTodolist.objects.get(id=todolist_group["id"])
-            except BcTodolist.DoesNotExist:
-                # save todolist_group only at app_todolist_group_detail
-                _todolist_group = None
+        data = page.json()
 
-        else:
-            _exception = repr_template_response_entity_creator_bucket_parent(
-                entity_type=todolist_group["type"], entity_title=todolist_group["title"],
-                list_parent_types=["Todoset", "Todolist"])
-            return HttpResponseBadRequest(_exception)
+        # process todolist_groups as todolists, one query for the page. save todolist_group only at
+        # app_todolist_group_detail
+        saved = db_get_saved(model=BcTodolist, rows=data)
 
-        _todolist_group_title = _todolist_group.title if _todolist_group else todolist_group["title"]
-        _saved_on_db = " (db)" if _todolist_group else ""
+        for todolist_group in data:
 
-        # process todolist_group as todolist
-        todolist_group_list += (f'<li><a href="' +
-                                reverse('app-todolist-detail',
-                                        kwargs={'bucket_id': bucket_id, 'todolist_id': todolist_group["id"]}) +
-                                f'">{todolist_group["id"]}</a> '
-                                f'{_todolist_group_title} ' +
-                                ('(completed) ' if todolist_group["completed"] else
-                                 f'({todolist_group["completed_ratio"]}) ') +
-                                f'{todolist_group["comments_count"]} comments {_saved_on_db}</li>')
-        count += 1
+            if not ('parent' in todolist_group and todolist_group["parent"]["type"] in ["Todoset", "Todolist"] and
+                    'bucket' in todolist_group and todolist_group["bucket"]["type"] == "Project" and
+                    'creator' in todolist_group):
+                _exception = repr_template_response_entity_creator_bucket_parent(
+                    entity_type=todolist_group["type"], entity_title=todolist_group["title"],
+                    list_parent_types=["Todoset", "Todolist"])
+                return HttpResponseBadRequest(_exception)
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            _todolist_group_title = (saved[todolist_group["id"]][0] if todolist_group["id"] in saved else
+                                     todolist_group["title"])
+            _saved_on_db = (f' {repr_saved_on_db(row=todolist_group, saved=saved)}' if todolist_group["id"] in saved
+                            else "")
+
+            # process todolist_group as todolist
+            todolist_group_list += (f'<li><a href="' +
+                                    reverse('app-todolist-detail',
+                                            kwargs={'bucket_id': bucket_id, 'todolist_id': todolist_group["id"]}) +
+                                    f'">{todolist_group["id"]}</a> '
+                                    f'{_todolist_group_title} ' +
+                                    ('(completed) ' if todolist_group["completed"] else
+                                     f'({todolist_group["completed_ratio"]}) ') +
+                                    f'{todolist_group["comments_count"]} comments {_saved_on_db}</li>')
+            count += 1
 
     total_count_str = ''
     if "X-Total-Count" in response.headers:
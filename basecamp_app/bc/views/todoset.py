@@ -1,9 +1,8 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.urls import reverse
 
-from bc.models import BcTodoset
-from bc.utils import (session_get_token_and_identity, bc_api_get, db_get_bucket, db_get_or_create_person,
-                      api_todoset_get_bucket_todoset_uri,
+from bc.utils import (session_get_token_and_identity, bc_api_get, db_get_bucket,
+                      api_todoset_get_bucket_todoset_uri, sync_save_recording_data,
                       repr_template_response_entity_creator_bucket, repr_template_response_simple_with_back)
 
 
@@ -29,24 +28,11 @@ def app_todoset_detail(request, bucket_id, todoset_id):
         if not _bucket:  # not exists
             return HttpResponseBadRequest(_exception)
 
-        # remove 'bucket' key from todoset, will use model instance bucket instead
-        todoset.pop('bucket')
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=todoset["creator"])
-        if not _creator:  # create person error
+        # process todoset, insert or update with creator
+        _todoset, _exception = sync_save_recording_data(data=todoset)
+        if not _todoset:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'creator' key from todoset, will use model instance creator instead
-        todoset.pop('creator')
-
-        # process todoset
-        try:
-            _todoset = BcTodoset.objects.get(id=todoset["id"])
-        except BcTodoset.DoesNotExist:
-            _todoset = BcTodoset.objects.create(bucket=_bucket, creator=_creator, **todoset)
-            _todoset.save()
-
     else:
         _exception = repr_template_response_entity_creator_bucket(entity_type=todoset["type"],
                                                                   entity_title=todoset["title"])
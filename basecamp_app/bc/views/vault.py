@@ -1,9 +1,8 @@
 from django.http import HttpResponse, HttpResponseRedirect, HttpResponseBadRequest
 from django.urls import reverse
 
-from bc.models import BcVault, BcDocument, BcUpload
-from bc.utils import (session_get_token_and_identity, bc_api_get,
-                      db_get_bucket, db_get_vault_parent, db_get_or_create_person,
+from bc.utils import (session_get_token_and_identity, bc_api_get, bc_api_iter_pages,
+                      db_get_bucket, db_get_vault_parent, sync_save_recording_data,
                       api_vault_get_bucket_vault_uri, api_vault_get_bucket_vault_vaults_uri,
                       api_vault_get_bucket_vault_documents_uri, api_document_get_bucket_document_uri,
                       api_vault_get_bucket_vault_uploads_uri, api_document_get_bucket_upload_uri,
@@ -40,30 +39,11 @@ def app_vault_detail(request, bucket_id, vault_id):
             if not _parent:  # not exists
                 return HttpResponseBadRequest(_exception)
 
-            # remove 'parent' key from vault, will use model instance parent instead
-            vault.pop('parent')
-
-        else:  # no parent, as root vault has no parent
-            _parent = None
-
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=vault["creator"])
-        if not _creator:  # create person error
+        # process vault, insert or update with creator. no parent, as root vault has no parent
+        _vault, _exception = sync_save_recording_data(data=vault)
+        if not _vault:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'bucket' key from vault. key 'bucket' still used in processing parent
-        vault.pop('bucket')
-
-        # remove 'creator' key from vault, will use model instance creator instead
-        vault.pop('creator')
-
-        # process vault
-        try:
-            _vault = BcVault.objects.get(id=vault["id"])
-        except BcVault.DoesNotExist:
-            _vault = BcVault.objects.create(bucket=_bucket, parent=_parent, creator=_creator, **vault)
-            _vault.save()
-
     else:
         _exception = repr_template_response_entity_creator_bucket(entity_type=vault["type"],
                                                                   entity_title=vault["title"])
@@ -98,25 +78,25 @@ def app_vault_vaults(request, bucket_id, vault_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     count = 0
     vault_list = ""
-    for vault in data:
 
-        vault_list += (f'<li><a href="' + reverse('app-vault-detail',
-                                                  kwargs={'bucket_id': bucket_id, 'vault_id': vault["id"]}) +
-                       f'">{vault["id"]}</a> {vault["title"]} '
-                       f'{vault["documents_count"]} documents '
-                       f'{vault["uploads_count"]} uploads '
-                       f'{vault["vaults_count"]} vaults'
-                       '</li>')
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+
+        for vault in page.json():
 
-        count += 1
+            vault_list += (f'<li><a href="' + reverse('app-vault-detail',
+                                                      kwargs={'bucket_id': bucket_id, 'vault_id': vault["id"]}) +
+                           f'">{vault["id"]}</a> {vault["title"]} '
+                           f'{vault["documents_count"]} documents '
+                           f'{vault["uploads_count"]} uploads '
+                           f'{vault["vaults_count"]} vaults'
+                           '</li>')
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            count += 1
 
     total_count_str = ''
     if "X-Total-Count" in response.headers:
@@ -167,27 +147,11 @@ def app_document_detail(request, bucket_id, document_id):
         if not _parent:  # not exists
             return HttpResponseBadRequest(_exception)
 
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=document["creator"])
-        if not _creator:  # create person error
+        # process document, insert or update with creator
+        _document, _exception = sync_save_recording_data(data=document)
+        if not _document:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'bucket' key from document. key 'bucket' still used in processing parent
-        document.pop('bucket')
-
-        # remove 'parent' key from document, will use model instance parent instead
-        document.pop('parent')
-
-        # remove 'creator' key from document, will use model instance creator instead
-        document.pop('creator')
-
-        # process document
-        try:
-            _document = BcDocument.objects.get(id=document["id"])
-        except BcDocument.DoesNotExist:
-            _document = BcDocument.objects.create(bucket=_bucket, parent=_parent, creator=_creator, **document)
-            _document.save()
-
     else:
         _exception = repr_template_response_entity_creator_bucket_parent(
             entity_type=document["type"], entity_title=document["title"],
@@ -223,22 +187,23 @@ def app_vault_documents(request, bucket_id, vault_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     count = 0
     document_list = ""
-    for document in data:
 
-        document_list += (f'<li><a href="' + reverse('app-document-detail',
-                                                     kwargs={'bucket_id': bucket_id, 'document_id': document["id"]}) +
-                          f'">{document["id"]}</a> {document["title"]} '
-                          '</li>')
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
 
-        count += 1
+        for document in page.json():
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            document_list += (f'<li><a href="' +
+                              reverse('app-document-detail',
+                                      kwargs={'bucket_id': bucket_id, 'document_id': document["id"]}) +
+                              f'">{document["id"]}</a> {document["title"]} '
+                              '</li>')
+
+            count += 1
 
     total_count_str = ''
     if "X-Total-Count" in response.headers:
@@ -289,27 +254,11 @@ def app_upload_detail(request, bucket_id, upload_id):
         if not _parent:  # not exists
             return HttpResponseBadRequest(_exception)
 
-        # process creator
-        _creator, _exception = db_get_or_create_person(person=upload["creator"])
-        if not _creator:  # create person error
+        # process upload, insert or update with creator
+        _upload, _exception = sync_save_recording_data(data=upload)
+        if not _upload:  # create person or save error
             return HttpResponseBadRequest(_exception)
 
-        # remove 'bucket' key from document. key 'bucket' still used in processing parent
-        upload.pop('bucket')
-
-        # remove 'parent' key from document, will use model instance parent instead
-        upload.pop('parent')
-
-        # remove 'creator' key from document, will use model instance creator instead
-        upload.pop('creator')
-
-        # process document
-        try:
-            _upload = BcUpload.objects.get(id=upload["id"])
-        except BcUpload.DoesNotExist:
-            _upload = BcUpload.objects.create(bucket=_bucket, parent=_parent, creator=_creator, **upload)
-            _upload.save()
-
     else:
         _exception = repr_template_response_entity_creator_bucket_parent(
             entity_type=upload["type"], entity_title=upload["title"],
@@ -345,22 +294,22 @@ def app_vault_uploads(request, bucket_id, vault_id):
     if response.status_code != 200:  # not OK
         return HttpResponse(repr_http_response_template_string(''), status=response.status_code)
 
-    # if OK
-    data = response.json()
-
+    # if OK, process all pages
     count = 0
     upload_list = ""
-    for upload in data:
 
-        upload_list += (f'<li><a href="' + reverse('app-upload-detail',
-                                                   kwargs={'bucket_id': bucket_id, 'upload_id': upload["id"]}) +
-                        f'">{upload["id"]}</a> {upload["title"]} '
-                        '</li>')
+    for page in bc_api_iter_pages(response=response, access_token=token["access_token"]):
+        if page.status_code != 200:  # not OK
+            return HttpResponse(repr_http_response_template_string(''), status=page.status_code)
+
+        for upload in page.json():
 
-        count += 1
+            upload_list += (f'<li><a href="' + reverse('app-upload-detail',
+                                                       kwargs={'bucket_id': bucket_id, 'upload_id': upload["id"]}) +
+                            f'">{upload["id"]}</a> {upload["title"]} '
+                            '</li>')
 
-    # if 'next' in response.links and 'url' in response.links["next"]:
-    #     print(response.links["next"]["url"])
+            count += 1
 
     total_count_str = ''
     if "X-Total-Count" in response.headers:
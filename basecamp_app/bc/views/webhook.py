@@ -0,0 +1,89 @@
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseRedirect
+from django.template import Context
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from hmac import compare_digest
+from json import loads as json_loads
+from os import environ
+
+from bc.models import BcWebhook
+from bc.utils import session_get_token_and_identity, repr_get_template, webhook_queue_put, webhook_get_recording_url
+
+
+@csrf_exempt  # posted by Basecamp, no csrf token
+@require_POST
+def app_webhook_receiver(request):
+    """
+    only queue the payload, saved later by the bc_webhook_worker management command. Basecamp expects a fast 2xx, it
+    redelivers on timeout or error.
+    the payload URL registered at Basecamp can carry a secret, checked against env BASECAMP_WEBHOOK_SECRET if defined:
+    https://example.com/bc/webhook/receiver?secret=...
+    https://github.com/basecamp/bc3-api/blob/master/sections/webhooks.md
+    """
+    secret = environ.get("BASECAMP_WEBHOOK_SECRET")
+    if secret and not compare_digest(request.GET.get('secret', ''), secret):
+        return HttpResponseForbidden('')
+
+    try:
+        payload = json_loads(request.body)
+    except ValueError:  # include UnicodeDecodeError
+        return HttpResponseBadRequest('webhook payload is not json')
+
+    _queued, _exception = webhook_queue_put(payload=payload)
+    if _exception:
+        return HttpResponseBadRequest(_exception)
+
+    return HttpResponse('')  # queued, or already queued (redelivered)
+
+
+def app_webhook_main(request):
+    """
+    audit listing of the saved webhooks, the latest first, with their recording and its parent: a query per recording
+    (and parent) model with with_generic_relations, instead of a query per webhook.
+    ?kind= to list a kind only, eg: todo_created. ?limit= (default: 100)
+    """
+    token, identity = session_get_token_and_identity(request)
+    if not (token and identity):  # no token or identity, redirect to auth
+        return HttpResponseRedirect(reverse('bc-auth'))
+
+    limit = request.GET.get('limit', '100')
+    if not limit.isdigit():
+        return HttpResponseBadRequest('limit should be a number')
+
+    webhooks = BcWebhook.objects.order_by('-created_at', '-id')
+    if request.GET.get('kind'):
+        webhooks = webhooks.filter(kind=request.GET["kind"])
+
+    webhook_list = []
+    for _webhook in webhooks.with_generic_relations('recording', 'recording__parent')[:int(limit)]:
+        _recording = _webhook.recording
+        _parent = _recording.parent if _recording else None
+        webhook_list.append({
+            'webhook': _webhook,
+            'recording': _recording,
+            'recording_url': webhook_get_recording_url(recording=_recording),
+            'parent': _parent,
+            'parent_url': webhook_get_recording_url(recording=_parent),
+        })
+
+    # sanitize to avoid xss
+    t = repr_get_template('<a href="{{ back_href }}">back</a><br/>'
+                          'webhooks: {{ webhook_list|length }}<br/>'
+                          '{% for item in webhook_list %}'
+                          '<li>{{ item.webhook.id }} {{ item.webhook.created_at|date:"c" }} {{ item.webhook.kind }} '
+                          'by {{ item.webhook.creator.name }}'
+                          '{% if item.recording %}: '
+                          '{% if item.recording_url %}<a href="{{ item.recording_url }}">{% endif %}'
+                          '{{ item.recording.type }} {{ item.recording.id }}'
+                          '{% if item.recording_url %}</a>{% endif %} {{ item.recording.title }}'
+                          '{% if item.parent %}, parent: '
+                          '{% if item.parent_url %}<a href="{{ item.parent_url }}">{% endif %}'
+                          '{{ item.parent.type }} {{ item.parent.id }}'
+                          '{% if item.parent_url %}</a>{% endif %} {{ item.parent.title }}'
+                          '{% endif %}'
+                          '{% else %} (recording not in db){% endif %}</li>'
+                          '{% endfor %}')
+    c = Context({'back_href': reverse('bc-main'), 'webhook_list': webhook_list})
+    return HttpResponse(t.render(context=c))
+
@@ -0,0 +1,16 @@
+# gunicorn loads this file automatically from the working directory
+# https://docs.gunicorn.org/en/stable/settings.html#server-hooks
+
+
+def worker_exit(server, worker):
+    # close the pooled connections to the Basecamp API before the worker shutdown
+    from bc.utils import bc_api_close
+    bc_api_close()
+
+
+def post_worker_init(worker):
+    # preload the reference cache (bc.cache), a locmem cache is per worker, a shared cache (redis) warmed by any worker
+    from os import environ
+    if environ.get("BASECAMP_REFERENCE_CACHE_WARM_UP") == "1":
+        from bc.cache import reference_cache_warm_up
+        reference_cache_warm_up()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+from os import environ
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'bc.middleware.BcIdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'intelligence.urls'
@@ -74,11 +76,57 @@ WSGI_APPLICATION = 'intelligence.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default, PostgreSQL with BASECAMP_DB_ENGINE=postgresql (needs psycopg), eg: several gunicorn workers and
+# sync jobs writing at the same time ("database is locked" on SQLite)
+if environ.get("BASECAMP_DB_ENGINE") == "postgresql":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': environ.get("BASECAMP_DB_NAME", "basecamp"),
+            'USER': environ.get("BASECAMP_DB_USER", "basecamp"),
+            'PASSWORD': environ.get("BASECAMP_DB_PASSWORD", ""),
+            'HOST': environ.get("BASECAMP_DB_HOST", "localhost"),
+            'PORT': environ.get("BASECAMP_DB_PORT", "5432"),
+            # persistent connections, checked before reuse by a new request
+            'CONN_MAX_AGE': int(environ.get("BASECAMP_DB_CONN_MAX_AGE", 60)),
+            'CONN_HEALTH_CHECKS': True,
+            # behind a pooler in transaction mode (eg: pgbouncer), a cursor can not outlive its transaction
+            'DISABLE_SERVER_SIDE_CURSORS': environ.get("BASECAMP_DB_POOLER") == "1",
+            'OPTIONS': {
+                'connect_timeout': int(environ.get("BASECAMP_DB_CONNECT_TIMEOUT", 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# "bc_reference": the reference cache of bc.cache (projects, people, companies, etc.), kept out of "default" so that it
+# is sized and cleared on its own. local memory of the process by default; with several gunicorn workers or hosts set
+# BASECAMP_REFERENCE_CACHE_URL to a shared backend (eg: redis://localhost:6379/1, needs redis-py), otherwise a worker
+# may read a row changed by another one until BASECAMP_REFERENCE_CACHE_TTL.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'bc_reference': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': environ["BASECAMP_REFERENCE_CACHE_URL"],
+    } if environ.get("BASECAMP_REFERENCE_CACHE_URL") else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bc_reference',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(environ.get("BASECAMP_REFERENCE_CACHE_MAX_ENTRIES", 10000)),
+        },
+    },
 }
 
 